@@ -0,0 +1,143 @@
+"""
+Suíte de benchmarks da API.
+
+Roda tudo contra um SQLite temporário e um SMTP local (aiosmtpd), sem tocar
+no banco nem no servidor de e-mail reais:
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks --users 50 --dates 2000 --requests 500 --concurrency 20
+    python -m benchmarks --only micro --compare benchmarks/results/anterior.json
+
+- load: sobe a API com uvicorn e mede vazão e latência (p50/p95/p99) das rotas
+- micro: geração da escala, busca de datas a avisar, enfileiramento dos
+  e-mails e serialização de DateOut
+- startup: cold start da API (ver benchmarks/startup.py)
+- serialization: listagem de datas pelo caminho ORM + Pydantic contra o de
+  tuplas + orjson (ver benchmarks/serialization.py)
+- templates: CPU para montar os e-mails de um lote, EmailMessage por
+  destinatário contra o template compilado (ver benchmarks/templates.py)
+- schedule: geração da escala pelo algoritmo original contra o atual, com a
+  gravação das datas (ver benchmarks/schedule.py)
+
+O resultado é gravado em JSON (por padrão em benchmarks/results/). Com
+`--compare`, as métricas que pioraram mais que `--threshold` são listadas e o
+comando termina com código 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks import environment
+from benchmarks.report import compare
+
+SUITES = ("load", "micro", "startup", "serialization", "templates", "schedule")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=environment.ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+async def _run(args, env: dict) -> dict:
+    results = {}
+    sink = environment.SMTPSink(int(env["SMTP_PORT"]))
+    sink.start()
+    try:
+        seeded = await environment.seed(args.users, args.dates)
+        print(f"Banco semeado com {args.users} usuários e {seeded} datas")
+
+        if "micro" in args.only:
+            from benchmarks import micro
+            results["micro"] = await micro.run(args.repeat)
+            # Volta ao estado semeado para o teste de carga
+            await environment.seed(args.users, args.dates)
+
+        from src.bootstrap.database import dispose_engine
+        await dispose_engine()
+
+        if "load" in args.only:
+            from benchmarks import load
+            results["load"] = await load.run(
+                env, args.users, seeded, args.requests, args.concurrency, args.workers, sink=sink
+            )
+    finally:
+        sink.stop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--dates", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por rota no teste de carga")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn no teste de carga")
+    parser.add_argument("--repeat", type=int, default=20, help="repetições de cada micro-benchmark")
+    parser.add_argument("--serialization-rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--template-recipients", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--schedule-users", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--output", help="arquivo JSON do resultado")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.1, help="piora tolerada na comparação (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    env = environment.configure()
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "parameters": {
+            key: getattr(args, key) for key in ("users", "dates", "requests", "concurrency", "workers", "repeat")
+        },
+    }
+    result.update(asyncio.run(_run(args, env)))
+
+    if "serialization" in args.only:
+        from benchmarks import serialization
+        # Por último: recria o banco com a quantidade de datas pedida
+        result["serialization"] = asyncio.run(serialization.run(args.serialization_rows))
+
+    if "templates" in args.only:
+        from benchmarks import templates
+        result["templates"] = templates.run(args.template_recipients)
+
+    if "schedule" in args.only:
+        from benchmarks import schedule
+        # Também recria usuários e datas no banco temporário
+        result["schedule"] = schedule.run(args.schedule_users)
+
+    if "startup" in args.only:
+        from benchmarks import startup
+        result["startup"] = startup.main(["--runs", "5"])
+
+    output = args.output or os.path.join(
+        environment.ROOT, "benchmarks", "results", f"{datetime.now():%Y%m%d-%H%M%S}-{result['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Resultado gravado em {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.threshold)
+        for r in regressions:
+            print(f"PIORA {r['metric']}: {r['baseline']:.2f} -> {r['current']:.2f} ({r['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("Nenhuma piora acima do limite")
+
+
+if __name__ == "__main__":
+    main()
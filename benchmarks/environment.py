@@ -0,0 +1,103 @@
+"""
+Ambiente isolado dos benchmarks: SQLite num diretório temporário e um
+servidor SMTP local (aiosmtpd) que só conta as mensagens recebidas.
+
+`configure()` precisa rodar antes de qualquer import de `src`, porque as
+configurações são lidas do ambiente na importação de `src.bootstrap.settings`.
+"""
+import os
+import random
+import socket
+import tempfile
+from datetime import date, timedelta
+
+from aiosmtpd.controller import Controller
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class SMTPSink:
+    """Servidor SMTP que aceita tudo e só conta as mensagens."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.messages = 0
+        self._controller = Controller(self, hostname="127.0.0.1", port=port)
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 OK"
+
+    def start(self):
+        self._controller.start()
+
+    def stop(self):
+        self._controller.stop()
+
+
+def configure(workdir: str = None, smtp_port: int = None) -> dict:
+    """Define as variáveis de ambiente da API e devolve o dicionário usado."""
+    workdir = workdir or tempfile.mkdtemp(prefix="buy_bread-bench-")
+    env = {
+        "PYTHONPATH": ROOT,
+        "MYSQL_HOST": "",
+        "SQLITE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "CACHE_VERSION_DIR": os.path.join(workdir, "cache"),
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port or free_port()),
+        "SMTP_START_TLS": "false",
+        "SMTP_USER": "",
+        "SMTP_PASS": "",
+        "FROM_EMAIL": "bench@example.com",
+        "ROOT_PATH": "/",
+        # O benchmark mede a API, não o limitador de taxa do dispatcher
+        "OUTBOX_RATE_PER_SECOND": "10000",
+        "OUTBOX_BURST": "1000",
+        "OUTBOX_POLL_INTERVAL": "0.5",
+    }
+    os.environ.update(env)
+    return env
+
+
+async def seed(users: int, dates: int, seed_value: int = 42):
+    """
+    Aplica as migrações e cria `users` usuários e até `dates` datas, em terças
+    e quintas a partir de hoje, distribuídas pelo algoritmo da própria API.
+    """
+    from sqlalchemy import delete, insert
+
+    from src.bootstrap.database import AsyncSessionLocal, init_engine
+    from src.dates.entity import Dates
+    from src.dates.schedule import rebuild_schedule
+    from src.dates.services import distribuir_datas
+    from src.emails.entity import Outbox
+    from src.migrations import upgrade
+    from src.users.entity import User
+    from src.users.enums import DiasResponsavel
+
+    await upgrade(init_engine())
+    rng = random.Random(seed_value)
+    dias = list(DiasResponsavel)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Outbox))
+        await db.execute(delete(Dates))
+        await db.execute(delete(User))
+        usuarios = [(i, rng.choice(dias)) for i in range(1, users + 1)]
+        await db.execute(insert(User), [
+            {"id": i, "nome": f"Pessoa {i}", "email": f"pessoa{i}@example.com", "dias_responsavel": dia}
+            for i, dia in usuarios
+        ])
+        # Duas datas por semana: horizonte suficiente para chegar a `dates`
+        hoje = date.today()
+        atribuicoes = distribuir_datas(usuarios, hoje, hoje + timedelta(weeks=dates // 2 + 1))[:dates]
+        if atribuicoes:
+            await db.execute(insert(Dates), [{"data": dia, "user_id": user_id} for dia, user_id in atribuicoes])
+        await rebuild_schedule(db)
+        await db.commit()
+    return len(atribuicoes)
@@ -0,0 +1,131 @@
+"""
+Teste de carga: sobe `src.bootstrap.server:app` num processo uvicorn, com o
+ambiente de `benchmarks.environment`, e dispara as rotas de `/users`,
+`/dates` e `/mails` com a concorrência pedida.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional
+
+import httpx
+
+from benchmarks.environment import ROOT, free_port
+from benchmarks.report import latency_summary
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, path: Callable[[int], str], json: Optional[Callable[[int], dict]] = None, headers: Optional[dict] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.json = json
+        self.headers = headers or {}
+
+
+def scenarios(users: int, dates: int) -> List[Scenario]:
+    return [
+        Scenario("GET /users/", "GET", lambda i: "/users/"),
+        Scenario("GET /users/{id}", "GET", lambda i: f"/users/{i % users + 1}"),
+        Scenario("GET /dates/?limit=100", "GET", lambda i: "/dates/?limit=100"),
+        Scenario("GET /dates/ (completo)", "GET", lambda i: "/dates/"),
+        Scenario("GET /dates/?user_id", "GET", lambda i: f"/dates/?user_id={i % users + 1}"),
+        Scenario("GET /dates/{id}", "GET", lambda i: f"/dates/{i % max(dates, 1) + 1}"),
+        Scenario("GET /dates/?format=ndjson", "GET", lambda i: "/dates/?format=ndjson&limit=500"),
+        Scenario(
+            "POST /dates/", "POST", lambda i: "/dates/",
+            json=lambda i: {"data": "2099-01-06", "user_id": i % users + 1},
+        ),
+        Scenario("POST /mails/notify-user-by-date/{id}", "POST", lambda i: f"/mails/notify-user-by-date/{i % max(dates, 1) + 1}"),
+        Scenario("POST /mails/send-emails-alert/", "POST", lambda i: "/mails/send-emails-alert/"),
+        Scenario("GET /mails/outbox/", "GET", lambda i: "/mails/outbox/"),
+    ]
+
+
+class Server:
+    """Processo uvicorn com a API; `workers` > 1 usa vários processos."""
+
+    def __init__(self, env: dict, workers: int = 1):
+        self.env = env
+        self.workers = workers
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._process: Optional[subprocess.Popen] = None
+
+    async def __aenter__(self):
+        self._process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "src.bootstrap.server:app",
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning",
+            ],
+            cwd=ROOT,
+            env={**os.environ, **self.env},
+        )
+        async with httpx.AsyncClient(base_url=self.url) as client:
+            for _ in range(200):
+                try:
+                    await client.get("/users/dias/")
+                    return self
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+        raise RuntimeError("a API não subiu")
+
+    async def __aexit__(self, *exc):
+        self._process.terminate()
+        self._process.wait(timeout=60)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await client.request(
+                scenario.method,
+                scenario.path(i),
+                json=scenario.json(i) if scenario.json else None,
+                headers=scenario.headers,
+            )
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        **latency_summary(latencies),
+    }
+
+
+async def run(env: dict, users: int, dates: int, requests: int, concurrency: int, workers: int = 1, sink=None) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with Server(env, workers) as server:
+        async with httpx.AsyncClient(base_url=server.url, limits=limits, timeout=60) as client:
+            # Aquecimento: primeira conexão ao banco, caches e imports tardios
+            for scenario in scenarios(users, dates)[:3]:
+                await run_scenario(client, scenario, min(requests, 20), 1)
+            for scenario in scenarios(users, dates):
+                results[scenario.name] = await run_scenario(client, scenario, requests, concurrency)
+                print(
+                    f"{scenario.name:40s} {results[scenario.name]['throughput_rps']:9.1f} req/s "
+                    f"p50 {results[scenario.name]['p50_ms']:7.2f} ms  p95 {results[scenario.name]['p95_ms']:7.2f} ms  "
+                    f"p99 {results[scenario.name]['p99_ms']:7.2f} ms  erros {results[scenario.name]['errors']}"
+                )
+    if sink is not None:
+        results["smtp_messages"] = sink.messages
+    return results
@@ -0,0 +1,74 @@
+"""
+Micro-benchmarks das partes mais pesadas da API, chamadas direto (sem HTTP)
+contra o banco semeado por `benchmarks.environment.seed`.
+"""
+import json
+import time
+from typing import Awaitable, Callable, Dict
+
+from benchmarks.report import latency_summary
+
+
+async def measure(func: Callable[[], Awaitable], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    summary = latency_summary(timings)
+    summary["median_ms"] = summary.pop("p50_ms")
+    return summary
+
+
+async def run(repeat: int = 20) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import delete, select
+    from sqlalchemy.orm import joinedload
+
+    from src.bootstrap.database import AsyncSessionLocal
+    from src.dates.entity import Dates
+    from src.dates.models import DateOut
+    from src.dates.routes import gerar_datas_automaticas
+    from src.dates.services import get_dates_to_notify
+    from src.emails.entity import Outbox
+    from src.emails.services import send_emails_for_dates
+
+    results = {}
+
+    async def gerar():
+        async with AsyncSessionLocal() as db:
+            await gerar_datas_automaticas(db, anos=1)
+
+    results["gerar_datas_automaticas(anos=1)"] = await measure(gerar, repeat)
+
+    for days in (7, 365):
+        async def notify(days=days):
+            async with AsyncSessionLocal() as db:
+                await get_dates_to_notify(db, days)
+
+        results[f"get_dates_to_notify(days={days})"] = await measure(notify, repeat)
+
+    async with AsyncSessionLocal() as db:
+        to_notify = await get_dates_to_notify(db, 365)
+
+    async def enqueue():
+        async with AsyncSessionLocal() as db:
+            await send_emails_for_dates(to_notify, db)
+            await db.execute(delete(Outbox))
+            await db.commit()
+
+    results[f"send_emails_for_dates({len(to_notify)} datas)"] = await measure(enqueue, repeat)
+
+    async with AsyncSessionLocal() as db:
+        dates = (await db.execute(select(Dates).options(joinedload(Dates.user)))).scalars().all()
+
+    async def serialize():
+        # O mesmo caminho das rotas: DateOut + a serialização JSON do FastAPI
+        content = [DateOut.from_orm_with_timezone(d) for d in dates]
+        json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    results[f"DateOut serialization ({len(dates)} datas)"] = await measure(serialize, repeat)
+
+    for name, summary in results.items():
+        print(f"{name:45s} mediana {summary['median_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms")
+    return results
@@ -0,0 +1,66 @@
+"""Estatísticas e comparação entre execuções dos benchmarks."""
+import math
+from typing import Dict, Iterable, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Percentil por nearest-rank de uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: Iterable[float]) -> Dict[str, float]:
+    """Resumo de latências em segundos, reportado em milissegundos."""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000,
+    }
+
+
+# Métricas comparadas e se valor maior é melhor
+_COMPARED = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "median_ms": False,
+}
+
+
+def _flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and key in _COMPARED:
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """
+    Compara duas execuções e devolve as métricas que pioraram mais que
+    `threshold` (fração, 0.1 = 10%).
+    """
+    old, new = _flatten(baseline), _flatten(current)
+    regressions = []
+    for path, old_value in old.items():
+        if path not in new or not old_value:
+            continue
+        new_value = new[path]
+        higher_is_better = _COMPARED[path.rsplit(".", 1)[-1]]
+        change = (new_value - old_value) / old_value
+        worse = -change if higher_is_better else change
+        if worse > threshold:
+            regressions.append({"metric": path, "baseline": old_value, "current": new_value, "change": change})
+    return regressions
@@ -0,0 +1,157 @@
+"""
+Geração da escala: o algoritmo original de `gerar_datas_automaticas` (dia a
+dia, lista de candidatos refeita em cada terça e quinta, escolha com min() e
+um `db.add` por data) contra o atual (`distribuir_datas` com heaps e um
+INSERT multi-linha). Confere que as duas distribuições são idênticas.
+
+    python -m benchmarks.schedule --users 100 1000 3000 --years 5
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import List, NamedTuple, Tuple
+
+from benchmarks import environment
+
+
+class _Usuario(NamedTuple):
+    # Os dois atributos de User que o algoritmo original lia
+    id: int
+    dias_responsavel: object
+
+
+def distribuir_original(usuarios: List[_Usuario], inicio: date, fim: date) -> List[Tuple[date, int]]:
+    """O laço do baseline, sem o banco: O(dias × usuários)."""
+    from src.users.enums import DiasResponsavel
+
+    contador_usuarios = {u.id: 0 for u in usuarios}
+    atribuicoes = []
+    dia_atual = inicio
+    while dia_atual <= fim:
+        weekday = dia_atual.weekday()
+        if weekday in [1, 3]:
+            if weekday == 1:
+                candidatos = [u for u in usuarios if u.dias_responsavel in [DiasResponsavel.terca, DiasResponsavel.terca_quinta]]
+            else:
+                candidatos = [u for u in usuarios if u.dias_responsavel in [DiasResponsavel.quinta, DiasResponsavel.terca_quinta]]
+            if candidatos:
+                escolhido = min(candidatos, key=lambda u: contador_usuarios[u.id])
+                atribuicoes.append((dia_atual, escolhido.id))
+                contador_usuarios[escolhido.id] += 1
+        dia_atual += timedelta(days=1)
+    return atribuicoes
+
+
+def _median_ms(func, repeat: int) -> Tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2] * 1000, result
+
+
+def _measure_cpu(users: int, years: int, repeat: int) -> dict:
+    # As entidades se registram pelo módulo do banco, antes dos serviços
+    from src.bootstrap import database  # noqa: F401
+    from src.dates.services import distribuir_datas
+    from src.users.enums import DiasResponsavel
+
+    dias = list(DiasResponsavel)
+    usuarios = [_Usuario(i, dias[i % 3]) for i in range(1, users + 1)]
+    pares = [(u.id, u.dias_responsavel) for u in usuarios]
+    inicio = date.today()
+    fim = date(inicio.year + years, 12, 31)
+
+    original_ms, original = _median_ms(lambda: distribuir_original(usuarios, inicio, fim), repeat)
+    atual_ms, atual = _median_ms(lambda: distribuir_datas(pares, inicio, fim), repeat)
+    return {
+        "datas": len(atual),
+        "original_ms": original_ms,
+        "atual_ms": atual_ms,
+        "speedup": original_ms / atual_ms,
+        "identical": original == atual,
+    }
+
+
+async def _measure_insert(users: int, years: int, repeat: int) -> dict:
+    """Gravação das datas: um objeto ORM por data contra um INSERT multi-linha."""
+    from sqlalchemy import delete, insert
+
+    from src.bootstrap.database import AsyncSessionLocal, dispose_engine, init_engine
+    from src.dates.entity import Dates
+    from src.dates.services import distribuir_datas
+    from src.migrations import upgrade
+    from src.users.entity import User
+    from src.users.enums import DiasResponsavel
+
+    await upgrade(init_engine())
+    dias = list(DiasResponsavel)
+    pares = [(i, dias[i % 3]) for i in range(1, users + 1)]
+    inicio = date.today()
+    atribuicoes = distribuir_datas(pares, inicio, date(inicio.year + years, 12, 31))
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Dates))
+        await db.execute(delete(User))
+        await db.execute(insert(User), [
+            {"id": uid, "nome": f"Pessoa {uid}", "email": f"pessoa{uid}@example.com", "dias_responsavel": d}
+            for uid, d in pares
+        ])
+        await db.commit()
+
+    async def original():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Dates))
+            await db.commit()
+            for dia, user_id in atribuicoes:
+                db.add(Dates(data=dia, user_id=user_id))
+            await db.commit()
+
+    async def atual():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Dates))
+            await db.execute(insert(Dates), [{"data": dia, "user_id": user_id} for dia, user_id in atribuicoes])
+            await db.commit()
+
+    result = {"datas": len(atribuicoes)}
+    for name, func in (("orm_add_ms", original), ("bulk_insert_ms", atual)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - started)
+        result[name] = sorted(timings)[len(timings) // 2] * 1000
+    await dispose_engine()
+    return result
+
+
+def run(sizes, years: int = 5, repeat: int = 3) -> dict:
+    results = {}
+    for users in sizes:
+        results[f"{users} usuários"] = r = _measure_cpu(users, years, repeat)
+        print(
+            f"{users:>6} usuários, {r['datas']} datas: original {r['original_ms']:9.1f} ms  "
+            f"heaps {r['atual_ms']:7.2f} ms  {r['speedup']:7.1f}x  distribuição idêntica: {r['identical']}"
+        )
+    # A quantidade de datas depende só do horizonte: a gravação é medida uma vez
+    results["gravacao"] = r = asyncio.run(_measure_insert(max(sizes), years, repeat))
+    print(
+        f"Gravação de {r['datas']} datas: db.add por data {r['orm_add_ms']:8.1f} ms  "
+        f"INSERT multi-linha {r['bulk_insert_ms']:8.1f} ms"
+    )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    environment.configure()
+    return run(args.users, args.years, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compara a serialização da listagem de datas: o caminho antigo (objetos ORM,
+DateOut por linha e jsonable_encoder + json.dumps) contra o caminho enxuto
+(tuplas de colunas + orjson), conferindo que os bytes são idênticos.
+
+    python -m benchmarks.serialization --rows 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import environment
+
+
+async def _seed(rows: int, users: int = 50):
+    from sqlalchemy import delete, insert
+
+    from src.bootstrap.database import AsyncSessionLocal, init_engine
+    from src.dates.entity import Dates
+    from src.dates.schedule import rebuild_schedule
+    from src.migrations import upgrade
+    from src.users.entity import User
+    from src.users.enums import DiasResponsavel
+
+    await upgrade(init_engine())
+    dias = list(DiasResponsavel)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Dates))
+        await db.execute(delete(User))
+        await db.execute(insert(User), [
+            {"id": i, "nome": f"Pessoa {i} Ção", "email": f"pessoa{i}@example.com", "dias_responsavel": dias[i % 3]}
+            for i in range(1, users + 1)
+        ])
+        from datetime import date, timedelta
+        inicio = date.today()
+        for start in range(0, rows, 5000):
+            await db.execute(insert(Dates), [
+                {"data": inicio + timedelta(days=i // users), "user_id": i % users + 1, "foi_avisado": i % 7 == 0}
+                for i in range(start, min(rows, start + 5000))
+            ])
+        await rebuild_schedule(db)
+        await db.commit()
+
+
+async def _measure(repeat: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+
+    from src.bootstrap.database import AsyncSessionLocal
+    from src.dates.entity import Dates, ScheduleView
+    from src.dates.models import DateOut
+    from src.dates.services import date_rows_query, dump_date_rows
+
+    async def antigo() -> bytes:
+        async with AsyncSessionLocal() as db:
+            dates = (await db.execute(
+                select(Dates).options(joinedload(Dates.user)).order_by(Dates.data, Dates.id)
+            )).scalars().all()
+            content = [DateOut.from_orm_with_timezone(d) for d in dates]
+            return json.dumps(
+                jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+            ).encode("utf-8")
+
+    async def enxuto() -> bytes:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(date_rows_query().order_by(ScheduleView.data, ScheduleView.id))).all()
+            return dump_date_rows(rows)
+
+    result = {}
+    bodies = {}
+    for name, func in (("orm_pydantic", antigo), ("tuplas_orjson", enxuto)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            bodies[name] = await func()
+            timings.append(time.perf_counter() - started)
+        result[name] = {"median_ms": sorted(timings)[len(timings) // 2] * 1000, "bytes": len(bodies[name])}
+    result["identical"] = bodies["orm_pydantic"] == bodies["tuplas_orjson"]
+    result["speedup"] = result["orm_pydantic"]["median_ms"] / result["tuplas_orjson"]["median_ms"]
+    return result
+
+
+async def run(sizes, repeat: int = 3) -> dict:
+    results = {}
+    for rows in sizes:
+        await _seed(rows)
+        results[f"{rows} datas"] = r = await _measure(repeat)
+        print(
+            f"{rows:>7} datas: ORM+Pydantic {r['orm_pydantic']['median_ms']:9.1f} ms  "
+            f"tuplas+orjson {r['tuplas_orjson']['median_ms']:8.1f} ms  "
+            f"{r['speedup']:5.1f}x  bytes idênticos: {r['identical']}"
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    environment.configure()
+    return asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark de cold start da API.
+
+Cada rodada sobe um interpretador novo que importa `src.bootstrap.server`,
+executa o startup do lifespan e o desligamento, medindo os tempos e quantas
+conexões de rede foram abertas até ali (o esperado é nenhuma). Por padrão o
+banco aponta para um MySQL inexistente, para mostrar que a API sobe mesmo com
+o banco fora do ar.
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import asyncio, json, socket, time
+
+conexoes = []
+_connect = socket.socket.connect
+_connect_ex = socket.socket.connect_ex
+
+def connect(self, address):
+    conexoes.append(repr(address))
+    return _connect(self, address)
+
+def connect_ex(self, address):
+    conexoes.append(repr(address))
+    return _connect_ex(self, address)
+
+socket.socket.connect = connect
+socket.socket.connect_ex = connect_ex
+
+inicio = time.perf_counter()
+from src.bootstrap.server import app
+importado = time.perf_counter()
+
+async def ciclo():
+    async with app.router.lifespan_context(app):
+        pronto = time.perf_counter()
+        conexoes_no_startup = len(conexoes)
+    return pronto, conexoes_no_startup
+
+pronto, conexoes_no_startup = asyncio.run(ciclo())
+fim = time.perf_counter()
+print(json.dumps({
+    "import_s": importado - inicio,
+    "startup_s": pronto - importado,
+    "ready_s": pronto - inicio,
+    "shutdown_s": fim - pronto,
+    "connections": conexoes_no_startup,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(values):
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "max": max(values),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mysql-host", default="10.255.255.1", help="host de banco (inalcançável por padrão)")
+    parser.add_argument("--output", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "MYSQL_HOST": args.mysql_host,
+        "MYSQL_PORT": "3306",
+        "MYSQL_USER": "bench",
+        "MYSQL_PASSWORD": "bench",
+        "MYSQL_DATABASE": "bench",
+        "MIGRATE_ON_STARTUP": "false",
+    }
+    runs = [run_once(env) for _ in range(args.runs)]
+    result = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        **{key: summarize([r[key] for r in runs]) for key in ("import_s", "startup_s", "ready_s", "shutdown_s")},
+        "connections": max(r["connections"] for r in runs),
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
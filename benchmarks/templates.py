@@ -0,0 +1,110 @@
+"""
+Custo de CPU da montagem dos e-mails de um lote: um `EmailMessage` por
+destinatário serializado como o aiosmtplib faz (só texto, como antes, e
+texto + HTML) contra o template compilado, preenchido uma vez com os campos
+do lote e depois só com os de cada destinatário. Também mede o caminho da
+outbox (colunas no enfileiramento + montagem no dispatcher) e confere que a
+parte em texto sai igual à do caminho antigo.
+
+    python -m benchmarks.templates --recipients 1000 10000
+"""
+import argparse
+import email
+import email.policy
+import time
+
+from benchmarks import environment
+
+ASSUNTO = "Tá na hora do cafezinho"
+MENSAGEM = "9:30 da manhã nos reuniremos para tomar o cafezinho.\nEsperamos você!"
+
+
+def _measure(recipients: int, repeat: int) -> dict:
+    import orjson
+    from aiosmtplib.email import flatten_message
+
+    from src.emails.messages import build_email_message
+    from src.emails.templating import email_templates
+
+    users = [(f"Pessoa {i} Ção", f"pessoa{i}@example.com") for i in range(recipients)]
+    # A compilação acontece uma vez por processo; fora da medição, como no servidor
+    email_templates.get("cafe")
+
+    def texto():
+        return [
+            flatten_message(build_email_message(e, f"Olá, tudo bem? {n}\n\n{MENSAGEM}\n", ASSUNTO), cte_type="8bit")
+            for n, e in users
+        ]
+
+    def multipart():
+        mensagens = []
+        for n, e in users:
+            msg = build_email_message(e, f"Olá, tudo bem? {n}\n\n{MENSAGEM}\n", ASSUNTO)
+            msg.add_alternative(
+                f"<p>Olá, tudo bem? <strong>{n}</strong></p>\n<p>{MENSAGEM}</p>\n", subtype="html"
+            )
+            mensagens.append(flatten_message(msg, cte_type="8bit"))
+        return mensagens
+
+    def template():
+        t = email_templates.get("cafe").bind({"assunto": ASSUNTO, "mensagem": MENSAGEM})
+        return [t.render(e, {"nome": n}) for n, e in users]
+
+    def outbox():
+        # Enfileiramento (colunas) e, no dispatcher, a montagem a partir do JSON
+        t = email_templates.get("cafe").bind({"assunto": ASSUNTO, "mensagem": MENSAGEM})
+        linhas = [(e, t.outbox_fields({"nome": n})) for n, e in users]
+        return [
+            email_templates.get(c["template"], c["template_version"]).render(e, orjson.loads(c["context"]))
+            for e, c in linhas
+        ]
+
+    result, saidas = {}, {}
+    for name, func in (("emailmessage_texto", texto), ("emailmessage_multipart", multipart),
+                       ("template", template), ("template_outbox", outbox)):
+        timings = []
+        for _ in range(repeat):
+            started = time.process_time()
+            saidas[name] = func()
+            timings.append(time.process_time() - started)
+        median = sorted(timings)[len(timings) // 2]
+        result[name] = {"cpu_ms": median * 1000, "us_per_message": median / recipients * 1e6}
+
+    def corpo_texto(raw: bytes) -> str:
+        msg = email.message_from_bytes(raw, policy=email.policy.default)
+        parte = msg.get_body(preferencelist=("plain",))
+        return (msg["To"], msg["Subject"], parte.get_content().replace("\r\n", "\n").rstrip("\n"))
+
+    result["identical_text"] = all(
+        corpo_texto(a) == corpo_texto(b) == corpo_texto(c)
+        for a, b, c in zip(saidas["emailmessage_texto"], saidas["template"], saidas["template_outbox"])
+    )
+    result["speedup_vs_multipart"] = result["emailmessage_multipart"]["cpu_ms"] / result["template"]["cpu_ms"]
+    return result
+
+
+def run(sizes, repeat: int = 3) -> dict:
+    results = {}
+    for recipients in sizes:
+        results[f"{recipients} destinatários"] = r = _measure(recipients, repeat)
+        print(
+            f"{recipients:>6} destinatários: EmailMessage texto {r['emailmessage_texto']['cpu_ms']:8.1f} ms  "
+            f"texto+HTML {r['emailmessage_multipart']['cpu_ms']:8.1f} ms  "
+            f"template {r['template']['cpu_ms']:6.1f} ms ({r['template']['us_per_message']:.1f} µs/msg)  "
+            f"outbox {r['template_outbox']['cpu_ms']:6.1f} ms  "
+            f"{r['speedup_vs_multipart']:5.1f}x  texto idêntico: {r['identical_text']}"
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    environment.configure()
+    return run(args.recipients, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from src.bootstrap.settings import settings
+
+# Versão de cada tabela; as rotas de escrita incrementam depois do commit.
+# A versão é o tamanho de um arquivo por tabela em CACHE_VERSION_DIR, que
+# cresce um byte a cada escrita (append é atômico): assim uma escrita recebida
+# por um worker invalida o cache de todos os workers da mesma máquina. Outras
+# máquinas não veem o arquivo: para elas vale o RESPONSE_CACHE_TTL.
+os.makedirs(settings.CACHE_VERSION_DIR, exist_ok=True)
+
+
+def _version_path(table: str) -> str:
+    return os.path.join(settings.CACHE_VERSION_DIR, table)
+
+
+def bump_version(*tables: str):
+    for table in tables:
+        with open(_version_path(table), "ab") as f:
+            f.write(b".")
+
+
+def table_version(table: str) -> int:
+    try:
+        return os.stat(_version_path(table)).st_size
+    except FileNotFoundError:
+        return 0
+
+
+class ResponseCache:
+    """
+    Cache LRU de respostas JSON já serializadas, limitado pelo total de bytes
+    guardados. A chave inclui a versão das tabelas de que a resposta depende,
+    então uma escrita torna as entradas antigas inalcançáveis e elas saem do
+    cache conforme o espaço é necessário.
+
+    A versão só é compartilhada entre os workers da mesma máquina; com várias
+    réplicas uma escrita em outra máquina só é vista quando a entrada vence,
+    depois de `ttl` segundos.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # chave -> (corpo, ETag, cabeçalhos, validade em time.monotonic())
+        self._entries: "OrderedDict[tuple, Tuple[bytes, str, dict, float]]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str, dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[3] <= time.monotonic():
+            del self._entries[key]
+            self._size -= len(entry[0])
+            return None
+        self._entries.move_to_end(key)
+        return entry[:3]
+
+    def put(self, key: tuple, body: bytes, etag: str, headers: dict):
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+        self._entries[key] = (body, etag, headers, time.monotonic() + self.ttl)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (evicted, _, _, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def _json_response(request: Request, body: bytes, etag: str, headers: dict) -> Response:
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached_response(
+    request: Request,
+    tables: Iterable[str],
+    build: Callable[[dict], Awaitable[object]],
+) -> Response:
+    """
+    Devolve a resposta em cache para esta URL enquanto as tabelas de que ela
+    depende não mudarem; senão chama `build(headers)` para montar o conteúdo
+    (que pode acrescentar cabeçalhos em `headers`) e guarda o resultado.
+    `build` pode devolver o JSON já serializado, em bytes.
+
+    A resposta leva um ETag forte e um `If-None-Match` igual recebe 304 sem
+    corpo. Numa resposta em cache o banco não é consultado; vencido o TTL ela
+    é montada de novo, e o ETag só muda se o conteúdo mudou.
+    """
+    # A versão é lida antes de consultar o banco: se uma escrita acontecer no
+    # meio, a entrada fica com a versão antiga e nunca mais é servida
+    key = (request.url.path, request.url.query, tuple((t, table_version(t)) for t in tables))
+    entry = response_cache.get(key)
+    if entry is None:
+        headers: dict = {}
+        content = await build(headers)
+        if isinstance(content, bytes):
+            body = content
+        else:
+            # Mesma serialização do JSONResponse do FastAPI
+            body = json.dumps(
+                jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+            ).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        response_cache.put(key, body, etag, headers)
+        entry = (body, etag, headers)
+    return _json_response(request, *entry)
@@ -1,23 +1,52 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Optional
 
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from src.bootstrap import profiling
+from src.bootstrap.metrics import instrument_engine
 from src.bootstrap.settings import settings
 
-engine = create_engine(settings.DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(bind=engine)
+# O engine só é criado em init_engine(), chamado no lifespan da aplicação (ou
+# pelos comandos de linha): importar este módulo não carrega o driver nem
+# abre conexões, e a API sobe mesmo com o banco fora do ar.
+engine: Optional[AsyncEngine] = None
+# expire_on_commit=False: objetos continuam legíveis depois do commit sem
+# disparar lazy loads, que não são permitidos com AsyncSession
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
 Base = declarative_base()
 
 
 # Importar entidades
 from src.users.entity import User
-from src.dates.entity import Dates
+from src.dates.entity import Dates, DatesArchive, ScheduleView
+from src.emails.entity import Outbox
+from src.jobs.entity import JobLease, JobRun
+from src.events.entity import Event
+
+# O schema é criado/atualizado pelas migrações (python -m src.migrations),
+# não mais na importação ou no startup.
+
+
+def init_engine() -> AsyncEngine:
+    """Cria o engine (sem conectar) e liga a fábrica de sessões a ele."""
+    global engine
+    if engine is None:
+        engine = create_async_engine(settings.DATABASE_URL, echo=False)
+        instrument_engine(engine)
+        if profiling.enabled():
+            profiling.instrument_engine(engine)
+        AsyncSessionLocal.configure(bind=engine)
+    return engine
+
 
-Base.metadata.create_all(bind=engine)
+async def dispose_engine():
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
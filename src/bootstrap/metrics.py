@@ -0,0 +1,222 @@
+"""
+Métricas no formato texto do Prometheus, expostas em GET /metrics.
+
+Os coletores são estruturas simples atualizadas só pelo event loop do
+processo, sem locks: um contador é um dict e um histograma guarda só o
+contador do bucket onde a observação caiu (os acumulados são calculados na
+hora de renderizar). Cada worker tem suas próprias métricas e todas as
+séries levam o label `worker` com o pid.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_WORKER = str(os.getpid())
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    pairs.append(f'worker="{_WORKER}"')
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [contagem por bucket (+Inf no fim), soma]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge ou contador cujo valor é lido de uma função na hora do scrape."""
+
+    def __init__(self, name: str, documentation: str, kind: str, func: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.func = func
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name}{_labels((), ())} {_number(self.func())}",
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota", ("method", "route", "status"),
+))
+http_request_sql_queries = registry.register(Histogram(
+    "http_request_sql_queries", "Consultas SQL executadas por requisição", ("method", "route"), COUNT_BUCKETS,
+))
+http_request_sql_duration = registry.register(Histogram(
+    "http_request_sql_duration_seconds", "Tempo total em SQL por requisição", ("method", "route"),
+))
+sql_queries = registry.register(Counter("sql_queries_total", "Consultas SQL executadas"))
+sql_query_duration = registry.register(Histogram("sql_query_duration_seconds", "Duração de cada consulta SQL"))
+smtp_send_duration = registry.register(Histogram("smtp_send_duration_seconds", "Latência de cada envio SMTP"))
+smtp_send_failures = registry.register(Counter(
+    "smtp_send_failures_total", "Envios SMTP que falharam, por tipo de erro", ("error",),
+))
+job_duration = registry.register(Histogram(
+    "scheduler_job_duration_seconds", "Duração das execuções dos jobs agendados", ("job", "status"), JOB_BUCKETS,
+))
+job_skipped = registry.register(Counter(
+    "scheduler_job_skipped_total", "Disparos ignorados porque outro worker ficou com o lease", ("job",),
+))
+
+_pool = None
+registry.register(CallbackMetric(
+    "db_pool_checked_out_connections", "Conexões do pool em uso", "gauge",
+    lambda: _pool.checkedout() if hasattr(_pool, "checkedout") else 0,
+))
+
+# Contadores de SQL da requisição atual: [consultas, segundos]
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # No contexto da execução, não na conexão: uma consulta que falha não tem
+    # after_cursor_execute e o início dela vai embora junto com o contexto
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    sql_queries.inc()
+    sql_query_duration.observe(elapsed)
+    stats = _request_sql.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Liga os eventos de SQL e o gauge de conexões em uso ao engine."""
+    global _pool
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _pool = engine.sync_engine.pool
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência e o SQL de cada requisição. A rota é
+    o template (`/dates/{date_id}`), para não criar uma série por id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status: List[int] = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_sql.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_sql.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "desconhecida")
+            method = scope["method"]
+            http_request_duration.observe(elapsed, method, route, str(status[0]))
+            http_request_sql_queries.observe(stats[0], method, route)
+            http_request_sql_duration.observe(stats[1], method, route)
+
+
+def render() -> str:
+    return registry.render()
+
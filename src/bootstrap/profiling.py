@@ -0,0 +1,152 @@
+"""
+Profiling sob demanda de requisições.
+
+Com PROFILE_REQUESTS=true todas as requisições são perfiladas; com
+PROFILE_HEADER_TOKEN definido, só as que chegarem com `X-Profile: <token>`.
+Sem nenhum dos dois o middleware nem é instalado e os eventos de SQL não são
+registrados, então deixar o código em produção não custa nada.
+
+Para cada requisição perfilada são gravados em PROFILE_DIR:
+
+- `<id>.collapsed`: amostras da pilha do event loop no formato "collapsed"
+  (uma pilha por linha, frames separados por `;`, seguida da contagem), que
+  flamegraph.pl, speedscope e similares abrem direto;
+- `<id>.sql.txt`: cada instrução SQL executada na requisição, com a duração.
+
+O id vai no cabeçalho `X-Profile-Id` da resposta. As amostras são da thread
+do event loop inteira: requisições concorrentes aparecem juntas, e pilhas que
+terminam em `select` são o loop esperando I/O (banco, SMTP).
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.bootstrap.settings import settings
+
+# (instrução, parâmetros, segundos) das consultas da requisição perfilada
+_query_log: ContextVar[Optional[List[Tuple[str, object, float]]]] = ContextVar("query_log", default=None)
+
+
+def enabled() -> bool:
+    return settings.PROFILE_REQUESTS or bool(settings.PROFILE_HEADER_TOKEN)
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de uma thread, a partir de outra thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Início no contexto da execução, como em src.bootstrap.metrics
+    if _query_log.get() is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _query_log.get()
+    started = getattr(context, "_profile_started", None)
+    if log is not None and started is not None:
+        log.append((statement, parameters, time.perf_counter() - started))
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Registra o log de SQL por requisição; só é chamado com o profiling ligado."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _write(profile_id: str, collapsed: str, header: str, queries: List[Tuple[str, object, float]]):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR, profile_id)
+    with open(base + ".collapsed", "w") as f:
+        f.write(collapsed)
+    with open(base + ".sql.txt", "w") as f:
+        f.write(header)
+        f.write(f"{len(queries)} consultas, {sum(q[2] for q in queries) * 1000:.2f} ms em SQL\n\n")
+        for statement, parameters, elapsed in queries:
+            params = repr(parameters)
+            if len(params) > 500:
+                params = params[:500] + "..."
+            f.write(f"-- {elapsed * 1000:.3f} ms\n{statement.strip()}\n-- parâmetros: {params}\n\n")
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila as requisições escolhidas (ver o docstring do módulo)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.token = settings.PROFILE_HEADER_TOKEN.encode() if settings.PROFILE_HEADER_TOKEN else None
+
+    def _wanted(self, scope) -> bool:
+        if settings.PROFILE_REQUESTS:
+            return True
+        return any(name == b"x-profile" and value == self.token for name, value in scope["headers"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "raiz"
+        profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{scope['method']}-{slug}-{uuid.uuid4().hex[:6]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        queries: List[Tuple[str, object, float]] = []
+        token = _query_log.set(queries)
+        sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            _query_log.reset(token)
+            header = f"{scope['method']} {scope['path']}?{scope['query_string'].decode()}  {elapsed * 1000:.2f} ms\n"
+            await asyncio.to_thread(_write, profile_id, sampler.collapsed(), header, queries)
@@ -1,62 +1,109 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi_utils.tasks import repeat_every
+from fastapi.responses import PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from src.bootstrap.database import get_db, SessionLocal
+from src.bootstrap.database import dispose_engine, init_engine
+from src.bootstrap import profiling
+from src.bootstrap.metrics import MetricsMiddleware, render as render_metrics
+from src.bootstrap.profiling import ProfilingMiddleware
 from src.bootstrap.settings import settings
-from src.emails.services import send_emails_with_date, time_to_coffee
+from src.dates.retention import archive_old_dates
+from src.emails.dispatcher import outbox_dispatcher
+from src.emails.pool import smtp_pool
+from src.emails.services import send_emails_with_date, send_weekly_digest, time_to_coffee
+from src.events.services import purge_events
+from src.jobs.runner import job_runner
+from src.migrations import upgrade
 from src.users.routes import router as users_router
 from src.dates.routes import router as dates_router
 from src.emails.routes import router as emails_router
+from src.events.routes import router as events_router
+from src.dashboard.routes import router as dashboard_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine criado aqui, sem conectar: a primeira conexão sai na primeira requisição
+    engine = init_engine()
+    if settings.MIGRATE_ON_STARTUP:
+        await upgrade(engine)
+    job_runner.start()
+    await outbox_dispatcher.start()
+    yield
+    # Desligamento gracioso: espera jobs e envios em andamento, depois fecha as conexões
+    await job_runner.shutdown(settings.SHUTDOWN_GRACE_PERIOD)
+    await outbox_dispatcher.stop(settings.SHUTDOWN_GRACE_PERIOD)
+    await smtp_pool.close()
+    await dispose_engine()
+
 
-app = FastAPI(root_path=settings.ROOT_PATH)
+app = FastAPI(root_path=settings.ROOT_PATH, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Pode restringir isso se quiser
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+if profiling.enabled():
+    app.add_middleware(ProfilingMiddleware)
 
-def daily_email_job():
-    scheduler = AsyncIOScheduler()
+async def remove_old_dates():
+    print("Arquivando datas antigas...")
+    movidas = await archive_old_dates()
+    print(f"{movidas} datas movidas para o arquivo")
 
-    # crie um lambda para chamar a função send_emails_with_date com os parâmetros corretos
+async def remove_old_events():
+    apagados = await purge_events()
+    print(f"{apagados} eventos antigos apagados do feed")
 
-    print("Enviando e-mail de aviso para o próximo dia...")
+app.include_router(users_router)
+app.include_router(dates_router)
+app.include_router(emails_router)
+app.include_router(events_router)
+app.include_router(dashboard_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas deste worker no formato texto do Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
-    scheduler.add_job(
+
+def register_jobs():
+    # Aviso de quem traz o pão no dia seguinte: segundas e quartas às 8h.
+    # Quem optou pelo resumo semanal fica de fora: já recebeu o resumo
+    job_runner.add_job(
+        'daily_email_job',
+        'Enviar e-mail diário às 8h',
         send_emails_with_date,
-        args=[SessionLocal(), 1],  # os parâmetros que você quer passar
         trigger=CronTrigger(
             day_of_week='mon,wed',  # 1=segunda, 3=quarta
-            hour=8, 
-            minute=0, 
+            hour=8,
+            minute=0,
             timezone='America/Sao_Paulo'
-            ),
-        id='daily_email_job',
-        name='Enviar e-mail diário às 8h',
-        replace_existing=True
+        ),
+        args=[1, False],
     )
 
+    # Resumo da semana (pão e café) para quem optou por ele: segundas às 7h30
+    job_runner.add_job(
+        'weekly_digest_job',
+        'Enviar o resumo semanal',
+        send_weekly_digest,
+        trigger=CronTrigger(day_of_week='mon', hour=7, minute=30, timezone='America/Sao_Paulo'),
+        args=[7],
+    )
 
-@app.on_event("startup")
-@repeat_every(seconds=60*60*24)  # a cada 24h
-async def remove_old_dates():
-    print("Removendo datas antigas...")
-    await get_db().execute("DELETE FROM dates WHERE data < NOW()::date")
-
-app.include_router(users_router)
-app.include_router(dates_router)
-app.include_router(emails_router)
-
-def start_scheduler():
-    scheduler = AsyncIOScheduler()
-    
     # Agenda a função time_to_coffee para executar às terças e quintas às 9:15 da manhã
-    scheduler.add_job(
+    job_runner.add_job(
+        'time_to_coffee_job',
+        'Enviar lembretes de café às terças e quintas',
         time_to_coffee,
         trigger=CronTrigger(
             day_of_week='tue,thu',  # 2=terça, 4=quinta
@@ -64,16 +111,23 @@ def start_scheduler():
             minute=15,
             timezone='America/Sao_Paulo'
         ),
-        id='time_to_coffee_job',
-        name='Enviar lembretes de café às terças e quintas',
-        replace_existing=True
     )
-    
-    scheduler.start()
-
-# Inicia o agendador quando a aplicação iniciar
-@app.on_event("startup")
-async def startup_event():
-    start_scheduler()
-    daily_email_job()
-    
+
+    # Arquiva as datas passadas uma vez por dia, de madrugada
+    job_runner.add_job(
+        'remove_old_dates_job',
+        'Arquivar datas antigas',
+        remove_old_dates,
+        trigger=CronTrigger(hour=3, minute=0, timezone='America/Sao_Paulo'),
+    )
+
+    # Eventos do feed além da retenção (EVENTS_RETENTION), de hora em hora
+    job_runner.add_job(
+        'remove_old_events_job',
+        'Apagar eventos antigos do feed',
+        remove_old_events,
+        trigger=CronTrigger(minute=30, timezone='America/Sao_Paulo'),
+    )
+
+
+register_jobs()
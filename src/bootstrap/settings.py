@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -16,9 +17,89 @@ class Settings:
     SMTP_USER = os.getenv("SMTP_USER")
     SMTP_PASS = os.getenv("SMTP_PASS")
     FROM_EMAIL = os.getenv("FROM_EMAIL")
+    SMTP_START_TLS = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 3))
+    SMTP_POOL_HEALTH_CHECK_AFTER = float(os.getenv("SMTP_POOL_HEALTH_CHECK_AFTER", 30))
+    # Templates versionados dos e-mails (<nome>/v<N>/subject.txt, body.txt, body.html)
+    EMAIL_TEMPLATES_DIR = os.getenv(
+        "EMAIL_TEMPLATES_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "emails", "templates"),
+    )
+    # Lembrete do café numa única transação com os destinatários em cópia
+    # oculta, em grupos de até EMAIL_BCC_MAX_RECIPIENTS (limite do provedor).
+    # Só para quem não desativou `cafe_em_cco`; desligado, sai um por pessoa
+    EMAIL_BCC_ENABLED = os.getenv("EMAIL_BCC_ENABLED", "false").lower() == "true"
+    EMAIL_BCC_MAX_RECIPIENTS = int(os.getenv("EMAIL_BCC_MAX_RECIPIENTS", 50))
+
+    OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 3))
+    # Limite do provedor SMTP para a aplicação inteira: em produção cada
+    # worker envia a OUTBOX_RATE_PER_SECOND / WEB_CONCURRENCY
+    OUTBOX_RATE_PER_SECOND = float(os.getenv("OUTBOX_RATE_PER_SECOND", 2))
+    OUTBOX_BURST = int(os.getenv("OUTBOX_BURST", 5))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", 30))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 10))
+    OUTBOX_CLAIM_TIMEOUT = float(os.getenv("OUTBOX_CLAIM_TIMEOUT", 300))
 
     ROOT_PATH = os.getenv('ROOT_PATH', '/')
 
-    DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+    # "production" sobe vários workers sem reload; "development" usa reload
+    SERVER_MODE = os.getenv("SERVER_MODE", "development")
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 2))
+
+    # Tempo para terminar requisições, envios e jobs em andamento ao desligar
+    SHUTDOWN_GRACE_PERIOD = float(os.getenv("SHUTDOWN_GRACE_PERIOD", 20))
+    # Aplica as migrações no lifespan; com vários workers prefira `python -m src.migrations`
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+    # Lease curto, renovado a cada terço enquanto o job roda
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 30))
+    JOB_MISFIRE_GRACE = float(os.getenv("JOB_MISFIRE_GRACE", 600))
+
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 500))
+    RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", 0.5))
+
+    USERS_BULK_BATCH_SIZE = int(os.getenv("USERS_BULK_BATCH_SIZE", 500))
+    # Validade máxima do índice de escalados por dia (escritas em outras máquinas)
+    ROSTER_INDEX_TTL = float(os.getenv("ROSTER_INDEX_TTL", 60))
+
+    # Feed de alterações (GET /events): polling da tabela events enquanto
+    # houver clientes, limites por cliente e retenção para quem reconecta
+    EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", 1))
+    EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", 15))
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 1000))
+    EVENTS_RESUME_LIMIT = int(os.getenv("EVENTS_RESUME_LIMIT", 1000))
+    EVENTS_RETENTION = float(os.getenv("EVENTS_RETENTION", 86400))
+    # Quanto esperar por um id que falta na sequência (transação ainda sem
+    # commit) antes de seguir sem ele (transação desfeita)
+    EVENTS_GAP_GRACE = float(os.getenv("EVENTS_GAP_GRACE", 10))
+
+    # Painel (index.html) servido pela API: saída de `python -m src.dashboard.build`
+    # e o CLI standalone do Tailwind v3 usado nele
+    DASHBOARD_DIST_DIR = os.getenv(
+        "DASHBOARD_DIST_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard", "dist"),
+    )
+    TAILWIND_BIN = os.getenv("TAILWIND_BIN", "tailwindcss")
+
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    # Validade máxima de uma resposta em cache (escritas em outras máquinas)
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+    # Profiling sob demanda: todas as requisições, ou só as com `X-Profile: <token>`
+    PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
+    PROFILE_HEADER_TOKEN = os.getenv("PROFILE_HEADER_TOKEN", "")
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.001))
+
+    # Versões das tabelas compartilhadas entre os workers da máquina
+    CACHE_VERSION_DIR = os.getenv("CACHE_VERSION_DIR", os.path.join(tempfile.gettempdir(), "buy_bread-cache"))
+
+    # Driver assíncrono para MySQL; sem MYSQL_HOST cai para um SQLite local (aiosqlite)
+    if MYSQL_HOST:
+        DATABASE_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+    else:
+        DATABASE_URL = os.getenv("SQLITE_URL", "sqlite+aiosqlite:///./buy_bread.db")
 
 settings = Settings()
\ No newline at end of file
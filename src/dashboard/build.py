@@ -0,0 +1,99 @@
+"""
+Build do painel (index.html) servido pela própria API:
+
+    python -m src.dashboard.build
+
+1. Gera o CSS do Tailwind só com as classes usadas no index.html, já
+   minificado, com o CLI standalone do Tailwind v3 (TAILWIND_BIN)
+2. Grava o CSS com o hash do conteúdo no nome (assets/dashboard.<hash>.css)
+   e troca o script do Tailwind JIT (CDN) pelo <link> para ele
+3. Grava ao lado de cada arquivo as versões .gz e .br (a .br só com o pacote
+   `brotli` instalado)
+
+O resultado vai para DASHBOARD_DIST_DIR, trocado de uma vez no fim.
+"""
+import gzip
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from src.bootstrap.settings import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SOURCE = os.path.join(ROOT, "index.html")
+TAILWIND_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tailwind.css")
+CDN_SCRIPT = '<script src="https://cdn.tailwindcss.com"></script>'
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build_css() -> bytes:
+    """CSS com apenas as classes encontradas no index.html (HTML e JS), minificado."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "dashboard.css")
+        subprocess.run(
+            [*shlex.split(settings.TAILWIND_BIN), "-i", TAILWIND_INPUT, "-o", output, "--content", SOURCE, "--minify"],
+            check=True,
+        )
+        with open(output, "rb") as f:
+            return f.read()
+
+
+def _write(path: str, data: bytes) -> list:
+    """Grava o arquivo e as versões pré-comprimidas. Retorna (nome, bytes) de cada uma."""
+    variants = [(path, data), (path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((path + ".br", brotli.compress(data, quality=11)))
+    for name, content in variants:
+        with open(name, "wb") as f:
+            f.write(content)
+    return variants
+
+
+def build(dist: str = settings.DASHBOARD_DIST_DIR) -> list:
+    with open(SOURCE, encoding="utf-8") as f:
+        html = f.read()
+    if CDN_SCRIPT not in html:
+        raise RuntimeError(f"{SOURCE} não carrega o Tailwind da CDN; nada para substituir")
+
+    css = build_css()
+    css_name = f"dashboard.{content_hash(css)}.css"
+    # Caminho relativo: funciona atrás do ROOT_PATH do proxy
+    html = html.replace(CDN_SCRIPT, f'<link rel="stylesheet" href="assets/{css_name}">')
+
+    staging = dist + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, "assets"))
+    written = _write(os.path.join(staging, "index.html"), html.encode("utf-8"))
+    written += _write(os.path.join(staging, "assets", css_name), css)
+
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(staging, dist)
+    return [(os.path.relpath(name, staging), len(content)) for name, content in written]
+
+
+def main():
+    try:
+        arquivos = build()
+    except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Build do painel falhou: {e}", file=sys.stderr)
+        sys.exit(1)
+    for name, size in arquivos:
+        print(f"{size:>9} bytes  {name}")
+    if brotli is None:
+        print("Pacote brotli não instalado: sem as versões .br")
+
+
+if __name__ == "__main__":
+    main()
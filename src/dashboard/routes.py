@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from src.dashboard.services import dashboard_assets
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/")
+async def dashboard(request: Request):
+    """Painel de cadastro (index.html). As chamadas à API saem do mesmo caminho."""
+    return dashboard_assets.response(request, "index.html")
+
+
+@router.get("/assets/{name}")
+async def dashboard_asset(name: str, request: Request):
+    """CSS do painel com o hash do conteúdo no nome, em cache por um ano."""
+    response = dashboard_assets.response(request, f"assets/{name}")
+    if response is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return response
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from src.bootstrap.cache import etag_matches
+from src.bootstrap.settings import settings
+from src.dashboard.build import SOURCE
+
+# Nomes com hash do conteúdo nunca mudam: o navegador guarda por um ano sem revalidar
+IMMUTABLE = "public, max-age=31536000, immutable"
+# O index.html muda a cada build com o mesmo nome: revalida sempre (304 com o ETag)
+REVALIDATE = "no-cache"
+# Preferência quando o cliente aceita mais de uma
+ENCODINGS = ("br", "gzip")
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class Asset(NamedTuple):
+    media_type: str
+    cache_control: str
+    # "" (sem compressão), "gzip", "br" -> conteúdo e ETag daquela versão
+    variants: Dict[str, Variant]
+
+
+def _variant(body: bytes) -> Variant:
+    # Hash de cada versão: gzip e br têm ETags diferentes, como pede o HTTP
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return Variant(body, f'"{digest}"')
+
+
+def _accepted(header: str) -> set:
+    aceitas = set()
+    for item in header.split(","):
+        token, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        aceitas.add(token.strip().lower())
+    return aceitas
+
+
+class DashboardAssets:
+    """
+    Arquivos do painel gerados por `python -m src.dashboard.build`, lidos do
+    disco uma vez e servidos da memória, com a versão .br ou .gz conforme o
+    Accept-Encoding e um ETag por versão.
+
+    Sem build (desenvolvimento), serve o index.html da raiz como está, ainda
+    com o Tailwind da CDN.
+    """
+
+    def __init__(self, dist: str):
+        self.dist = dist
+        self._assets: Optional[Dict[str, Asset]] = None
+
+    def _load(self) -> Dict[str, Asset]:
+        assets: Dict[str, Asset] = {}
+        if not os.path.isfile(os.path.join(self.dist, "index.html")):
+            print(f"Painel sem build em {self.dist}: servindo {SOURCE} com o Tailwind da CDN")
+            with open(SOURCE, "rb") as f:
+                body = f.read()
+            assets["index.html"] = Asset("text/html; charset=utf-8", REVALIDATE, {
+                "": _variant(body), "gzip": _variant(gzip.compress(body)),
+            })
+            return assets
+
+        for folder, _, files in os.walk(self.dist):
+            for filename in files:
+                path = os.path.join(folder, filename)
+                name, ext = os.path.splitext(os.path.relpath(path, self.dist).replace(os.sep, "/"))
+                encoding = {".gz": "gzip", ".br": "br"}.get(ext, "")
+                if not encoding:
+                    name += ext
+                with open(path, "rb") as f:
+                    body = f.read()
+                asset = assets.get(name)
+                if asset is None:
+                    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    cache_control = REVALIDATE if name == "index.html" else IMMUTABLE
+                    asset = assets[name] = Asset(media_type, cache_control, {})
+                asset.variants[encoding] = _variant(body)
+        return assets
+
+    def get(self, name: str) -> Optional[Asset]:
+        if self._assets is None:
+            self._assets = self._load()
+        asset = self._assets.get(name)
+        # Versões comprimidas sem o original não são servidas
+        return asset if asset is not None and "" in asset.variants else None
+
+    def response(self, request: Request, name: str) -> Optional[Response]:
+        """Resposta para o arquivo `name` (relativo ao dist), ou None se ele não existe."""
+        asset = self.get(name)
+        if asset is None:
+            return None
+        aceitas = _accepted(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ENCODINGS if e in aceitas and e in asset.variants), "")
+        variant = asset.variants[encoding]
+
+        headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request, variant.etag):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=variant.body, media_type=asset.media_type, headers=headers)
+
+
+dashboard_assets = DashboardAssets(settings.DASHBOARD_DIST_DIR)
@@ -1,14 +1,61 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Boolean, Index, String, Enum
 from sqlalchemy.orm import relationship
 
 from src.bootstrap.database import Base
+from src.users.enums import DiasResponsavel
 
 
 class Dates(Base):
     __tablename__ = "dates"
+    __table_args__ = (
+        Index("ix_dates_data_user_id", "data", "user_id"),
+        Index("ix_dates_foi_avisado_data", "foi_avisado", "data"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data = Column(Date, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     foi_avisado = Column(Boolean, default=False)
-    user = relationship("User", back_populates="dates")
\ No newline at end of file
+    user = relationship("User", back_populates="dates")
+
+
+class DatesArchive(Base):
+    """Datas passadas retiradas de `dates` pela rotina de retenção."""
+    __tablename__ = "dates_archive"
+    __table_args__ = (
+        Index("ix_dates_archive_data", "data"),
+        Index("ix_dates_archive_user_id", "user_id"),
+    )
+
+    # Mesmo id da linha original; sem FK para o histórico sobreviver à exclusão do usuário
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(Date, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    foi_avisado = Column(Boolean, default=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ScheduleView(Base):
+    """
+    Escala desnormalizada: cada data já com os dados do usuário, para as
+    leituras não precisarem de join. Mantida pelas rotas de escrita na mesma
+    transação (ver `src.dates.schedule`); `python -m src.dates.schedule`
+    reconstrói a tabela a partir de `dates` e `users`.
+    """
+    __tablename__ = "schedule_view"
+    __table_args__ = (
+        Index("ix_schedule_view_data_id", "data", "id"),
+        Index("ix_schedule_view_user_id", "user_id"),
+        Index("ix_schedule_view_foi_avisado_data", "foi_avisado", "data"),
+    )
+
+    # Mesmo id da data em `dates`
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(Date, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    nome = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False)
+    dias_responsavel = Column(Enum(DiasResponsavel), nullable=False)
+    foi_avisado = Column(Boolean, default=False)
@@ -1,6 +1,7 @@
 from datetime import date
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 from src.users.models import UserOut
 from src.dates.entity import Dates
@@ -29,3 +30,44 @@ class DateOut(BaseModel):
             user=UserOut.from_orm(data.user),
             foi_avisado=data.foi_avisado,
         )
+
+    @classmethod
+    def from_schedule(cls, row):
+        """A partir de uma linha de `date_rows_query()` (schedule_view)."""
+        return cls(
+            id=row.id,
+            data=row.data,
+            user=UserOut(id=row.user_id, nome=row.nome, email=row.email, dias_responsavel=row.dias_responsavel),
+            foi_avisado=row.foi_avisado,
+        )
+
+
+class DateOperation(BaseModel):
+    """
+    Uma operação do lote: `create` (data e user_id), `update` (id e os
+    campos a mudar) ou `delete` (id).
+    """
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Optional[date] = None
+    user_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op == "create":
+            if self.id is not None or self.data is None or self.user_id is None:
+                raise ValueError("create exige data e user_id, sem id")
+        elif self.id is None:
+            raise ValueError(f"{self.op} exige id")
+        elif self.op == "update" and self.data is None and self.user_id is None:
+            raise ValueError("update exige data ou user_id")
+        return self
+
+
+class DateBatch(BaseModel):
+    operacoes: List[DateOperation] = Field(min_length=1, max_length=1000)
+
+
+class DateBatchResult(BaseModel):
+    datas: List[DateOut]  # datas criadas e alteradas, em ordem de (data, id)
+    apagadas: List[int]
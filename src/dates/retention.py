@@ -0,0 +1,57 @@
+import asyncio
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+
+from src.bootstrap.cache import bump_version
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.settings import settings
+from src.dates.entity import Dates, DatesArchive, ScheduleView
+
+
+async def archive_old_dates(
+    before: Optional[date] = None,
+    batch_size: int = settings.RETENTION_BATCH_SIZE,
+    pause: float = settings.RETENTION_BATCH_PAUSE,
+) -> int:
+    """
+    Move as datas anteriores a `before` (padrão: hoje) de `dates` para
+    `dates_archive`, em lotes de `batch_size` linhas.
+
+    Cada lote copia e apaga as mesmas linhas numa transação curta, com uma
+    pausa de `pause` segundos entre lotes para não segurar locks na tabela.
+    Se a rotina for interrompida, basta rodá-la de novo: ela continua das
+    linhas que ainda estão em `dates`.
+
+    Returns:
+        Quantidade de linhas movidas.
+    """
+    before = before or date.today()
+    movidas = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Dates.id, Dates.data, Dates.user_id, Dates.foi_avisado)
+                .filter(Dates.data < before)
+                .order_by(Dates.data, Dates.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+
+            agora = datetime.utcnow()
+            await db.execute(insert(DatesArchive), [
+                {"id": r.id, "data": r.data, "user_id": r.user_id, "foi_avisado": r.foi_avisado, "archived_at": agora}
+                for r in rows
+            ])
+            await db.execute(delete(Dates).where(Dates.id.in_([r.id for r in rows])))
+            await db.execute(delete(ScheduleView).where(ScheduleView.id.in_([r.id for r in rows])))
+            await db.commit()
+
+        movidas += len(rows)
+        bump_version("dates")
+        if len(rows) < batch_size:
+            break
+        await asyncio.sleep(pause)
+    return movidas
@@ -1,136 +1,335 @@
-from datetime import date, timedelta
-from typing import List
+from datetime import date
+from typing import List, Optional, Tuple
 
-from fastapi import Depends, APIRouter, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, and_, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.bootstrap.database import get_db, SessionLocal
-from src.dates.entity import Dates
-from src.dates.models import DateOut, DateCreate
+from src.bootstrap.cache import bump_version, cached_response
+from src.bootstrap.database import AsyncSessionLocal, get_db
+from src.dates.entity import Dates, ScheduleView
+from src.dates.models import DateBatch, DateBatchResult, DateOut, DateCreate
+from src.dates.schedule import rebuild_schedule, refresh_schedule
+from src.dates.services import DIAS_DO_CAFE, date_rows_query, distribuir_datas, dump_date_row, dump_date_row_line, dump_date_rows
+from src.events.services import date_delta, event_bus, publish
+from src.jobs.entity import JobRun
+from src.jobs.models import JobRunOut, JobSubmitted
+from src.jobs.runner import job_runner
 from src.users.entity import User
-from src.users.enums import DiasResponsavel
+from src.users.roster import roster_index
 
 router = APIRouter(prefix='/dates')
 
 
-def gerar_datas_automaticas(db: Session):
+async def gerar_datas_automaticas(db: AsyncSession, anos: Optional[int] = None):
+    """
+    Recria a escala de quem traz o pão a partir de hoje.
+
+    Args:
+        anos: horizonte em anos; sem ele, a escala vai até o fim do ano atual.
+    """
     hoje = date.today()
-    fim_ano = date(hoje.year, 12, 31)
+    if anos:
+        fim = date(hoje.year + anos, hoje.month, 28 if (hoje.month, hoje.day) == (2, 29) else hoje.day)
+    else:
+        fim = date(hoje.year, 12, 31)
 
-    # Pega todos usuários
-    usuarios = db.query(User).all()
+    # Todos os usuários e seus dias, do índice em memória
+    usuarios = (await roster_index.get(db)).usuarios
+    atribuicoes = distribuir_datas(usuarios, hoje, fim)
 
-    # Limpa datas anteriores para evitar duplicações (opcional)
-    db.query(Dates).delete()
-    db.commit()
+    # Limpa datas anteriores para evitar duplicações e grava tudo num único INSERT
+    await db.execute(delete(Dates))
+    if atribuicoes:
+        await db.execute(insert(Dates), [{"data": dia, "user_id": user_id} for dia, user_id in atribuicoes])
+    await rebuild_schedule(db)
+    # Escala inteira refeita: um reset sai mais barato que um delta por data
+    await publish(db, [("reset", {"tabelas": ["dates"]})])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
 
-    # Contador para balancear a escolha dos usuários
-    contador_usuarios = {u.id: 0 for u in usuarios}
 
-    # Itera de hoje até fim do ano
-    dia_atual = hoje
-    while dia_atual <= fim_ano:
-        weekday = dia_atual.weekday()  # 0=segunda, 1=terça, ..., 3=quinta
+GERAR_DATAS_JOB = "create_balanced_dates"
 
-        # Só terça (1) e quinta (3)
-        if weekday in [1, 3]:
-            # Filtra usuários que podem ir nesse dia
-            if weekday == 1:
-                candidatos = [u for u in usuarios if u.dias_responsavel in [DiasResponsavel.terca, DiasResponsavel.terca_quinta]]
-            else:
-                candidatos = [u for u in usuarios if u.dias_responsavel in [DiasResponsavel.quinta, DiasResponsavel.terca_quinta]]
 
-            if candidatos:
-                # Escolhe o usuário com menos datas já atribuídas
-                escolhido = min(candidatos, key=lambda u: contador_usuarios[u.id])
+async def _gerar_datas_job(anos: Optional[int]):
+    # Sessão própria: roda em background, depois que a requisição já respondeu
+    async with AsyncSessionLocal() as db:
+        await gerar_datas_automaticas(db, anos)
 
-                # Cria data para o escolhido
-                nova_data = Dates(data=dia_atual, user_id=escolhido.id)
-                db.add(nova_data)
-                contador_usuarios[escolhido.id] += 1
 
-        dia_atual += timedelta(days=1)
+@router.post("/create-balanced-dates/", response_model=JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
+async def create_balanced_dates(
+    request: Request,
+    response: Response,
+    anos: Optional[int] = Query(None, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Agenda a recriação da escala e responde na hora com o id da execução;
+    acompanhe em `GET /dates/create-balanced-dates/{id}`.
 
-    db.commit()
+    Só uma geração roda por vez em todos os workers: pedidos feitos enquanto
+    outra está em andamento recebem o id dela (`coalescido: true`), mesmo que
+    peçam outro horizonte de `anos`.
+    """
+    run_id, iniciado = await job_runner.submit(GERAR_DATAS_JOB, _gerar_datas_job, args=[anos])
+    run = await db.get(JobRun, run_id) if run_id is not None else None
+    if run is None:
+        raise HTTPException(status_code=409, detail="Outra geração de datas está em andamento")
 
+    response.headers["Location"] = str(request.url_for("get_balanced_dates_job", run_id=run.id))
+    if not iniciado:
+        message = "Já existe uma geração de datas em andamento; acompanhe a mesma execução."
+    elif anos:
+        message = f"Criando e distribuindo datas balanceadamente para os próximos {anos} anos."
+    else:
+        message = "Criando e distribuindo datas balanceadamente até o final do ano."
+    return JobSubmitted(message=message, job=JobRunOut.model_validate(run), coalescido=not iniciado)
 
-@router.post("/create-balanced-dates/", status_code=status.HTTP_201_CREATED)
-def create_balanced_dates(db: Session = Depends(get_db)):
-    try:
-        gerar_datas_automaticas(db)
-        return {"message": "Datas criadas e distribuídas balanceadamente até o final do ano."}
-    except Exception as e:
-        return {"error": str(e)}
+
+@router.get("/create-balanced-dates/{run_id}", response_model=JobRunOut, name="get_balanced_dates_job")
+async def get_balanced_dates_job(run_id: int, db: AsyncSession = Depends(get_db)):
+    """Situação de uma geração de datas: executando, sucesso ou erro."""
+    run = await db.get(JobRun, run_id)
+    if not run or run.job_id != GERAR_DATAS_JOB:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    return run
 
 
 @router.delete("/{date_id}")
-def delete_date(date_id: int):
-    db = SessionLocal()
-    date = db.query(Dates).filter(Dates.id == date_id).first()
+async def delete_date(date_id: int, db: AsyncSession = Depends(get_db)):
+    date = await db.get(Dates, date_id)
     if not date:
-        db.close()
         raise HTTPException(status_code=404, detail="Data não encontrada")
-    db.delete(date)
-    db.commit()
-    db.close()
+    await db.delete(date)
+    await refresh_schedule(db, date_ids=[date_id])
+    await publish(db, [("date.deleted", {"id": date_id})])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
     return {"message": "Data deletada"}
 
 
+async def _get_schedule_row(db: AsyncSession, date_id: int) -> Optional[Row]:
+    return (await db.execute(date_rows_query().filter(ScheduleView.id == date_id))).first()
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        data, date_id = cursor.split("_", 1)
+        return date.fromisoformat(data), int(date_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _encode_cursor(d) -> str:
+    return f"{d.data.isoformat()}_{d.id}"
+
+
 @router.get("/", response_model=List[DateOut])
-def get_dates():
-    db = SessionLocal()
-    dates = db.query(Dates).options(joinedload(Dates.user)).order_by(Dates.data).all()
-    db.close()
-    return [DateOut.from_orm_with_timezone(d) for d in dates]
+async def get_dates(
+    request: Request,
+    data_inicio: Optional[date] = Query(None, alias="from"),
+    data_fim: Optional[date] = Query(None, alias="to"),
+    user_id: Optional[int] = None,
+    foi_avisado: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    formato: Optional[str] = Query(None, alias="format", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Lista as datas em ordem de (data, id).
+
+    Parâmetros:
+    - from / to: intervalo de datas (inclusive)
+    - user_id, foi_avisado: filtros opcionais
+    - limit / cursor: paginação por keyset; quando há mais páginas, o cursor
+      da próxima vem no cabeçalho `X-Next-Cursor`
+    - format=ndjson: devolve uma linha JSON por data, lidas do banco aos poucos
+    """
+    # Só as colunas necessárias, em tuplas: nada de identity map nem modelos Pydantic por linha
+    query = date_rows_query().order_by(ScheduleView.data, ScheduleView.id)
+    if data_inicio is not None:
+        query = query.filter(ScheduleView.data >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(ScheduleView.data <= data_fim)
+    if user_id is not None:
+        query = query.filter(ScheduleView.user_id == user_id)
+    if foi_avisado is not None:
+        query = query.filter(ScheduleView.foi_avisado.is_(foi_avisado))
+    if cursor:
+        cursor_data, cursor_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            ScheduleView.data > cursor_data,
+            and_(ScheduleView.data == cursor_data, ScheduleView.id > cursor_id),
+        ))
+
+    if formato == "ndjson":
+        if limit:
+            query = query.limit(limit)
+        return StreamingResponse(_stream_dates(query), media_type="application/x-ndjson")
+
+    async def build(headers):
+        if limit:
+            # Busca um a mais só para saber se existe próxima página
+            rows = (await db.execute(query.limit(limit + 1))).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+        else:
+            rows = (await db.execute(query)).all()
+        return dump_date_rows(rows)
+    return await cached_response(request, ("dates", "users"), build)
+
+
+async def _stream_dates(query):
+    # Sessão própria: a do Depends pode ser fechada antes do fim do streaming
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=500))
+        async for partition in result.partitions():
+            yield b"".join(dump_date_row_line(row) for row in partition)
 
 @router.get("/{date_id}", response_model=DateOut)
-def get_date(date_id: int):
-    db = SessionLocal()
-    date = db.query(Dates).options(joinedload(Dates.user)).filter(Dates.id == date_id).first()
-    db.close()
-    if not date:
-        raise HTTPException(status_code=404, detail="Data não encontrada")
-    return DateOut.from_orm_with_timezone(date)
+async def get_date(date_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build(headers):
+        row = await _get_schedule_row(db, date_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Data não encontrada")
+        return dump_date_row(row)
+    return await cached_response(request, ("dates", "users"), build)
 
 
 @router.delete("/")
-def delete_all_dates():
-    db = SessionLocal()
-    deleted = db.query(Dates).delete()
-    db.commit()
-    db.close()
-    return {"message": f"{deleted} datas deletadas"}
+async def delete_all_dates(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(delete(Dates))
+    await db.execute(delete(ScheduleView))
+    await publish(db, [("reset", {"tabelas": ["dates"]})])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
+    return {"message": f"{result.rowcount} datas deletadas"}
 
 
 @router.post("/", response_model=DateOut)
-def create_date(date_in: DateCreate):
-    db = SessionLocal()
-    user = db.query(User).filter(User.id == date_in.user_id).first()
+async def create_date(date_in: DateCreate, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, date_in.user_id)
     if not user:
-        db.close()
         raise HTTPException(status_code=400, detail="Usuário não existe")
     db_date = Dates(data=date_in.data, user_id=date_in.user_id)
     db.add(db_date)
-    db.commit()
-    db_date = db.query(Dates).options(joinedload(Dates.user)).filter(Dates.id == db_date.id).first()
-    db.close()
-    return DateOut.from_orm_with_timezone(db_date)
+    await db.flush()
+    await refresh_schedule(db, date_ids=[db_date.id])
+    await publish(db, [("date.created", date_delta(db_date))])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
+    return DateOut.from_schedule(await _get_schedule_row(db, db_date.id))
+
+@router.post("/batch", response_model=DateBatchResult)
+async def batch_dates(batch: DateBatch, db: AsyncSession = Depends(get_db)):
+    """
+    Aplica várias criações, alterações e exclusões de datas numa única
+    transação: ou todas entram, ou nenhuma.
+
+    Os usuários e as datas referenciados são conferidos com uma consulta
+    `IN` cada, e as datas resultantes voltam de um único SELECT com o usuário.
+    Cada data criada ou alterada precisa cair num dia que o responsável cobre
+    (terça, quinta ou os dois, conforme `dias_responsavel`).
+    """
+    creates = [op for op in batch.operacoes if op.op == "create"]
+    updates = [op for op in batch.operacoes if op.op == "update"]
+    deletes = [op.id for op in batch.operacoes if op.op == "delete"]
+
+    date_ids = [op.id for op in updates] + deletes
+    repetidas = sorted({i for i in date_ids if date_ids.count(i) > 1})
+    if repetidas:
+        raise HTTPException(status_code=400, detail=f"Datas com mais de uma operação: {repetidas}")
+
+    encontradas = {}
+    if date_ids:
+        encontradas = {
+            date_id: (data, user_id)
+            for date_id, data, user_id in await db.execute(
+                select(Dates.id, Dates.data, Dates.user_id).filter(Dates.id.in_(date_ids))
+            )
+        }
+        faltando = sorted(set(date_ids) - set(encontradas))
+        if faltando:
+            raise HTTPException(status_code=404, detail=f"Datas não encontradas: {faltando}")
+
+    # Data e responsável finais de cada criação e alteração (a alteração pode
+    # mudar só um dos dois)
+    resultantes = [(op.data, op.user_id) for op in creates] + [
+        (
+            op.data if op.data is not None else encontradas[op.id][0],
+            op.user_id if op.user_id is not None else encontradas[op.id][1],
+        )
+        for op in updates
+    ]
+    user_ids = {user_id for _, user_id in resultantes}
+    if user_ids:
+        dias = dict((await db.execute(
+            select(User.id, User.dias_responsavel).filter(User.id.in_(user_ids))
+        )).all())
+        faltando = sorted(user_ids - set(dias))
+        if faltando:
+            raise HTTPException(status_code=400, detail=f"Usuários não existem: {faltando}")
+        # Mesma regra da escala: ninguém fica com um dia que não cobre
+        fora = sorted({
+            f"{data.isoformat()} (usuário {user_id})"
+            for data, user_id in resultantes
+            if dias[user_id] not in DIAS_DO_CAFE.get(data.weekday(), ())
+        })
+        if fora:
+            raise HTTPException(status_code=400, detail=f"Datas fora dos dias do usuário: {fora}")
+
+    if deletes:
+        await db.execute(delete(Dates).where(Dates.id.in_(deletes)))
+    if updates:
+        await db.execute(update(Dates), [
+            {"id": op.id, **op.model_dump(include={"data", "user_id"}, exclude_none=True)} for op in updates
+        ])
+    novas = [Dates(data=op.data, user_id=op.user_id) for op in creates]
+    db.add_all(novas)
+    await db.flush()
+    await refresh_schedule(db, date_ids=date_ids + [d.id for d in novas])
+    await publish(db, [
+        *(("date.deleted", {"id": date_id}) for date_id in deletes),
+        *(("date.updated", {"id": op.id, **op.model_dump(include={"data", "user_id"}, exclude_none=True)}) for op in updates),
+        *(("date.created", date_delta(d)) for d in novas),
+    ])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
+
+    ids = [op.id for op in updates] + [d.id for d in novas]
+    datas = []
+    if ids:
+        datas = (await db.execute(
+            date_rows_query()
+            .filter(ScheduleView.id.in_(ids))
+            .order_by(ScheduleView.data, ScheduleView.id)
+        )).all()
+    return DateBatchResult(datas=[DateOut.from_schedule(d) for d in datas], apagadas=deletes)
 
 @router.put("/{date_id}", response_model=DateOut)
-def update_date(date_id: int, date_in: DateCreate):
-    db = SessionLocal()
-    db_date = db.query(Dates).filter(Dates.id == date_id).first()
+async def update_date(date_id: int, date_in: DateCreate, db: AsyncSession = Depends(get_db)):
+    db_date = await db.get(Dates, date_id)
     if not db_date:
-        db.close()
         raise HTTPException(status_code=404, detail="Data não encontrada")
-    user = db.query(User).filter(User.id == date_in.user_id).first()
+    user = await db.get(User, date_in.user_id)
     if not user:
-        db.close()
         raise HTTPException(status_code=400, detail="Usuário não existe")
     db_date.data = date_in.data
     db_date.user_id = date_in.user_id
-    db.commit()
-    db_date = db.query(Dates).options(joinedload(Dates.user)).filter(Dates.id == db_date.id).first()
-    db.close()
-    return DateOut.from_orm_with_timezone(db_date)
\ No newline at end of file
+    await refresh_schedule(db, date_ids=[date_id])
+    await publish(db, [("date.updated", {"id": date_id, "data": date_in.data, "user_id": date_in.user_id})])
+    await db.commit()
+    bump_version("dates")
+    event_bus.wake()
+    return DateOut.from_schedule(await _get_schedule_row(db, date_id))
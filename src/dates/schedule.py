@@ -0,0 +1,74 @@
+"""
+Manutenção da tabela `schedule_view` (escala desnormalizada).
+
+As rotas que escrevem em `dates` ou `users` chamam `refresh_schedule` com as
+datas e os usuários afetados antes do commit, então o read model muda na
+mesma transação da escrita. Se ele sair de sincronia (escrita direta no
+banco, bug), reconstrua tudo com:
+
+    python -m src.dates.schedule
+"""
+import asyncio
+from typing import Iterable
+
+from sqlalchemy import Select, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bootstrap.cache import bump_version
+from src.bootstrap.database import AsyncSessionLocal, dispose_engine, init_engine
+from src.dates.entity import Dates, ScheduleView
+from src.users.entity import User
+
+_COLUMNS = ("id", "data", "user_id", "nome", "email", "dias_responsavel", "foi_avisado")
+
+
+def _source() -> Select:
+    # O único join que sobra: só nas escritas, para montar as linhas do read model
+    return select(
+        Dates.id, Dates.data, Dates.user_id, User.nome, User.email, User.dias_responsavel, Dates.foi_avisado
+    ).join(Dates.user)
+
+
+async def refresh_schedule(db: AsyncSession, date_ids: Iterable[int] = (), user_ids: Iterable[int] = ()):
+    """
+    Regrava em `schedule_view` as datas `date_ids` e todas as datas dos
+    usuários `user_ids`, copiando de `dates` + `users`. Datas ou usuários
+    apagados simplesmente somem do read model. Não faz commit.
+    """
+    date_ids, user_ids = list(set(date_ids)), list(set(user_ids))
+    if not date_ids and not user_ids:
+        return
+    # As alterações ORM pendentes precisam estar no banco antes do INSERT ... SELECT
+    await db.flush()
+
+    alvo, origem = [], []
+    if date_ids:
+        alvo.append(ScheduleView.id.in_(date_ids))
+        origem.append(Dates.id.in_(date_ids))
+    if user_ids:
+        alvo.append(ScheduleView.user_id.in_(user_ids))
+        origem.append(Dates.user_id.in_(user_ids))
+    await db.execute(delete(ScheduleView).where(or_(*alvo)))
+    await db.execute(insert(ScheduleView).from_select(_COLUMNS, _source().where(or_(*origem))))
+
+
+async def rebuild_schedule(db: AsyncSession) -> int:
+    """Recria `schedule_view` inteira a partir de `dates` e `users`. Não faz commit."""
+    await db.flush()
+    await db.execute(delete(ScheduleView))
+    await db.execute(insert(ScheduleView).from_select(_COLUMNS, _source()))
+    return (await db.execute(select(func.count()).select_from(ScheduleView))).scalar()
+
+
+async def main():
+    init_engine()
+    async with AsyncSessionLocal() as db:
+        linhas = await rebuild_schedule(db)
+        await db.commit()
+    bump_version("dates")
+    print(f"schedule_view reconstruída: {linhas} datas")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
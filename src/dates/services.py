@@ -1,21 +1,347 @@
+import heapq
 from datetime import date, timedelta, timezone
+from typing import Dict, Iterable, List, Sequence, Tuple
 
-from sqlalchemy.orm import Session, joinedload
+import orjson
+from sqlalchemy import Row, Select, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.dates.entity import Dates
+from src.dates.entity import Dates, ScheduleView
+from src.dates.schedule import refresh_schedule
+from src.events.services import publish
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
 
 UTC_MINUS_3 = timezone(timedelta(hours=-3))
 
-def get_dates_to_notify(db: Session, days: int = 1):
+# Dias de café (0=segunda, 1=terça, 3=quinta) e quem pode levar pão em cada um
+DIAS_DO_CAFE = {
+    1: (DiasResponsavel.terca, DiasResponsavel.terca_quinta),
+    3: (DiasResponsavel.quinta, DiasResponsavel.terca_quinta),
+}
+
+# Colunas das listagens de datas, na ordem dos campos de DateOut e UserOut
+DATE_ROW_COLUMNS = (
+    ScheduleView.id,
+    ScheduleView.data,
+    ScheduleView.foi_avisado,
+    ScheduleView.user_id,
+    ScheduleView.nome,
+    ScheduleView.email,
+    ScheduleView.dias_responsavel,
+)
+
+
+def date_rows_query() -> Select:
+    """SELECT das colunas usadas nas listagens, direto de `schedule_view` (sem join nem objetos ORM)."""
+    return select(*DATE_ROW_COLUMNS)
+
+
+def _date_row(row: Row) -> dict:
+    # Mesmas chaves e ordem de DateOut, para o JSON sair idêntico
+    return {
+        "id": row.id,
+        "data": row.data,
+        "user": {
+            "id": row.user_id,
+            "nome": row.nome,
+            "email": row.email,
+            "dias_responsavel": row.dias_responsavel.value,
+        },
+        "foi_avisado": row.foi_avisado,
+    }
+
+
+def dump_date_rows(rows: Sequence[Row]) -> bytes:
+    """Lista de datas em JSON, byte a byte igual à serialização de List[DateOut]."""
+    return orjson.dumps([_date_row(row) for row in rows])
+
+
+def dump_date_row(row: Row) -> bytes:
+    return orjson.dumps(_date_row(row))
+
+
+def dump_date_row_line(row: Row) -> bytes:
+    return orjson.dumps(_date_row(row), option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def get_dates_to_notify(db: AsyncSession, days: int = 1) -> Sequence[Row]:
+    """Datas de hoje até `days` dias à frente, já com nome e e-mail do responsável."""
     hoje = date.today()
     fim = hoje + timedelta(days=days)
-    return (
-        db.query(Dates)
-        .options(joinedload(Dates.user))
+    result = await db.execute(
+        date_rows_query()
         .filter(
-            Dates.data >= hoje,
-            Dates.data <= fim
+            ScheduleView.data >= hoje,
+            ScheduleView.data <= fim
         )
-        .order_by(Dates.data)
-        .all()
-    )
\ No newline at end of file
+        .order_by(ScheduleView.data)
+    )
+    return result.all()
+
+
+def dias_do_cafe(inicio: date, fim: date) -> List[date]:
+    """
+    Todas as terças e quintas entre `inicio` e `fim` (inclusive), em ordem.
+    Em vez de testar dia a dia, salta de semana em semana a partir do primeiro
+    dia válido de cada tipo.
+    """
+    dias = []
+    for weekday in DIAS_DO_CAFE:
+        dia = inicio + timedelta(days=(weekday - inicio.weekday()) % 7)
+        while dia <= fim:
+            dias.append(dia)
+            dia += timedelta(days=7)
+    dias.sort()
+    return dias
+
+
+def distribuir_datas(
+    usuarios: Iterable[Tuple[int, DiasResponsavel]], inicio: date, fim: date
+) -> List[Tuple[date, int]]:
+    """
+    Distribui as terças e quintas entre `inicio` e `fim` de forma balanceada.
+
+    Cada dia vai para o usuário elegível com menos datas atribuídas até então
+    (empates ficam com quem aparece primeiro em `usuarios`). Cada dia de café
+    tem seu heap de candidatos; como quem é terça-e-quinta está nos dois, as
+    entradas desatualizadas são corrigidas quando chegam ao topo.
+
+    Args:
+        usuarios: pares (id, dias_responsavel)
+        inicio, fim: intervalo de datas (inclusive)
+
+    Returns:
+        Lista de pares (data, user_id) em ordem de data.
+    """
+    contador = {}
+    heaps = {weekday: [] for weekday in DIAS_DO_CAFE}
+    for ordem, (user_id, dias_responsavel) in enumerate(usuarios):
+        contador[user_id] = 0
+        for weekday, permitidos in DIAS_DO_CAFE.items():
+            if dias_responsavel in permitidos:
+                heaps[weekday].append((0, ordem, user_id))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    atribuicoes = []
+    for dia in dias_do_cafe(inicio, fim):
+        heap = heaps[dia.weekday()]
+        if not heap:
+            continue
+        user_id = _menos_datas(heap, contador)
+        contador[user_id] += 1
+        heapq.heapreplace(heap, (contador[user_id], heap[0][1], user_id))
+        atribuicoes.append((dia, user_id))
+    return atribuicoes
+
+
+def _menos_datas(heap: list, contador: Dict[int, int]) -> int:
+    """
+    Deixa no topo do heap o usuário com menos datas, corrigindo as entradas
+    cuja contagem ficou desatualizada, e devolve o id dele.
+    """
+    while True:
+        contagem, ordem, user_id = heap[0]
+        if contagem == contador[user_id]:
+            return user_id
+        heapq.heapreplace(heap, (contador[user_id], ordem, user_id))
+
+
+def _dias_permitidos(dias_responsavel: DiasResponsavel) -> set:
+    return {weekday for weekday, permitidos in DIAS_DO_CAFE.items() if dias_responsavel in permitidos}
+
+
+async def rebalancear_datas(db: AsyncSession, *user_ids: int, removido: bool = False) -> int:
+    """
+    Ajusta a escala futura depois que usuários entram, saem ou mudam seus
+    dias, mexendo no menor número possível de datas. Vários usuários (uma
+    importação em massa) são tratados de uma vez só.
+
+    Só datas de hoje em diante ainda não avisadas são consideradas:
+      1. datas dos usuários que eles não podem mais cobrir vão para o colega
+         elegível com menos datas (ou são apagadas se não houver nenhum);
+      2. enquanto algum usuário tiver 2 datas ou mais além de um colega que
+         possa receber uma delas, diretamente ou por uma cadeia de repasses
+         (quem só vai na terça -> quem vai nos dois dias -> quem só vai na
+         quinta), a cadeia é aplicada: só as pontas mudam de contagem.
+
+    As alterações são aplicadas na sessão recebida, sem commit, para entrarem
+    na mesma transação da rota. Com `removido=True` os usuários são tratados
+    como excluídos; as datas que ninguém puder assumir ficam para o cascade
+    apagar.
+
+    Returns:
+        Quantidade de datas alteradas ou apagadas.
+    """
+    futuras = (Dates.data >= date.today(), Dates.foi_avisado.is_(False))
+
+    roster = dict((await db.execute(select(User.id, User.dias_responsavel).order_by(User.id))).all())
+    if removido:
+        for user_id in user_ids:
+            roster.pop(user_id, None)
+    ordem = {uid: i for i, uid in enumerate(roster)}
+
+    contador = {uid: 0 for uid in roster}
+    contador.update(
+        (await db.execute(
+            select(Dates.user_id, func.count(Dates.id))
+            .filter(*futuras)
+            .group_by(Dates.user_id)
+        )).all()
+    )
+    validos = {
+        user_id: _dias_permitidos(roster[user_id]) if user_id in roster else set()
+        for user_id in user_ids
+    }
+
+    mudancas = {}
+    apagadas = []
+
+    # 1. Datas que os usuários não podem mais cobrir
+    invalidas = [
+        (date_id, data, user_id)
+        for date_id, data, user_id in await db.execute(
+            select(Dates.id, Dates.data, Dates.user_id)
+            .filter(Dates.user_id.in_(user_ids), *futuras)
+            .order_by(Dates.data)
+        )
+        if data.weekday() not in validos[user_id]
+    ] if user_ids else []
+    if invalidas:
+        # O dono de uma data inválida nunca é candidato a ela: ou não está no
+        # roster (removido) ou não cobre aquele dia da semana
+        heaps = {weekday: [] for weekday in DIAS_DO_CAFE}
+        for uid, dias_responsavel in roster.items():
+            for weekday in _dias_permitidos(dias_responsavel):
+                heaps[weekday].append((contador[uid], ordem[uid], uid))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        # Dias com menos candidatos primeiro, para que quem cobre os dois dias
+        # não acabe sobrecarregado com datas que outros poderiam assumir
+        # (datas criadas à mão fora de terça/quinta não têm candidatos e são apagadas)
+        invalidas.sort(key=lambda item: (len(heaps.get(item[1].weekday(), ())), item[1]))
+        for date_id, data, user_id in invalidas:
+            if not removido:
+                # O dono também pode ser candidato nos outros dias: entrada nova
+                # com a contagem atual (as antigas são corrigidas no topo)
+                contador[user_id] -= 1
+                for weekday in validos[user_id]:
+                    heapq.heappush(heaps[weekday], (contador[user_id], ordem[user_id], user_id))
+            heap = heaps.get(data.weekday())
+            if not heap:
+                apagadas.append(date_id)
+                continue
+            escolhido = _menos_datas(heap, contador)
+            contador[escolhido] += 1
+            heapq.heapreplace(heap, (contador[escolhido], ordem[escolhido], escolhido))
+            mudancas[date_id] = escolhido
+
+    # 2. Repasses diretos de quem tem mais datas para quem tem menos
+    await _balancear(db, roster, contador, mudancas, futuras)
+
+    if mudancas:
+        await db.execute(update(Dates), [{"id": date_id, "user_id": uid} for date_id, uid in mudancas.items()])
+    if apagadas and not removido:
+        await db.execute(delete(Dates).where(Dates.id.in_(apagadas)))
+    await refresh_schedule(db, date_ids=[*mudancas, *([] if removido else apagadas)])
+    # Deltas para o feed; as que o cascade apagar o cliente tira no user.deleted
+    await publish(db, [
+        *(("date.updated", {"id": date_id, "user_id": uid}) for date_id, uid in mudancas.items()),
+        *(("date.deleted", {"id": date_id}) for date_id in ([] if removido else apagadas)),
+    ])
+    return len(mudancas) + (0 if removido else len(apagadas))
+
+
+async def _balancear(db: AsyncSession, roster: dict, contador: Dict[int, int], mudancas: Dict[int, int], futuras: tuple):
+    """
+    Repassa datas do usuário mais carregado para o menos carregado que ele
+    alcança enquanto a diferença entre eles for de 2 ou mais.
+
+    O alcance é uma busca em largura: de A se chega a B quando A tem uma data
+    futura num dia que B cobre. O repasse segue o caminho encontrado (cada
+    intermediário recebe uma data e entrega outra), então datas de terça
+    chegam a quem só vai na quinta através de quem vai nos dois dias. Sem
+    caminho que melhore nada, a escala está tão equilibrada quanto os dias de
+    cada um permitem. As datas de cada usuário só são buscadas quando a busca
+    passa por ele.
+    """
+    if not roster:
+        return
+    ordem = {uid: i for i, uid in enumerate(roster)}
+    dias = {uid: _dias_permitidos(dias_responsavel) for uid, dias_responsavel in roster.items()}
+    cobrem = {weekday: [uid for uid in roster if weekday in dias[uid]] for weekday in DIAS_DO_CAFE}
+    candidatas = {}
+
+    async def datas_de(uid):
+        if uid not in candidatas:
+            # Datas do usuário já considerando os repasses desta rebalanceada
+            recebidas = [date_id for date_id, dono in mudancas.items() if dono == uid]
+            por_dia = {weekday: [] for weekday in DIAS_DO_CAFE}
+            for date_id, data, dono in await db.execute(
+                select(Dates.id, Dates.data, Dates.user_id)
+                .filter(or_(Dates.user_id == uid, Dates.id.in_(recebidas)), *futuras)
+            ):
+                if mudancas.get(date_id, dono) == uid and data.weekday() in por_dia:
+                    por_dia[data.weekday()].append((data, date_id))
+            for datas in por_dia.values():
+                # Datas mais distantes primeiro, para não mexer no que está próximo
+                datas.sort(reverse=True)
+            candidatas[uid] = por_dia
+        return candidatas[uid]
+
+    def menor_contagem():
+        return min(contador[uid] for uid in roster)
+
+    async def caminho(doador):
+        # Busca em largura a partir do doador: fica com o menos carregado
+        # alcançado, parando no primeiro que tiver o mínimo de datas
+        minimo = menor_contagem()
+        anterior = {doador: None}
+        fila = [doador]
+        melhor = None
+        for uid in fila:
+            por_dia = await datas_de(uid)
+            for weekday in sorted(dias[uid]):
+                if not por_dia[weekday]:
+                    continue
+                for outro in cobrem[weekday]:
+                    if outro in anterior:
+                        continue
+                    anterior[outro] = (uid, weekday)
+                    fila.append(outro)
+                    if melhor is None or (contador[outro], ordem[outro]) < (contador[melhor], ordem[melhor]):
+                        melhor = outro
+            if melhor is not None and contador[melhor] == minimo:
+                break
+        if melhor is None or contador[doador] - contador[melhor] < 2:
+            return None
+        passos = []
+        while anterior[melhor] is not None:
+            de, weekday = anterior[melhor]
+            passos.append((de, melhor, weekday))
+            melhor = de
+        return passos[::-1]
+
+    while True:
+        minimo = menor_contagem()
+        moveu = False
+        for doador in sorted(roster, key=lambda uid: (-contador[uid], ordem[uid])):
+            if contador[doador] - minimo < 2:
+                break
+            passos = await caminho(doador)
+            if passos is None:
+                continue
+            for de, para, weekday in passos:
+                data, date_id = (await datas_de(de))[weekday].pop(0)
+                mudancas[date_id] = para
+                if para in candidatas:
+                    candidatas[para][weekday].append((data, date_id))
+                    candidatas[para][weekday].sort(reverse=True)
+            contador[doador] -= 1
+            contador[passos[-1][1]] += 1
+            moveu = True
+            break
+        if not moveu:
+            return
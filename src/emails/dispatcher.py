@@ -0,0 +1,413 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import orjson
+from sqlalchemy import update, insert, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bootstrap.cache import bump_version
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.metrics import CallbackMetric, registry
+from src.bootstrap.settings import settings
+from src.dates.entity import Dates, ScheduleView
+from src.emails.entity import Outbox
+from src.emails.enums import OutboxStatus
+from src.emails.messages import build_email_message
+from src.emails.pool import smtp_pool
+from src.emails.templating import email_templates
+from src.events.services import event_bus, publish
+
+# Teto da espera entre tentativas quando o próprio banco da outbox falha, em segundos
+MAX_ERROR_BACKOFF = 60
+
+
+class TokenBucket:
+    """
+    Limitador de taxa: no máximo `rate` envios por segundo, com rajadas de
+    até `capacity` envios.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def enqueue_email(
+    db: AsyncSession,
+    to_email: str,
+    to_name: str,
+    subject: str,
+    body: str,
+    date_id: Optional[int] = None,
+    date_ids: Optional[str] = None,
+    template: Optional[str] = None,
+    template_version: Optional[int] = None,
+    context: Optional[str] = None,
+    bcc: Optional[str] = None,
+) -> Outbox:
+    """
+    Registra um e-mail na outbox. O commit fica a cargo de quem chamou, para
+    que o envio só exista se a transação da rota for confirmada.
+
+    Com `template` a mensagem é montada no envio a partir do template e dos
+    campos em `context`; as colunas vêm prontas de `MessageTemplate.outbox_fields`.
+    """
+    item = Outbox(
+        to_email=to_email,
+        to_name=to_name,
+        subject=subject,
+        body=body,
+        date_id=date_id,
+        date_ids=date_ids,
+        template=template,
+        template_version=template_version,
+        context=context,
+        bcc=bcc,
+    )
+    db.add(item)
+    return item
+
+
+async def enqueue_emails(db: AsyncSession, mensagens: List[dict]):
+    """
+    Registra vários e-mails na outbox com um único INSERT multi-linha.
+    Cada item tem as mesmas chaves aceitas por `enqueue_email`.
+    """
+    if not mensagens:
+        return
+    agora = datetime.utcnow()
+    await db.execute(
+        insert(Outbox),
+        [
+            {
+                "date_id": None,
+                "date_ids": None,
+                "template": None,
+                "template_version": None,
+                "context": None,
+                "bcc": None,
+                **m,
+                "status": OutboxStatus.pendente,
+                "attempts": 0,
+                "next_attempt_at": agora,
+                "created_at": agora,
+            }
+            for m in mensagens
+        ],
+    )
+
+
+class OutboxDispatcher:
+    """
+    Drena a tabela `outbox` com concorrência limitada e taxa controlada.
+
+    Falhas são reagendadas com backoff exponencial; depois de `max_attempts`
+    tentativas a mensagem vai para o status `falhou` (dead-letter). A data
+    associada só é marcada como avisada quando o servidor SMTP aceita o envio;
+    as confirmações são acumuladas e gravadas em lote (`_flush_delivered`).
+
+    Uma mensagem em `enviando` fica reservada por `claim_timeout` segundos
+    (guardado em `next_attempt_at`); só depois disso ela pode ser reservada
+    de novo, por qualquer processo. Vários workers dividem a outbox sem
+    reenviar o que outro ainda está enviando, e o que ficou com um worker
+    que caiu volta a sair quando a reserva vence.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        rate_per_second: float,
+        burst: int,
+        max_attempts: int,
+        backoff_base: float,
+        poll_interval: float,
+        claim_timeout: float,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._delivered: List[Outbox] = []
+        # Mensagens reservadas por este processo e ainda não concluídas
+        self._claimed: Dict[int, Outbox] = {}
+
+    def wake(self):
+        """Avisa o dispatcher de que há mensagens novas na outbox."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.concurrency)
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._produce())]
+        self._tasks += [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = 0):
+        """
+        Para o dispatcher. Deixa de reservar mensagens e espera até `timeout`
+        segundos pelos envios já em andamento; o que não terminar volta para
+        a fila da outbox.
+        """
+        if not self._tasks:
+            return
+        producer, consumers = self._tasks[0], self._tasks[1:]
+        # O produtor sai sozinho no fim da iteração atual; cancelar no meio de
+        # uma transação deixaria a reserva para o claim_timeout resolver
+        self._stopping = True
+        self.wake()
+        done, _ = await asyncio.wait([producer], timeout=max(timeout, 1))
+        if not done:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"Outbox: {len(self._claimed)} envios não terminaram a tempo e voltam para a fila")
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        try:
+            await self._flush_delivered()
+            await self._release_claimed()
+        except Exception as e:
+            # O que ficou sem gravar volta para a fila quando a reserva vencer
+            print(f"Outbox: falha ao gravar o estado no encerramento: {e!r}")
+        self._tasks = []
+        self._wakeup = None
+        self._queue = None
+
+    async def _release_claimed(self):
+        if not self._claimed:
+            return
+        ids, self._claimed = list(self._claimed), {}
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Outbox)
+                .where(Outbox.id.in_(ids), Outbox.status == OutboxStatus.enviando)
+                .values(status=OutboxStatus.pendente, next_attempt_at=datetime.utcnow())
+            )
+            await db.commit()
+
+    async def _claim(self, limit: int) -> List[Outbox]:
+        async with AsyncSessionLocal() as db:
+            # Pendentes liberadas para envio e reservas vencidas (de um processo
+            # que caiu no meio do envio): nas duas, next_attempt_at já passou
+            items = (await db.execute(
+                select(Outbox)
+                .filter(
+                    Outbox.status.in_([OutboxStatus.pendente, OutboxStatus.enviando]),
+                    Outbox.next_attempt_at <= datetime.utcnow(),
+                )
+                .order_by(Outbox.next_attempt_at, Outbox.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+            reservado_ate = datetime.utcnow() + timedelta(seconds=self.claim_timeout)
+            for item in items:
+                item.status = OutboxStatus.enviando
+                item.next_attempt_at = reservado_ate
+            await db.commit()
+            self._claimed.update((item.id, item) for item in items)
+            return items
+
+    async def _produce(self):
+        # A primeira ida ao banco espera um aviso ou o intervalo de polling:
+        # o startup da aplicação não depende do banco estar no ar
+        await self._pause(self.poll_interval)
+        errors = 0
+        while not self._stopping:
+            # Limpa o aviso antes de consultar: um wake() durante a consulta
+            # não pode se perder
+            self._wakeup.clear()
+            try:
+                await self._flush_delivered()
+                items = await self._claim(self.concurrency)
+            except Exception as e:
+                # Banco fora do ar ou erro na consulta: o produtor não pode
+                # morrer, senão a outbox só volta a andar depois de um restart
+                errors += 1
+                delay = self._error_backoff(errors)
+                print(f"Outbox: erro ao consultar a fila ({e!r}); nova tentativa em {delay:.1f}s")
+                # Sem transação aberta aqui: o stop() pode cancelar a espera
+                await asyncio.sleep(delay)
+                continue
+            errors = 0
+            if not items:
+                await self._pause(self.poll_interval)
+                continue
+            for item in items:
+                await self._queue.put(item)
+
+    async def _pause(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _backoff(self, attempts: int) -> float:
+        # Backoff exponencial com jitter para não sincronizar as novas tentativas
+        return self.backoff_base * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+    def _error_backoff(self, errors: int) -> float:
+        return min(self._backoff(errors), MAX_ERROR_BACKOFF)
+
+    async def _consume(self):
+        errors = 0
+        while True:
+            item = await self._queue.get()
+            try:
+                await self.bucket.acquire()
+                await self._deliver(item)
+                errors = 0
+            except Exception as e:
+                # Falha ao gravar o resultado: a mensagem continua reservada e
+                # volta para a fila quando a reserva vencer
+                errors += 1
+                print(f"Outbox: erro ao concluir o envio para {item.to_email}: {e!r}")
+                await asyncio.sleep(self._error_backoff(errors))
+            finally:
+                self._claimed.pop(item.id, None)
+                self._queue.task_done()
+                if self._queue.empty():
+                    # Lote concluído: acorda o produtor para gravar as confirmações
+                    self.wake()
+
+    async def _deliver(self, item: Outbox):
+        try:
+            if item.template:
+                # Template compilado em cache: só os campos desta mensagem são montados
+                template = email_templates.get(item.template, item.template_version)
+                msg = template.render(item.to_email, orjson.loads(item.context or "{}"))
+            else:
+                msg = build_email_message(item.to_email, item.body, item.subject)
+            recipients = orjson.loads(item.bcc) if item.bcc else [item.to_email]
+            response = await smtp_pool.send(msg, recipients=recipients)
+        except Exception as e:
+            await self._mark_failed(item, e)
+            return
+        self._mark_sent(item)
+        print(f"E-mail enviado para {item.to_name} <{item.to_email}>: {response}")
+
+    def _mark_sent(self, item: Outbox):
+        self._delivered.append(item)
+        self.sent += 1
+
+    async def _flush_delivered(self):
+        """
+        Grava as confirmações acumuladas com um UPDATE ... WHERE id IN (...)
+        para a outbox e outro para as datas, numa única transação.
+        """
+        if not self._delivered:
+            return
+        # Só sai da lista depois do commit: se a gravação falhar, as
+        # confirmações ficam para a próxima vez em vez de virarem reenvios
+        delivered = list(self._delivered)
+        outbox_ids = [item.id for item in delivered]
+        date_ids = [item.date_id for item in delivered if item.date_id is not None]
+        for item in delivered:
+            if item.date_ids:
+                date_ids.extend(orjson.loads(item.date_ids))
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Outbox)
+                .where(Outbox.id.in_(outbox_ids))
+                .values(status=OutboxStatus.enviado, attempts=Outbox.attempts + 1, sent_at=datetime.utcnow(), last_error=None)
+            )
+            if date_ids:
+                await db.execute(update(Dates).where(Dates.id.in_(date_ids)).values(foi_avisado=True))
+                await db.execute(update(ScheduleView).where(ScheduleView.id.in_(date_ids)).values(foi_avisado=True))
+                await publish(db, [("date.updated", {"id": date_id, "foi_avisado": True}) for date_id in date_ids])
+            await db.commit()
+        del self._delivered[:len(delivered)]
+        if date_ids:
+            bump_version("dates")
+            event_bus.wake()
+
+    async def _mark_failed(self, item: Outbox, error: Exception):
+        attempts = item.attempts + 1
+        values = {"attempts": attempts, "last_error": repr(error)}
+        if attempts >= self.max_attempts:
+            values["status"] = OutboxStatus.falhou
+            self.dead += 1
+            print(f"E-mail para {item.to_email} descartado após {attempts} tentativas: {error!r}")
+        else:
+            delay = self._backoff(attempts)
+            values["status"] = OutboxStatus.pendente
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            self.retried += 1
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Outbox).where(Outbox.id == item.id).values(**values))
+            await db.commit()
+
+    async def stats(self) -> dict:
+        async with AsyncSessionLocal() as db:
+            counts = dict((await db.execute(
+                select(Outbox.status, func.count(Outbox.id)).group_by(Outbox.status)
+            )).all())
+        return {
+            "fila": {status.value: counts.get(status, 0) for status in OutboxStatus},
+            "enviados": self.sent,
+            "reagendados": self.retried,
+            "descartados": self.dead,
+        }
+
+
+# O limitador é por processo: em produção (WEB_CONCURRENCY workers) a taxa do
+# provedor é dividida entre eles para que a soma não passe do limite
+_workers = max(1, settings.WEB_CONCURRENCY) if settings.SERVER_MODE == "production" else 1
+
+outbox_dispatcher = OutboxDispatcher(
+    concurrency=settings.OUTBOX_CONCURRENCY,
+    rate_per_second=settings.OUTBOX_RATE_PER_SECOND / _workers,
+    burst=max(1, settings.OUTBOX_BURST // _workers),
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    backoff_base=settings.OUTBOX_BACKOFF_BASE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    claim_timeout=settings.OUTBOX_CLAIM_TIMEOUT,
+)
+
+registry.register(CallbackMetric(
+    "outbox_sent_total", "E-mails da outbox enviados por este processo", "counter",
+    lambda: outbox_dispatcher.sent,
+))
+registry.register(CallbackMetric(
+    "outbox_retried_total", "E-mails da outbox reagendados após falha", "counter",
+    lambda: outbox_dispatcher.retried,
+))
+registry.register(CallbackMetric(
+    "outbox_dead_total", "E-mails da outbox descartados após esgotar as tentativas", "counter",
+    lambda: outbox_dispatcher.dead,
+))
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+
+from src.bootstrap.database import Base
+from src.emails.enums import OutboxStatus
+
+
+class Outbox(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(100), nullable=False)
+    to_name = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    # Template e campos (JSON) com que o dispatcher monta a mensagem no envio;
+    # sem template, sai só o corpo em texto
+    template = Column(String(50), nullable=True)
+    template_version = Column(Integer, nullable=True)
+    context = Column(Text, nullable=True)
+    # Data que deve ser marcada como avisada quando o envio for confirmado
+    date_id = Column(Integer, ForeignKey("dates.id", ondelete="SET NULL"), nullable=True)
+    # Datas avisadas de uma vez por um resumo semanal (lista JSON de ids)
+    date_ids = Column(Text, nullable=True)
+    # Mensagem única em cópia oculta: destinatários do envelope (lista JSON);
+    # to_email fica com o "undisclosed-recipients:;" do cabeçalho To
+    bcc = Column(Text, nullable=True)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.pendente, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
@@ -0,0 +1,8 @@
+import enum
+
+
+class OutboxStatus(enum.Enum):
+    pendente = "pendente"
+    enviando = "enviando"
+    enviado = "enviado"
+    falhou = "falhou"  # dead-letter: esgotou as tentativas
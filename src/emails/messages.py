@@ -0,0 +1,21 @@
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Optional
+
+from src.bootstrap.settings import settings
+from src.emails.templating import MESSAGE_ID_DOMAIN
+
+
+DEFAULT_SUBJECT = "Lembrete: Você traz o pão"
+
+
+def build_email_message(to_email: str, body: str, subject: Optional[str] = None) -> EmailMessage:
+    """Mensagem só com texto, para o que não vem de um template (ver `templating`)."""
+    msg = EmailMessage()
+    msg["From"] = settings.FROM_EMAIL
+    msg["To"] = to_email
+    msg["Subject"] = subject or DEFAULT_SUBJECT
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid(domain=MESSAGE_ID_DOMAIN)
+    msg.set_content(body)
+    return msg
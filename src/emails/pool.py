@@ -0,0 +1,209 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List, Optional, Sequence, Tuple, Union
+
+import aiosmtplib
+
+from src.bootstrap.metrics import CallbackMetric, registry, smtp_send_duration, smtp_send_failures
+from src.bootstrap.settings import settings
+
+# EmailMessage ou a mensagem já serializada
+Message = Union[EmailMessage, bytes]
+
+
+class SMTPPool:
+    """
+    Pool de conexões SMTP autenticadas e reutilizáveis.
+
+    Cada conexão faz o connect/STARTTLS/AUTH uma única vez e é devolvida ao
+    pool após o envio. Conexões ociosas há mais de `health_check_after`
+    segundos recebem um NOOP antes de serem usadas; se o servidor tiver
+    derrubado a conexão, ela é refeita e o envio repetido uma vez.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        use_tls: bool = False,
+        timeout: float = 30,
+        health_check_after: float = 30,
+        sender: Optional[str] = None,
+    ):
+        self.size = max(1, size)
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.sender = sender
+
+        self._idle: Optional[asyncio.LifoQueue] = None
+        self._last_used = {}
+        self.connections_opened = 0
+
+    def _queue(self) -> asyncio.LifoQueue:
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue(maxsize=self.size)
+            # Slots vazios: a conexão só é aberta quando alguém precisar dela
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+        return self._idle
+
+    def _new_client(self) -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+            use_tls=self.use_tls,
+            timeout=self.timeout,
+        )
+
+    async def _connect(self, client: Optional[aiosmtplib.SMTP]) -> aiosmtplib.SMTP:
+        if client is not None:
+            client.close()
+        client = self._new_client()
+        await client.connect()
+        self.connections_opened += 1
+        return client
+
+    async def _ensure_healthy(self, client: Optional[aiosmtplib.SMTP]) -> aiosmtplib.SMTP:
+        if client is None or not client.is_connected:
+            return await self._connect(client)
+
+        idle_for = time.monotonic() - self._last_used.get(id(client), 0)
+        if idle_for >= self.health_check_after:
+            try:
+                await client.noop()
+            except aiosmtplib.SMTPException:
+                return await self._connect(client)
+        return client
+
+    @asynccontextmanager
+    async def acquire(self):
+        queue = self._queue()
+        client = await queue.get()
+        try:
+            client = await self._ensure_healthy(client)
+            yield client
+        except BaseException:
+            # Conexão em estado desconhecido: descarta e deixa o slot vazio
+            if client is not None:
+                client.close()
+                self._last_used.pop(id(client), None)
+            client = None
+            raise
+        finally:
+            if client is not None:
+                self._last_used[id(client)] = time.monotonic()
+            queue.put_nowait(client)
+
+    async def _submit(self, client: aiosmtplib.SMTP, msg: Message, recipients: List[str]):
+        if isinstance(msg, bytes):
+            if client.is_ehlo_or_helo_needed:
+                await client.ehlo()
+            if client.supports_extension("8BITMIME") and self.sender and all(r.isascii() for r in recipients):
+                return await client.sendmail(self.sender, recipients, msg, mail_options=["BODY=8BITMIME"])
+            # Servidor sem 8BITMIME: o send_message recodifica as partes em 7bit
+            msg = message_from_bytes(msg, policy=policy.SMTP)
+        return await client.send_message(msg, recipients=recipients)
+
+    async def _send_on(self, client: aiosmtplib.SMTP, msg: Message, recipients: Sequence[str]):
+        try:
+            return await self._submit(client, msg, list(recipients))
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            # Servidor fechou a conexão entre envios: reconecta e tenta de novo
+            await client.connect()
+            self.connections_opened += 1
+            return await self._submit(client, msg, list(recipients))
+
+    async def send(self, msg: Message, recipients: Sequence[str]):
+        started = time.perf_counter()
+        try:
+            async with self.acquire() as client:
+                return await self._send_on(client, msg, recipients)
+        except Exception as e:
+            smtp_send_failures.inc(type(e).__name__)
+            raise
+        finally:
+            smtp_send_duration.observe(time.perf_counter() - started)
+
+    async def send_batch(
+        self, messages: Sequence[Tuple[Message, Sequence[str]]]
+    ) -> List[Union[tuple, BaseException]]:
+        """
+        Envia várias mensagens usando no máximo `size` conexões do pool.
+
+        Retorna uma lista na mesma ordem das mensagens, com a resposta do
+        servidor ou a exceção levantada para aquela mensagem.
+        """
+        results: List[Union[tuple, BaseException]] = [None] * len(messages)
+        pending = iter(range(len(messages)))
+
+        async def worker():
+            async with self.acquire() as client:
+                for index in pending:
+                    msg, recipients = messages[index]
+                    started = time.perf_counter()
+                    try:
+                        results[index] = await self._send_on(client, msg, recipients)
+                    except (aiosmtplib.SMTPException, OSError) as e:
+                        results[index] = e
+                        smtp_send_failures.inc(type(e).__name__)
+                    smtp_send_duration.observe(time.perf_counter() - started)
+
+        workers = min(self.size, len(messages))
+        outcomes = await asyncio.gather(*(worker() for _ in range(workers)), return_exceptions=True)
+
+        # Se nem a conexão inicial foi possível, as mensagens restantes falham com o mesmo erro
+        error = next((o for o in outcomes if isinstance(o, BaseException)), None)
+        if error is not None:
+            for index in pending:
+                results[index] = error
+            results = [error if r is None else r for r in results]
+            smtp_send_failures.inc(type(error).__name__, amount=sum(r is error for r in results))
+        return results
+
+    async def close(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+        self._idle = None
+        self._last_used.clear()
+
+
+smtp_pool = SMTPPool(
+    size=settings.SMTP_POOL_SIZE,
+    hostname=settings.SMTP_HOST,
+    port=settings.SMTP_PORT,
+    username=settings.SMTP_USER,
+    password=settings.SMTP_PASS,
+    start_tls=settings.SMTP_START_TLS,
+    use_tls=False,
+    timeout=30,
+    health_check_after=settings.SMTP_POOL_HEALTH_CHECK_AFTER,
+    sender=settings.FROM_EMAIL,
+)
+
+registry.register(CallbackMetric(
+    "smtp_connections_opened_total", "Conexões SMTP abertas pelo pool", "counter",
+    lambda: smtp_pool.connections_opened,
+))
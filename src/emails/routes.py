@@ -1,15 +1,17 @@
-import asyncio
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from src.dates.entity import Dates
-from src.users.entity import User
+from src.dates.entity import ScheduleView
 
 
-from src.bootstrap.database import SessionLocal
-from src.emails.services import send_emails_with_date, time_to_coffee, send_email_async
+from src.bootstrap.database import get_db
+from src.emails.dispatcher import enqueue_email, outbox_dispatcher
+from src.emails.services import send_emails_with_date, send_weekly_digest, time_to_coffee
 from src.emails.models import CoffeeReminderRequest
+from src.emails.templating import email_templates
+from src.jobs.runner import job_runner
 
 router = APIRouter(prefix='/mails')
 
@@ -17,9 +19,20 @@ router = APIRouter(prefix='/mails')
 @router.post("/send-emails-alert/")
 async def send_emails_alert():
     # Roda em background thread pra não travar resposta
-    await send_emails_with_date(SessionLocal(), 7)
+    # Quem optou pelo resumo semanal fica de fora, como no aviso diário: o
+    # resumo sai pelo /send-weekly-digest/ e não é enfileirado de novo aqui
+    await send_emails_with_date(7, resumos=False)
     return {"message": "Enviando e-mails (Pode demorar)"}
 
+@router.post("/send-weekly-digest/")
+async def send_weekly_digest_route():
+    """
+    Envia agora o resumo dos próximos 7 dias para quem optou pelo resumo
+    semanal (o job `weekly_digest_job` faz isso toda segunda).
+    """
+    await send_weekly_digest(7)
+    return {"message": "Resumos semanais na fila de envio"}
+
 @router.post("/time-to-coffee")
 async def trigger_time_to_coffee(request: CoffeeReminderRequest):
     """
@@ -41,19 +54,22 @@ async def trigger_time_to_coffee(request: CoffeeReminderRequest):
             dia_atual = "quinta"
         else:
             return {"message": "Hoje não é dia de café"}
-        asyncio.create_task(
-            time_to_coffee(
-                subject=request.subject,
-                message=request.message
-            )
+        # Pelo job runner: dois cliques não enfileiram os lembretes em dobro.
+        # Lease próprio: com o do job agendado, o disparo das 9h15 poderia ser
+        # ignorado
+        _, iniciado = await job_runner.submit(
+            "time_to_coffee_manual", time_to_coffee, args=[request.subject, request.message]
         )
+        if not iniciado:
+            return {"message": "Os lembretes de café já estão sendo enviados"}
         return {"message": f"Enviando e-mails para usuários escalados para {dia_atual}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.post("/notify-user-by-date/{date_id}")
 async def notify_user(
-    date_id: int
+    date_id: int,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Notifica o usuário associado a uma data específica.
@@ -61,26 +77,29 @@ async def notify_user(
     Parâmetros:
     - date_id: ID da data para a qual o usuário deve ser notificado.
     """
-    db = SessionLocal()
-    db_date = db.query(Dates).filter(Dates.id == date_id).first()
-    # pegar o usuário associado
+    # A data já com nome e e-mail do responsável, numa única leitura
+    db_date = await db.get(ScheduleView, date_id)
     if not db_date:
         raise HTTPException(status_code=404, detail="Data não encontrada")
     
-    db_user = db.query(User).filter(User.id == db_date.user_id).first()
-    date_str = db_date.data.strftime("%d-%m-%Y")
-
-    corpo_email = (
-            f"Olá {db_user.nome},\n\n"
-            f"Lembrete rápido: No dia ({date_str}) você é responsável por trazer o pão.\n"
-        )
+    template = email_templates.get("notificacao_data")
     try:
-        asyncio.create_task(
-            send_email_async(to_email=db_user.email, to_name=db_user.nome, subject="Notificação de Data", body=corpo_email)
+        # A data é marcada como avisada pelo dispatcher quando o envio for confirmado
+        enqueue_email(
+            db, to_email=db_date.email, to_name=db_date.nome, date_id=db_date.id,
+            **template.outbox_fields({"nome": db_date.nome, "data": db_date.data.strftime("%d-%m-%Y")}),
         )
-        db_date.foi_avisado = True
-        db.add(db_date)
-        db.commit()
+        await db.commit()
+        outbox_dispatcher.wake()
         return {"message": f"Notificação enviada para o usuário da data ID {date_id}"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/outbox/")
+async def outbox_status():
+    """
+    Situação da fila de envio: quantidade de mensagens por status e
+    contadores do dispatcher desde que o processo subiu.
+    """
+    return await outbox_dispatcher.stats()
\ No newline at end of file
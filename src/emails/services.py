@@ -1,141 +1,215 @@
-import asyncio
-from email.message import EmailMessage
-from typing import List
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-import aiosmtplib
-from sqlalchemy.orm import Session
+import orjson
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bootstrap.settings import settings
-from src.dates.entity import Dates
-from src.dates.services import get_dates_to_notify
-from src.users.entity import User
-from src.users.enums import DiasResponsavel
-from src.bootstrap.database import SessionLocal
+from src.dates.entity import ScheduleView
+from src.dates.services import DIAS_DO_CAFE, date_rows_query, dias_do_cafe, get_dates_to_notify
+from src.emails.dispatcher import enqueue_emails, outbox_dispatcher
+from src.emails.templating import email_templates
+from src.users.roster import RosterEntry, roster_index
+from src.bootstrap.database import AsyncSessionLocal
+
+NOMES_DOS_DIAS = {1: "terça", 3: "quinta"}
+MENSAGEM_CAFE = "9:30 da manhã nos reuniremos para tomar o cafezinho.\nEsperamos você!"
 
 
 async def time_to_coffee(subject: str = None, message: str = None):
     """
-    Envia lembretes de café para usuários escalados no dia atual.
+    Enfileira na outbox os lembretes de café para os usuários escalados no
+    dia atual.
     
     Args:
         subject: Assunto do e-mail (opcional, padrão: "Tá na hora do cafezinho")
         message: Mensagem personalizada (opcional, será adicionada antes da mensagem padrão)
     """
-    db = SessionLocal()
-    try:
-        from datetime import datetime
-        
-        # Obtém o dia da semana atual (0=segunda, 1=terça, ..., 6=domingo)
-        dia_semana = datetime.now().weekday()
-        
-        # Mapeia o dia da semana para os valores do enum
-        dia_atual = None
-        if dia_semana == 1:  # terça
-            dia_atual = "terca"
-        elif dia_semana == 3:  # quinta
-            dia_atual = "quinta"
-        else:
-            return
-        
-        # Busca usuários que estão escalados para o dia atual
-        with db:
-            # Filtra usuários que estão escalados para o dia atual ou para terça e quinta
-            users = db.query(User).filter(
-                (User.dias_responsavel == dia_atual) |
-                (User.dias_responsavel == "terca_quinta")
-            ).all()
-        
-        if not users:
-            return
-        
-        # Define o assunto padrão se não for fornecido
-        subject = subject or "Tá na hora do cafezinho"
-        
-        for user in users:
-            # Mensagem personalizada + mensagem padrão
-            body_parts = [
-                f"Olá, tudo bem? {user.nome}\n\n",
-                f"{message}\n\n" if message else "9:30 da manhã nos reuniremos para tomar o cafezinho.\n"
-                "Esperamos você!\n\n",
-
-            ]
-            body = "".join(part for part in body_parts if part)
-            
-            await send_email_async(
-                user.email,
-                user.nome,
-                body,
-                subject
-            )
-            
-    finally:
-        db.close()
-
+    from datetime import datetime
+    
+    # Obtém o dia da semana atual (0=segunda, 1=terça, ..., 6=domingo)
+    dia_semana = datetime.now().weekday()
+    if dia_semana not in DIAS_DO_CAFE:
+        return
+    
+    # Usuários escalados para o dia atual (só nele ou em terça e quinta), direto do índice.
+    # Quem optou pelo resumo semanal já recebeu os dias de café nele
+    users = [user for user in (await roster_index.get()).por_dia[dia_semana] if not user.resumo_semanal]
+    
+    if not users:
+        return
+    
+    # Assunto e mensagem são os mesmos para todos: entram no template uma vez
+    # só, e cada mensagem recebe apenas o nome do destinatário
+    campos = {"assunto": subject or "Tá na hora do cafezinho", "mensagem": message or MENSAGEM_CAFE}
+    if settings.EMAIL_BCC_ENABLED:
+        grupo = [user for user in users if user.cafe_em_cco]
+        users = [user for user in users if not user.cafe_em_cco]
+    else:
+        grupo = []
+
+    template = email_templates.get("cafe").bind(campos)
+    mensagens = [
+        {"to_email": user.email, "to_name": user.nome, **template.outbox_fields({"nome": user.nome})}
+        for user in users
+    ]
+
+    # Quem aceita cópia oculta recebe a mesma mensagem, sem o nome: uma
+    # mensagem na outbox por grupo de até EMAIL_BCC_MAX_RECIPIENTS
+    if grupo:
+        campos_cco = email_templates.get("cafe_cco").bind(campos).outbox_fields({})
+        tamanho = max(1, settings.EMAIL_BCC_MAX_RECIPIENTS)
+        for inicio in range(0, len(grupo), tamanho):
+            parte = grupo[inicio:inicio + tamanho]
+            mensagens.append({
+                "to_email": "undisclosed-recipients:;",
+                "to_name": f"{len(parte)} destinatários em cópia oculta",
+                "bcc": orjson.dumps([user.email for user in parte]).decode(),
+                **campos_cco,
+            })
+
+    # Pela outbox, como os demais avisos: limite de taxa, novas tentativas e
+    # o registro de cada envio
+    async with AsyncSessionLocal() as db:
+        await enqueue_emails(db, mensagens)
+        await db.commit()
+    outbox_dispatcher.wake()
+
+
+def _quantidade_de_paes(pessoas_por_dia: Dict[int, int], weekday: int) -> int:
+    return pessoas_por_dia[weekday] * 2
+
+
+async def send_emails_for_dates(
+    dates: Sequence[Row], db: AsyncSession, periodo: Optional[Tuple[date, date]] = None
+):
+    """
+    `dates`: linhas de schedule_view, como as de `get_dates_to_notify`.
 
+    Cada data gera um aviso para o responsável, exceto para quem optou pelo
+    resumo semanal: com `periodo` (início, fim) essas pessoas recebem um
+    único resumo com as suas datas; sem ele, nada (o resumo já foi enviado).
+    """
+    # Quantidade de pessoas em cada dia de café (1=terça, 3=quinta)
+    roster = await roster_index.get(db)
+    pessoas_por_dia = {weekday: len(users) for weekday, users in roster.por_dia.items()}
+    template = email_templates.get("lembrete_pao")
+    mensagens = []
+    do_resumo: Dict[int, List[Row]] = {}
 
-async def send_emails_for_dates(dates: List[Dates], db: Session):
     for date_obj in dates:
         date_str = date_obj.data.strftime("%d-%m-%Y")
-        usuario = date_obj.user
 
         # Identifica o dia da semana da data (0=segunda, 1=terça, 3=quinta)
         weekday = date_obj.data.weekday()
 
-        if weekday == 1:  # terça
-            usuarios_do_dia = db.query(User).filter(
-                User.dias_responsavel.in_([DiasResponsavel.terca, DiasResponsavel.terca_quinta])
-            ).all()
-        elif weekday == 3:  # quinta
-            usuarios_do_dia = db.query(User).filter(
-                User.dias_responsavel.in_([DiasResponsavel.quinta, DiasResponsavel.terca_quinta])
-            ).all()
-        else:
+        if weekday not in pessoas_por_dia:
             # Se não for terça nem quinta, pula esse usuário (ou envia um email padrão, se preferir)
             continue
 
-        total_pessoas = len(usuarios_do_dia)
-        quantidade_para_levar = total_pessoas * 2
-
-        subject = f"Lembrete: Você traz o pão ({date_str})"
+        user = roster.por_id.get(date_obj.user_id)
+        if user is not None and user.resumo_semanal:
+            do_resumo.setdefault(user.id, []).append(date_obj)
+            continue
 
-        corpo_email = (
-            f"Olá {usuario.nome},\n\n"
-            f"Lembrete rápido: No dia ({date_str}) você é responsável por trazer o pão.\n"
-            f"Temos {total_pessoas} pessoas confirmadas para este dia, então, por favor, "
-            f"leve {quantidade_para_levar} pães.\n\n"
-            "Valeu!"
+        total_pessoas = pessoas_por_dia[weekday]
+        mensagens.append({
+            "to_email": date_obj.email,
+            "to_name": date_obj.nome,
+            "date_id": date_obj.id,
+            **template.outbox_fields({
+                "nome": date_obj.nome,
+                "data": date_str,
+                "total_pessoas": total_pessoas,
+                "quantidade": _quantidade_de_paes(pessoas_por_dia, weekday),
+            }),
+        })
+
+    if periodo is not None:
+        mensagens += _resumos(pessoas_por_dia, do_resumo, *periodo, [roster.por_id[uid] for uid in do_resumo])
+
+    # foi_avisado só é marcado pelo dispatcher quando o envio for confirmado
+    await enqueue_emails(db, mensagens)
+    await db.commit()
+    outbox_dispatcher.wake()
+
+
+def _resumos(
+    pessoas_por_dia: Dict[int, int], datas: Dict[int, List[Row]], inicio: date, fim: date, users: Iterable[RosterEntry]
+) -> List[dict]:
+    """
+    Um resumo por usuário com os dias em que leva pão (e quantos pães) e os
+    dias de café em que está escalado entre `inicio` e `fim`. As datas de pão
+    são marcadas como avisadas quando o resumo for entregue.
+    """
+    template = email_templates.get("resumo_semanal")
+    cafes = dias_do_cafe(inicio, fim)
+    mensagens = []
+    for user in users:
+        minhas = [d for d in datas.get(user.id, ()) if d.data.weekday() in pessoas_por_dia]
+        meus_cafes = [dia for dia in cafes if dia.weekday() in user.dias]
+        if not minhas and not meus_cafes:
+            continue
+        pao = "\n".join(
+            f"- {NOMES_DOS_DIAS[d.data.weekday()]}, {d.data:%d-%m-%Y}: leve "
+            f"{_quantidade_de_paes(pessoas_por_dia, d.data.weekday())} pães"
+            for d in minhas
         )
-        asyncio.create_task(send_email_async(usuario.email, usuario.nome, corpo_email, subject))
-
-        date_obj.foi_avisado = True
-        db.add(date_obj)
-        db.commit()
-
-async def send_emails_with_date(db: Session, days: int = 1):
-    try:
-        dates = get_dates_to_notify(db, days)
-        await send_emails_for_dates(dates, db)
-        db.commit()
-    finally:
-        db.close()
-
-
-async def send_email_async(to_email: str, to_name: str, body: str, subject: str):
-    msg = EmailMessage()
-    msg["From"] = settings.FROM_EMAIL
-    msg["To"] = to_email
-    msg["Subject"] = subject if 'subject' in locals() else "Lembrete: Você traz o pão"
-    msg.set_content(body)
-
-    response = await aiosmtplib.send(
-        msg,
-        hostname=settings.SMTP_HOST,
-        port=settings.SMTP_PORT,
-        username=settings.SMTP_USER,
-        password=settings.SMTP_PASS,
-        start_tls=True,
-        use_tls=False,
-        timeout=30,
-        recipients=[to_email],  # <-- ESSA LINHA É IMPORTANTE
-    )
-    print(f"E-mail enviado para {to_name} <{to_email}>: {response}")
+        cafe = "\n".join(f"- {NOMES_DOS_DIAS[dia.weekday()]}, {dia:%d-%m-%Y}" for dia in meus_cafes)
+        mensagens.append({
+            "to_email": user.email,
+            "to_name": user.nome,
+            "date_ids": orjson.dumps([d.id for d in minhas]).decode() if minhas else None,
+            **template.outbox_fields({
+                "nome": user.nome,
+                "inicio": f"{inicio:%d-%m-%Y}",
+                "fim": f"{fim:%d-%m-%Y}",
+                "pao": pao or "Nenhum neste período.",
+                "cafe": cafe or "Nenhum neste período.",
+            }),
+        })
+    return mensagens
+
+
+async def send_emails_with_date(days: int = 1, resumos: bool = True):
+    """
+    Avisa os responsáveis pelas datas de hoje até `days` dias à frente. Quem
+    optou pelo resumo semanal recebe um resumo do período, ou nada com
+    `resumos=False` (o aviso diário: o resumo da semana já foi enviado).
+    """
+    async with AsyncSessionLocal() as db:
+        dates = await get_dates_to_notify(db, days)
+        periodo = (date.today(), date.today() + timedelta(days=days)) if resumos else None
+        await send_emails_for_dates(dates, db, periodo)
+
+
+async def send_weekly_digest(days: int = 7):
+    """
+    Resumo dos próximos `days` dias para quem optou por ele: uma mensagem
+    por pessoa, mesmo sem datas de pão no período (os dias de café vão nele).
+    """
+    inicio = date.today()
+    fim = inicio + timedelta(days=days)
+    async with AsyncSessionLocal() as db:
+        roster = await roster_index.get(db)
+        users = [user for user in roster.por_id.values() if user.resumo_semanal]
+        if not users:
+            return
+        rows = (await db.execute(
+            date_rows_query()
+            .filter(
+                ScheduleView.data >= inicio,
+                ScheduleView.data <= fim,
+                ScheduleView.user_id.in_([user.id for user in users]),
+            )
+            .order_by(ScheduleView.data)
+        )).all()
+        datas: Dict[int, List[Row]] = {}
+        for row in rows:
+            datas.setdefault(row.user_id, []).append(row)
+        pessoas_por_dia = {weekday: len(entries) for weekday, entries in roster.por_dia.items()}
+        await enqueue_emails(db, _resumos(pessoas_por_dia, datas, inicio, fim, users))
+        await db.commit()
+    outbox_dispatcher.wake()
+
@@ -0,0 +1,280 @@
+"""
+Templates de e-mail versionados, compilados uma vez e montados em bytes.
+
+Cada template fica em `EMAIL_TEMPLATES_DIR/<nome>/v<N>/`:
+
+- subject.txt: assunto (uma linha)
+- body.txt: parte text/plain
+- body.html: parte text/html (opcional; sem ela a mensagem é só texto)
+
+Os campos usam a sintaxe do `string.Template` (`$nome`, `${nome}`, `$$`).
+Uma versão publicada não muda: para alterar um texto, crie `v<N+1>`. As
+mensagens já na outbox guardam a versão com que foram enfileiradas e saem
+com ela; as novas usam a versão mais recente.
+
+A compilação separa os trechos fixos, já codificados em UTF-8 com os
+cabeçalhos MIME de cada parte, dos campos. `bind` preenche os campos comuns
+a um lote (assunto, mensagem do lembrete) uma única vez, e `render` só junta
+bytes com os campos de cada destinatário: nenhum `EmailMessage` é montado
+nem serializado por mensagem.
+"""
+import html
+import os
+import re
+import uuid
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+import orjson
+
+from src.bootstrap.settings import settings
+
+_FIELD = re.compile(r"\$(?:(\$)|\{([_a-z][_a-z0-9]*)\}|([_a-z][_a-z0-9]*))", re.IGNORECASE)
+_VERSION_DIR = re.compile(r"^v(\d+)$")
+# Limite de uma linha em SMTP (RFC 5321), sem o CRLF
+_MAX_LINE = 998
+# Domínio do Message-ID: o do remetente, sem consultar o DNS a cada mensagem
+MESSAGE_ID_DOMAIN = (settings.FROM_EMAIL or "").rpartition("@")[2] or "localhost"
+
+Escape = Callable[[object], bytes]
+Piece = Union[bytes, Tuple[str, Escape]]
+
+
+def _limit_lines(data: bytes) -> bytes:
+    if len(data) <= _MAX_LINE or all(len(line) <= _MAX_LINE for line in data.split(b"\r\n")):
+        return data
+    # Valor com linha longa demais (texto colado sem quebras): quebra em
+    # pedaços que, mesmo com 4 bytes por caractere, cabem no limite
+    lines = []
+    for line in data.decode().split("\r\n"):
+        lines.extend(line[i:i + 240] for i in range(0, max(len(line), 1), 240))
+    return "\r\n".join(lines).encode()
+
+
+def _crlf(value: str) -> str:
+    return value.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\r\n")
+
+
+def _escape_text(value) -> bytes:
+    return _limit_lines(_crlf(str(value)).encode())
+
+
+def _escape_html(value) -> bytes:
+    return _limit_lines(_crlf(html.escape(str(value))).replace("\r\n", "<br>\r\n").encode())
+
+
+def _escape_header(value) -> bytes:
+    return " ".join(str(value).split()).encode()
+
+
+@lru_cache(maxsize=4096)
+def _encode_header(name: str, value: str) -> bytes:
+    """Cabeçalho pronto; não ASCII vai em RFC 2047. Assuntos se repetem no lote."""
+    if not (value.isascii() and len(name) + len(value) < 76):
+        value = Header(value, "utf-8", header_name=name).encode(linesep="\r\n")
+    return f"{name}: {value}\r\n".encode()
+
+
+class _Pieces:
+    """Texto compilado: trechos fixos já em bytes intercalados com os campos."""
+
+    __slots__ = ("pieces", "fields")
+
+    def __init__(self, pieces: Sequence[Piece]):
+        merged: List[Piece] = []
+        for piece in pieces:
+            if isinstance(piece, bytes) and merged and isinstance(merged[-1], bytes):
+                merged[-1] += piece
+            elif piece != b"":
+                merged.append(piece)
+        self.pieces: Tuple[Piece, ...] = tuple(merged)
+        self.fields: FrozenSet[str] = frozenset(p[0] for p in merged if not isinstance(p, bytes))
+
+    @classmethod
+    def compile(cls, source: str, escape: Escape) -> "_Pieces":
+        pieces: List[Piece] = []
+        pos = 0
+        for match in _FIELD.finditer(source):
+            pieces.append(source[pos:match.start()].encode())
+            if match.group(1):
+                pieces.append(b"$")
+            else:
+                pieces.append((match.group(2) or match.group(3), escape))
+            pos = match.end()
+        pieces.append(source[pos:].encode())
+        return cls(pieces)
+
+    def __add__(self, other: "_Pieces") -> "_Pieces":
+        return _Pieces(self.pieces + other.pieces)
+
+    def bind(self, values: Dict[str, object]) -> "_Pieces":
+        return _Pieces([
+            piece[1](values[piece[0]]) if not isinstance(piece, bytes) and piece[0] in values else piece
+            for piece in self.pieces
+        ])
+
+    def fill(self, values: Dict[str, object]) -> bytes:
+        return b"".join(piece if isinstance(piece, bytes) else piece[1](values[piece[0]]) for piece in self.pieces)
+
+
+def _literal(data: str) -> _Pieces:
+    return _Pieces([data.encode()])
+
+
+def _part_header(content_type: str) -> str:
+    return f'Content-Type: {content_type}; charset="utf-8"\r\nContent-Transfer-Encoding: 8bit\r\n\r\n'
+
+
+class MessageTemplate:
+    """
+    Uma versão compilada de um template. `fields` são os campos ainda não
+    preenchidos; `render` exige todos eles.
+    """
+
+    def __init__(
+        self, name: str, version: int, subject: _Pieces, text: _Pieces, body: _Pieces, head: bytes,
+        bound: Optional[Dict[str, object]] = None,
+    ):
+        self.name = name
+        self.version = version
+        # Campos já preenchidos por `bind`, guardados junto na outbox
+        self.bound = bound or {}
+        self._subject = subject
+        self._text = text
+        self._body = body
+        self._head = head
+        self.fields = subject.fields | body.fields
+
+    @classmethod
+    def compile(cls, name: str, version: int, subject: str, text: str, html_source: Optional[str]) -> "MessageTemplate":
+        subject_pieces = _Pieces.compile(" ".join(subject.split()), _escape_header)
+        text_pieces = _Pieces.compile(_crlf(text), _escape_text)
+        for line in _crlf(text + (html_source or "")).split("\r\n"):
+            if len(line.encode()) > _MAX_LINE:
+                raise ValueError(f"Template {name} v{version}: linha com mais de {_MAX_LINE} bytes")
+
+        head = f"From: {settings.FROM_EMAIL or ''}\r\nMIME-Version: 1.0\r\n"
+        if html_source is None:
+            body = _literal(_part_header("text/plain")) + text_pieces
+        else:
+            # O separador é fixo por versão compilada; os campos nunca chegam
+            # perto de reproduzi-lo
+            boundary = f"=_pao_{uuid.uuid4().hex}"
+            body = (
+                _literal(
+                    f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n\r\n'
+                    f"--{boundary}\r\n" + _part_header("text/plain")
+                )
+                + text_pieces
+                + _literal(f"\r\n--{boundary}\r\n" + _part_header("text/html"))
+                + _Pieces.compile(_crlf(html_source), _escape_html)
+                + _literal(f"\r\n--{boundary}--\r\n")
+            )
+        return cls(name, version, subject_pieces, text_pieces, body, head.encode())
+
+    def bind(self, values: Dict[str, object]) -> "MessageTemplate":
+        """
+        Preenche de uma vez os campos comuns a um lote e devolve um template
+        que só espera os campos de cada destinatário.
+        """
+        return MessageTemplate(
+            self.name, self.version,
+            self._subject.bind(values), self._text.bind(values), self._body.bind(values), self._head,
+            {**self.bound, **values},
+        )
+
+    def subject(self, values: Dict[str, object]) -> str:
+        return self._subject.fill(values).decode()
+
+    def text(self, values: Dict[str, object]) -> str:
+        """Corpo em texto puro, com quebras de linha `\\n`."""
+        return self._text.fill(values).decode().replace("\r\n", "\n")
+
+    def render(self, to_email: str, values: Dict[str, object]) -> bytes:
+        """
+        Mensagem completa, pronta para `smtp_pool.send`/`send_batch`. Date e
+        Message-ID são do momento da montagem, que para a outbox é o envio.
+        """
+        return b"".join((
+            self._head,
+            f"Date: {formatdate(localtime=True)}\r\nMessage-ID: {make_msgid(domain=MESSAGE_ID_DOMAIN)}\r\n".encode(),
+            _encode_header("To", to_email),
+            _encode_header("Subject", self.subject(values)),
+            self._body.fill(values),
+        ))
+
+    def outbox_fields(self, values: Dict[str, object]) -> dict:
+        """
+        Colunas da outbox para esta mensagem: assunto e corpo em texto para
+        consulta, mais a referência ao template e os campos, com que o
+        dispatcher monta a mensagem na hora do envio.
+        """
+        return {
+            "subject": self.subject(values),
+            "body": self.text(values),
+            "template": self.name,
+            "template_version": self.version,
+            "context": orjson.dumps({**self.bound, **values}).decode(),
+        }
+
+
+class TemplateStore:
+    """
+    Lê e compila os templates do disco sob demanda e guarda o resultado. Como
+    uma versão publicada não muda, o cache não expira; uma versão nova só é
+    vista como a mais recente depois que o processo reinicia.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._compiled: Dict[Tuple[str, int], MessageTemplate] = {}
+        self._latest: Dict[str, int] = {}
+
+    def versions(self, name: str) -> List[int]:
+        try:
+            entries = os.listdir(os.path.join(self.root, name))
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_VERSION_DIR.match, entries) if m)
+
+    def latest(self, name: str) -> int:
+        version = self._latest.get(name)
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise LookupError(f"Template de e-mail não encontrado: {name}")
+            version = self._latest[name] = versions[-1]
+        return version
+
+    def get(self, name: str, version: Optional[int] = None) -> MessageTemplate:
+        if version is None:
+            version = self.latest(name)
+        template = self._compiled.get((name, version))
+        if template is None:
+            template = self._compiled[(name, version)] = self._load(name, version)
+        return template
+
+    def _load(self, name: str, version: int) -> MessageTemplate:
+        path = os.path.join(self.root, name, f"v{version}")
+        if not os.path.isdir(path):
+            raise LookupError(f"Template de e-mail não encontrado: {name} v{version}")
+
+        def read(filename: str) -> Optional[str]:
+            try:
+                with open(os.path.join(path, filename), encoding="utf-8") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+        subject, text = read("subject.txt"), read("body.txt")
+        if subject is None or text is None:
+            raise LookupError(f"Template {name} v{version} sem subject.txt ou body.txt")
+        html_source = read("body.html")
+        return MessageTemplate.compile(
+            name, version, subject, text.rstrip("\n"), html_source.rstrip("\n") if html_source is not None else None
+        )
+
+
+email_templates = TemplateStore(settings.EMAIL_TEMPLATES_DIR)
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from src.bootstrap.database import Base
+
+
+class Event(Base):
+    """
+    Delta de uma escrita (usuário ou data criado, alterado ou apagado),
+    gravado na mesma transação da escrita. O id é o número de sequência do
+    feed `GET /events`.
+    """
+    __tablename__ = "events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(30), nullable=False)
+    # JSON já serializado: vai para os clientes sem ser convertido de novo
+    dados = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
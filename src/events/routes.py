@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from src.bootstrap.settings import settings
+from src.events.services import event_bus, frame
+
+router = APIRouter(prefix='/events')
+
+
+@router.get("")
+async def events(
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Feed de alterações em Server-Sent Events.
+
+    Cada evento traz um delta de uma linha (`user.*`, `date.*`) ou um `reset`
+    quando o cliente precisa recarregar as listas. O `id` de cada evento é a
+    sequência: ao reconectar, o navegador manda `Last-Event-ID` (ou use
+    `?since=`) e recebe o que perdeu. Sem sequência, o primeiro evento é um
+    `ready` com a posição atual.
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def stream():
+        queue = await event_bus.subscribe()
+        inicio = event_bus.last_id
+        try:
+            yield b"retry: 3000\n\n"
+            enviado = inicio
+            if since is None:
+                yield frame(inicio, "ready", "{}")
+            else:
+                backlog = await event_bus.replay(since)
+                if backlog is None:
+                    yield frame(inicio, "reset", '{"tabelas":["users","dates"]}')
+                else:
+                    # O replay vai até onde o polling chegou durante a consulta:
+                    # o que já está na fila até ali não sai de novo. Sem
+                    # backlog o cliente pode estar à frente deste worker
+                    enviado = backlog[-1][0] if backlog else max(inicio, since)
+                    for event_id, data in backlog:
+                        yield data
+            while True:
+                try:
+                    event_id, data = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão viva em proxies com timeout de inatividade
+                    yield b": ping\n\n"
+                    continue
+                if event_id > enviado:
+                    enviado = event_id
+                    yield data
+        finally:
+            event_bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
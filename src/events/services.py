@@ -0,0 +1,213 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.metrics import CallbackMetric, registry
+from src.bootstrap.settings import settings
+from src.events.entity import Event
+
+# (id, frame SSE já codificado)
+Frame = Tuple[int, bytes]
+
+
+def frame(event_id: int, tipo: str, dados: str) -> bytes:
+    return f"id: {event_id}\nevent: {tipo}\ndata: {dados}\n\n".encode()
+
+
+async def publish(db: AsyncSession, deltas: Iterable[Tuple[str, dict]]):
+    """
+    Registra os deltas `(tipo, dados)` na sessão, sem commit, para entrarem
+    na mesma transação da escrita. Depois do commit chame `event_bus.wake()`
+    para que os clientes deste worker recebam na hora; os dos outros workers
+    recebem no próximo polling.
+
+    Tipos usados: user.created, user.updated, user.deleted, date.created,
+    date.updated, date.deleted e reset (com as tabelas a recarregar inteiras,
+    para escritas em massa).
+    """
+    rows = [{"tipo": tipo, "dados": orjson.dumps(dados).decode()} for tipo, dados in deltas]
+    if rows:
+        await db.execute(insert(Event), rows)
+
+
+def date_delta(d) -> dict:
+    """Delta de uma data com as colunas da tabela; o nome do usuário o cliente já tem."""
+    return {"id": d.id, "data": d.data, "user_id": d.user_id, "foi_avisado": bool(d.foi_avisado)}
+
+
+def user_delta(u) -> dict:
+    return {"id": u.id, "nome": u.nome, "email": u.email, "dias_responsavel": u.dias_responsavel.value}
+
+
+class EventBus:
+    """
+    Pub/sub em memória do feed de alterações.
+
+    Cada conexão `GET /events` assina uma fila. Enquanto houver assinantes,
+    uma tarefa lê da tabela `events` o que passou do último id visto (a cada
+    `poll_interval` segundos, ou na hora quando `wake()` é chamado depois de
+    uma escrita neste worker) e entrega o frame já codificado a todas as
+    filas. Como a sequência é o id da tabela, ela é a mesma em todos os
+    workers e um cliente pode retomar de qualquer um deles.
+
+    O id é atribuído no INSERT mas só fica visível no COMMIT: com escritas
+    concorrentes um id maior pode aparecer antes de um menor. Por isso a
+    posição só avança por ids consecutivos; diante de uma lacuna a entrega
+    para até o id que falta aparecer ou passar `gap_grace` segundos (id de
+    uma transação desfeita, que nunca vai aparecer).
+
+    Uma fila cheia (cliente lento) é esvaziada e recebe um `reset`: o cliente
+    recarrega as listas e segue a partir daí.
+    """
+
+    def __init__(self, poll_interval: float, queue_size: int, resume_limit: int, gap_grace: float):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.resume_limit = resume_limit
+        self.gap_grace = gap_grace
+        self.last_id: Optional[int] = None
+        # Desde quando a entrega está parada numa lacuna da sequência
+        self._gap_since: Optional[float] = None
+
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Avisa que há eventos novos na tabela."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self) -> asyncio.Queue:
+        """
+        Assina o feed. Ao retornar, `last_id` é a posição a partir da qual a
+        fila recebe eventos; o que veio antes se busca com `replay`.
+        """
+        if self.last_id is None:
+            async with AsyncSessionLocal() as db:
+                last_id = (await db.execute(select(func.max(Event.id)))).scalar() or 0
+            if self.last_id is None:
+                self.last_id = last_id
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self.wake()
+
+    async def replay(self, since: int) -> Optional[List[Frame]]:
+        """
+        Eventos depois de `since` até `last_id`, para quem está retomando.
+        Retorna None se não der para retomar: eventos já apagados pela
+        retenção, mais de `resume_limit` eventos perdidos ou sequência
+        desconhecida. Nesse caso o cliente deve recarregar tudo.
+        """
+        async with AsyncSessionLocal() as db:
+            oldest, newest = (await db.execute(select(func.min(Event.id), func.max(Event.id)))).one()
+            if since > (newest or 0):
+                return None
+            if since >= self.last_id:
+                return []
+            if oldest is None or since < oldest - 1:
+                return None
+            rows = (await db.execute(
+                select(Event.id, Event.tipo, Event.dados)
+                .filter(Event.id > since, Event.id <= self.last_id)
+                .order_by(Event.id)
+                .limit(self.resume_limit + 1)
+            )).all()
+        if len(rows) > self.resume_limit:
+            return None
+        return [(r.id, frame(r.id, r.tipo, r.dados)) for r in rows]
+
+    async def _fetch(self) -> List[Frame]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Event.id, Event.tipo, Event.dados)
+                .filter(Event.id > self.last_id)
+                .order_by(Event.id)
+                .limit(500)
+            )).all()
+        return [(r.id, frame(r.id, r.tipo, r.dados)) for r in rows]
+
+    def _dispatch(self, frames: List[Frame]) -> bool:
+        """Entrega os frames em ordem. Retorna False se parou numa lacuna."""
+        for event_id, data in frames:
+            if event_id != self.last_id + 1:
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < self.gap_grace:
+                    return False
+                print(f"Feed de eventos: ids {self.last_id + 1} a {event_id - 1} não apareceram; seguindo sem eles")
+            self._gap_since = None
+            for queue in self._subscribers:
+                try:
+                    queue.put_nowait((event_id, data))
+                except asyncio.QueueFull:
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait((event_id, frame(event_id, "reset", '{"tabelas":["users","dates"]}')))
+            self.last_id = event_id
+        return True
+
+    async def _poll(self):
+        try:
+            while self._subscribers:
+                # Limpa o aviso antes de consultar: um wake() durante a consulta
+                # não pode se perder
+                self._wakeup.clear()
+                try:
+                    frames = await self._fetch()
+                except Exception as e:
+                    print(f"Feed de eventos: falha ao ler a tabela events: {e!r}")
+                    frames = []
+                if self._dispatch(frames) and len(frames) == 500:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Sem assinantes a posição é descartada; o próximo recomeça do fim da tabela
+            self.last_id = None
+            self._gap_since = None
+            self._wakeup = None
+
+
+async def purge_events(retention: float = settings.EVENTS_RETENTION) -> int:
+    """Apaga os eventos com mais de `retention` segundos. Retorna quantos saíram."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(Event).where(Event.created_at < datetime.utcnow() - timedelta(seconds=retention))
+        )
+        await db.commit()
+        return result.rowcount
+
+
+event_bus = EventBus(
+    poll_interval=settings.EVENTS_POLL_INTERVAL,
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    resume_limit=settings.EVENTS_RESUME_LIMIT,
+    gap_grace=settings.EVENTS_GAP_GRACE,
+)
+
+registry.register(CallbackMetric(
+    "events_subscribers", "Conexões abertas no feed de eventos deste worker", "gauge",
+    lambda: event_bus.subscribers,
+))
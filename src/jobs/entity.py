@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+
+from src.bootstrap.database import Base
+
+
+class JobLease(Base):
+    """
+    Trava de cada job agendado. Quem consegue avançar `fire_time` para o
+    disparo atual é o único worker que executa aquele disparo.
+    """
+    __tablename__ = "job_leases"
+
+    job_id = Column(String(100), primary_key=True)
+    holder = Column(String(255), nullable=True)
+    fire_time = Column(DateTime, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+
+
+class JobRun(Base):
+    """Histórico de execuções dos jobs agendados."""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        UniqueConstraint("job_id", "fire_time", name="uq_job_runs_job_id_fire_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(100), nullable=False)
+    fire_time = Column(DateTime, nullable=False)
+    holder = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="executando")
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class JobRunOut(BaseModel):
+    id: int
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class JobSubmitted(BaseModel):
+    message: str
+    job: JobRunOut
+    # True quando o pedido foi juntado a uma execução que já estava em andamento
+    coalescido: bool
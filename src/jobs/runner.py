@@ -0,0 +1,234 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, Sequence, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.metrics import job_duration, job_skipped
+from src.bootstrap.settings import settings
+from src.jobs.entity import JobLease, JobRun
+
+
+def _utc_naive(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class JobRunner:
+    """
+    Agendador seguro para vários workers/réplicas.
+
+    Todo processo agenda os mesmos jobs, mas a cada disparo só quem conseguir
+    o lease do job no banco executa; os demais ignoram aquele disparo. O
+    disparo é identificado pelo horário previsto pelo trigger (igual em todos
+    os processos), então atrasos pequenos entre workers não geram execuções
+    duplicadas. Cada execução abre suas próprias sessões e fica registrada em
+    `job_runs`.
+
+    O lease vale `lease_seconds` e é renovado enquanto a execução roda; se o
+    processo cair, o job fica livre logo depois, sem esperar uma hora.
+    """
+
+    def __init__(self, lease_seconds: float, misfire_grace: float):
+        self.lease_seconds = lease_seconds
+        self.misfire_grace = misfire_grace
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.scheduler: Optional[AsyncIOScheduler] = None
+        self._jobs = []
+        self._running = set()
+
+    def add_job(
+        self,
+        job_id: str,
+        name: str,
+        func: Callable[..., Awaitable],
+        trigger: BaseTrigger,
+        args: Sequence = (),
+    ):
+        self._jobs.append((job_id, name, func, trigger, tuple(args)))
+
+    def start(self):
+        if self.scheduler is not None:
+            return
+        self.scheduler = AsyncIOScheduler()
+        for job_id, name, func, trigger, args in self._jobs:
+            self.scheduler.add_job(
+                self.run,
+                trigger=trigger,
+                args=[job_id, trigger, func, args],
+                id=job_id,
+                name=name,
+                replace_existing=True,
+                misfire_grace_time=int(self.misfire_grace),
+            )
+        self.scheduler.start()
+
+    async def shutdown(self, timeout: float = 0):
+        """Para de agendar e espera até `timeout` segundos pelas execuções em andamento."""
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+        if self._running and timeout > 0:
+            await asyncio.wait(self._running, timeout=timeout)
+
+    def _fire_time(self, trigger: BaseTrigger, now: datetime) -> Optional[datetime]:
+        # Último disparo previsto dentro da janela de tolerância: é o que acabou de acontecer
+        fire_time = None
+        candidate = trigger.get_next_fire_time(None, now - timedelta(seconds=self.misfire_grace))
+        while candidate is not None and candidate <= now:
+            fire_time = candidate
+            candidate = trigger.get_next_fire_time(candidate, candidate + timedelta(microseconds=1))
+        return _utc_naive(fire_time) if fire_time is not None else None
+
+    async def _start(self, job_id: str, fire_time: datetime) -> Optional[JobRun]:
+        """
+        Pega o lease do job e registra a execução numa única transação.
+        Retorna None se outro processo (ou outra execução) estiver com ele.
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            try:
+                db.add(JobLease(job_id=job_id))
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+
+            # UPDATE condicional: só um processo consegue avançar o fire_time
+            result = await db.execute(
+                update(JobLease)
+                .where(
+                    JobLease.job_id == job_id,
+                    or_(JobLease.fire_time.is_(None), JobLease.fire_time < fire_time),
+                    or_(JobLease.lease_until.is_(None), JobLease.lease_until < now),
+                )
+                .values(
+                    holder=self.holder,
+                    fire_time=fire_time,
+                    lease_until=now + timedelta(seconds=self.lease_seconds),
+                )
+            )
+            if result.rowcount != 1:
+                await db.rollback()
+                return None
+            # Com o lease livre, nenhuma execução anterior pode estar viva: as
+            # que ficaram "executando" são de um processo que caiu no meio
+            await db.execute(
+                update(JobRun)
+                .where(JobRun.job_id == job_id, JobRun.status == "executando")
+                .values(status="erro", error="lease expirado: execução interrompida", finished_at=now)
+            )
+            run = JobRun(job_id=job_id, fire_time=fire_time, holder=self.holder)
+            db.add(run)
+            await db.commit()
+            return run
+
+    async def _heartbeat(self, job_id: str):
+        """
+        Renova o lease enquanto a execução roda. O lease é curto: se o
+        processo cair, outro worker assume o job em poucos segundos.
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(JobLease)
+                        .where(JobLease.job_id == job_id, JobLease.holder == self.holder)
+                        .values(lease_until=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await db.commit()
+                if result.rowcount != 1:
+                    print(f"Job {job_id}: lease perdido para outro processo")
+                    return
+            except Exception as e:
+                # Falha pontual do banco: tenta de novo antes de o lease vencer
+                print(f"Job {job_id}: falha ao renovar o lease: {e!r}")
+
+    async def _execute(self, run: JobRun, func: Callable[..., Awaitable], args: Sequence = ()):
+        task = asyncio.current_task()
+        self._running.add(task)
+        try:
+            status, error = "erro", "interrompido"
+            started = time.perf_counter()
+            heartbeat = asyncio.create_task(self._heartbeat(run.job_id))
+            try:
+                await func(*args)
+                status, error = "sucesso", None
+            except Exception as e:
+                error = repr(e)
+                print(f"Job {run.job_id} falhou: {e!r}")
+            finally:
+                heartbeat.cancel()
+                job_duration.observe(time.perf_counter() - started, run.job_id, status)
+                # Resultado e liberação do lease juntos: quem vir o lease livre já
+                # encontra a execução concluída
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(JobRun)
+                        .where(JobRun.id == run.id)
+                        .values(status=status, error=error, finished_at=datetime.utcnow())
+                    )
+                    await db.execute(
+                        update(JobLease)
+                        .where(JobLease.job_id == run.job_id, JobLease.holder == self.holder)
+                        .values(lease_until=None)
+                    )
+                    await db.commit()
+        finally:
+            # Mesmo se a gravação falhar, a execução não fica presa em _running
+            # (o desligamento esperaria por ela até o timeout)
+            self._running.discard(task)
+
+    async def run(self, job_id: str, trigger: BaseTrigger, func: Callable[..., Awaitable], args: Sequence = ()):
+        fire_time = self._fire_time(trigger, datetime.now(timezone.utc))
+        run = await self._start(job_id, fire_time) if fire_time is not None else None
+        if run is None:
+            job_skipped.inc(job_id)
+            return False
+        await self._execute(run, func, args)
+        return True
+
+    async def submit(self, job_id: str, func: Callable[..., Awaitable], args: Sequence = ()) -> Tuple[Optional[int], bool]:
+        """
+        Executa `func(*args)` em background, fora da requisição, com o mesmo
+        lease dos jobs agendados (single-flight entre todos os workers).
+
+        Use um `job_id` próprio para execuções manuais de um job agendado:
+        com o mesmo id, o disparo manual avança o fire_time do lease e o
+        disparo agendado seguinte pode ser ignorado.
+
+        Se o job já estiver rodando em qualquer processo, nada é iniciado e
+        quem chamou recebe a execução em andamento (ou a que acabou de
+        terminar, se foi iniciada no mesmo segundo).
+
+        Returns:
+            (id da execução em `job_runs`, se ela foi iniciada agora). O id
+            só é None se o job nunca tiver sido executado e o lease estiver
+            ocupado.
+        """
+        # Segundos inteiros: é a precisão do DATETIME no MySQL, e fire_time é único por job
+        run = await self._start(job_id, datetime.utcnow().replace(microsecond=0))
+        if run is not None:
+            self._running.add(asyncio.create_task(self._execute(run, func, args)))
+            return run.id, True
+        async with AsyncSessionLocal() as db:
+            run_id = (await db.execute(
+                select(JobRun.id)
+                .filter(JobRun.job_id == job_id)
+                .order_by(JobRun.id.desc())
+                .limit(1)
+            )).scalar()
+        return run_id, False
+
+
+job_runner = JobRunner(
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    misfire_grace=settings.JOB_MISFIRE_GRACE,
+)
@@ -1,10 +1,31 @@
 # iniciar projeto fastapi
+from src.bootstrap.settings import settings
+
 
 def main():
     import uvicorn
 
-    uvicorn.run("src.bootstrap.server:app", host="0.0.0.0", port=8000, reload=True)
+    if settings.SERVER_MODE == "production":
+        # Vários processos, sem reload; no SIGTERM cada worker para de aceitar
+        # conexões, termina as requisições e drena os envios em andamento
+        uvicorn.run(
+            "src.bootstrap.server:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            workers=settings.WEB_CONCURRENCY,
+            proxy_headers=True,
+            timeout_graceful_shutdown=int(settings.SHUTDOWN_GRACE_PERIOD),
+        )
+    else:
+        # Sem o timeout, o reload esperaria para sempre pelas conexões do feed (GET /events)
+        uvicorn.run(
+            "src.bootstrap.server:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            reload=True,
+            timeout_graceful_shutdown=int(settings.SHUTDOWN_GRACE_PERIOD),
+        )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
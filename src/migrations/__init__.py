@@ -0,0 +1,58 @@
+"""
+Migrações versionadas do schema.
+
+Cada módulo `vNNNN_nome.py` deste pacote define `upgrade(conn)`, que recebe
+uma Connection síncrona (executada via `run_sync`). A versão aplicada fica na
+tabela `schema_version`. Para aplicar as pendentes:
+
+    python -m src.migrations
+"""
+import importlib
+import pkgutil
+from typing import List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def available_migrations() -> List[Tuple[int, str, object]]:
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("v"):
+            continue
+        version, _, name = info.name[1:].partition("_")
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migrations.append((int(version), name, module))
+    return sorted(migrations, key=lambda m: m[0])
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(schema_version.create, checkfirst=True)
+        return (await conn.execute(select(func.max(schema_version.c.version)))).scalar() or 0
+
+
+async def upgrade(engine: AsyncEngine) -> List[int]:
+    """Aplica, em ordem, as migrações ainda não registradas. Retorna as versões aplicadas."""
+    atual = await current_version(engine)
+    aplicadas = []
+    for version, name, module in available_migrations():
+        if version <= atual:
+            continue
+        # Cada migração na sua transação (no MySQL o DDL faz commit implícito)
+        async with engine.begin() as conn:
+            await conn.run_sync(module.upgrade)
+            await conn.execute(insert(schema_version).values(version=version, name=name))
+        print(f"Migração {version:04d} ({name}) aplicada")
+        aplicadas.append(version)
+    return aplicadas
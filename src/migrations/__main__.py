@@ -0,0 +1,15 @@
+import asyncio
+
+from src.bootstrap.database import dispose_engine, init_engine
+from src.migrations import upgrade
+
+
+async def main():
+    aplicadas = await upgrade(init_engine())
+    if not aplicadas:
+        print("Schema já está atualizado")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
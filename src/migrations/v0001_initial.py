@@ -0,0 +1,66 @@
+"""
+Schema inicial: users, dates e outbox como eram criados pelo create_all.
+
+As tabelas são copiadas aqui (e não importadas das entidades) para que esta
+migração continue produzindo o mesmo schema quando os modelos mudarem. O
+checkfirst permite aplicá-la em bancos criados antes das migrações.
+"""
+import enum
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+
+class DiasResponsavel(enum.Enum):
+    terca = "terca"
+    quinta = "quinta"
+    terca_quinta = "terca_quinta"
+
+
+class OutboxStatus(enum.Enum):
+    pendente = "pendente"
+    enviando = "enviando"
+    enviado = "enviado"
+    falhou = "falhou"
+
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nome", String(100), nullable=False),
+    Column("email", String(100), nullable=False, unique=True),
+    Column("dias_responsavel", Enum(DiasResponsavel), nullable=False),
+)
+
+Table(
+    "dates",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("data", Date, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("foi_avisado", Boolean),
+)
+
+Table(
+    "outbox",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("to_email", String(100), nullable=False),
+    Column("to_name", String(100), nullable=False),
+    Column("subject", String(255), nullable=False),
+    Column("body", Text, nullable=False),
+    Column("date_id", Integer, ForeignKey("dates.id", ondelete="SET NULL"), nullable=True),
+    Column("status", Enum(OutboxStatus), nullable=False, index=True),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime, nullable=False),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("sent_at", DateTime, nullable=True),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
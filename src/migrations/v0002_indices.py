@@ -0,0 +1,27 @@
+"""
+Índices para as consultas mais frequentes:
+
+- dates (data, user_id): intervalo de datas a avisar, ordenação da listagem
+  e limpeza das datas antigas
+- dates (foi_avisado, data): datas futuras ainda não avisadas (rebalanceamento
+  e filtro do painel)
+- users (dias_responsavel): contagem/seleção de quem vai em cada dia
+- outbox (status, next_attempt_at): busca das mensagens prontas para envio
+"""
+from sqlalchemy import Index, MetaData, Table
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection):
+    metadata = MetaData()
+    dates = Table("dates", metadata, autoload_with=conn)
+    users = Table("users", metadata, autoload_with=conn)
+    outbox = Table("outbox", metadata, autoload_with=conn)
+
+    for index in (
+        Index("ix_dates_data_user_id", dates.c.data, dates.c.user_id),
+        Index("ix_dates_foi_avisado_data", dates.c.foi_avisado, dates.c.data),
+        Index("ix_users_dias_responsavel", users.c.dias_responsavel),
+        Index("ix_outbox_status_next_attempt_at", outbox.c.status, outbox.c.next_attempt_at),
+    ):
+        index.create(conn, checkfirst=True)
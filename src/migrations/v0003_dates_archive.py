@@ -0,0 +1,23 @@
+"""
+Tabela `dates_archive`, para onde a rotina de retenção move as datas passadas.
+"""
+from sqlalchemy import Boolean, Column, Date, DateTime, Index, Integer, MetaData, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "dates_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("data", Date, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("foi_avisado", Boolean),
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_dates_archive_data", "data"),
+    Index("ix_dates_archive_user_id", "user_id"),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
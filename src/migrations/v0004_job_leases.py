@@ -0,0 +1,35 @@
+"""
+Tabelas do agendador distribuído: `job_leases` (uma trava por job) e
+`job_runs` (histórico de execuções, um registro por disparo).
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, UniqueConstraint
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "job_leases",
+    metadata,
+    Column("job_id", String(100), primary_key=True),
+    Column("holder", String(255), nullable=True),
+    Column("fire_time", DateTime, nullable=True),
+    Column("lease_until", DateTime, nullable=True),
+)
+
+Table(
+    "job_runs",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("job_id", String(100), nullable=False),
+    Column("fire_time", DateTime, nullable=False),
+    Column("holder", String(255), nullable=False),
+    Column("status", String(20), nullable=False),
+    Column("error", Text, nullable=True),
+    Column("started_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+    UniqueConstraint("job_id", "fire_time", name="uq_job_runs_job_id_fire_time"),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,21 @@
+"""
+Tabela `events`: deltas das escritas, lidos pelo feed `GET /events` de cada
+worker e usados para retomar a conexão de quem reconectou.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "events",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("tipo", String(30), nullable=False),
+    Column("dados", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
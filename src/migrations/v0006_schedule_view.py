@@ -0,0 +1,47 @@
+"""
+Tabela `schedule_view`: a escala desnormalizada (data + dados do usuário)
+lida pelas listagens e pelos avisos sem join. É preenchida aqui a partir de
+`dates` e `users`; depois disso as rotas de escrita a mantêm.
+"""
+import enum
+
+from sqlalchemy import Boolean, Column, Date, Enum, Index, Integer, MetaData, String, Table, insert, select, table, column
+from sqlalchemy.engine import Connection
+
+
+class DiasResponsavel(enum.Enum):
+    terca = "terca"
+    quinta = "quinta"
+    terca_quinta = "terca_quinta"
+
+
+metadata = MetaData()
+
+schedule_view = Table(
+    "schedule_view",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("data", Date, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("nome", String(100), nullable=False),
+    Column("email", String(100), nullable=False),
+    Column("dias_responsavel", Enum(DiasResponsavel), nullable=False),
+    Column("foi_avisado", Boolean),
+    Index("ix_schedule_view_data_id", "data", "id"),
+    Index("ix_schedule_view_user_id", "user_id"),
+    Index("ix_schedule_view_foi_avisado_data", "foi_avisado", "data"),
+)
+
+dates = table("dates", column("id"), column("data"), column("user_id"), column("foi_avisado"))
+users = table("users", column("id"), column("nome"), column("email"), column("dias_responsavel"))
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+    conn.execute(schedule_view.delete())
+    conn.execute(insert(schedule_view).from_select(
+        ["id", "data", "user_id", "nome", "email", "dias_responsavel", "foi_avisado"],
+        select(dates.c.id, dates.c.data, dates.c.user_id, users.c.nome, users.c.email, users.c.dias_responsavel,
+               dates.c.foi_avisado)
+        .select_from(dates.join(users, dates.c.user_id == users.c.id)),
+    ))
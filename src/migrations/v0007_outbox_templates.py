@@ -0,0 +1,23 @@
+"""
+Colunas da outbox para os templates de e-mail: nome e versão do template e
+os campos da mensagem em JSON. As mensagens antigas ficam sem template e
+continuam saindo só com o corpo em texto.
+"""
+from sqlalchemy import Column, Integer, String, Text, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+COLUMNS = (
+    Column("template", String(50), nullable=True),
+    Column("template_version", Integer, nullable=True),
+    Column("context", Text, nullable=True),
+)
+
+
+def upgrade(conn: Connection):
+    existentes = {c["name"] for c in inspect(conn).get_columns("outbox")}
+    for column in COLUMNS:
+        if column.name in existentes:
+            continue
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE outbox ADD COLUMN {ddl}")
@@ -0,0 +1,29 @@
+"""
+Preferências de aviso em `users` (resumo semanal e lembrete do café em cópia
+oculta) e a coluna `date_ids` da outbox, com as datas avisadas por um
+resumo. Usuários existentes continuam com os avisos de sempre.
+"""
+from sqlalchemy import Boolean, Column, Text, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+COLUMNS = {
+    "users": (
+        Column("resumo_semanal", Boolean, nullable=False, server_default=text("0")),
+        Column("cafe_em_cco", Boolean, nullable=False, server_default=text("1")),
+    ),
+    "outbox": (
+        Column("date_ids", Text, nullable=True),
+    ),
+}
+
+
+def upgrade(conn: Connection):
+    inspector = inspect(conn)
+    for table, columns in COLUMNS.items():
+        existentes = {c["name"] for c in inspector.get_columns(table)}
+        for column in columns:
+            if column.name in existentes:
+                continue
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl}")
@@ -0,0 +1,20 @@
+"""
+Coluna `bcc` da outbox: destinatários (lista JSON) de uma mensagem única em
+cópia oculta, como o lembrete do café para quem aceita recebê-lo assim.
+"""
+from sqlalchemy import Column, Text, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+COLUMNS = (
+    Column("bcc", Text, nullable=True),
+)
+
+
+def upgrade(conn: Connection):
+    existentes = {c["name"] for c in inspect(conn).get_columns("outbox")}
+    for column in COLUMNS:
+        if column.name in existentes:
+            continue
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE outbox ADD COLUMN {ddl}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum
+from sqlalchemy import Boolean, Column, Integer, String, Enum, Index
 from sqlalchemy.orm import relationship
 
 from src.users.enums import DiasResponsavel
@@ -8,8 +8,16 @@ from src.bootstrap.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_dias_responsavel", "dias_responsavel"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
     email = Column(String(100), nullable=False, unique=True)
     dias_responsavel = Column(Enum(DiasResponsavel), nullable=False, default=DiasResponsavel.terca_quinta)
+    # Preferências de aviso: um resumo semanal no lugar dos avisos de cada
+    # data e do lembrete do café, e se o lembrete do café pode chegar em cópia
+    # oculta junto com os outros (quando EMAIL_BCC_ENABLED permite)
+    resumo_semanal = Column(Boolean, nullable=False, default=False)
+    cafe_em_cco = Column(Boolean, nullable=False, default=True)
     dates = relationship("Dates", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
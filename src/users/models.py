@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from src.users.enums import DiasResponsavel
 
 
@@ -24,3 +24,41 @@ class UserOut(BaseModel):
     model_config = {
         "from_attributes": True  # substitui 'orm_mode = True'
     }
+
+
+class UserPreferences(BaseModel):
+    """
+    Preferências de aviso do usuário.
+
+    Atributos:
+        resumo_semanal: recebe um resumo por semana (dias de pão, quantos pães
+            e dias de café) no lugar dos avisos de cada data e do lembrete do café
+        cafe_em_cco: aceita receber o lembrete do café em cópia oculta, numa
+            mensagem única para o grupo (vale com EMAIL_BCC_ENABLED)
+    """
+    resumo_semanal: bool = False
+    cafe_em_cco: bool = True
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class UserPreferencesUpdate(BaseModel):
+    resumo_semanal: Optional[bool] = None
+    cafe_em_cco: Optional[bool] = None
+
+
+class UserImportResult(BaseModel):
+    linha: int
+    email: Optional[str] = None
+    status: str  # criado, atualizado, ignorado ou erro
+    id: Optional[int] = None
+    erro: Optional[str] = None
+
+
+class UserImportSummary(BaseModel):
+    criados: int
+    atualizados: int
+    erros: int
+    resultados: List[UserImportResult]
@@ -0,0 +1,97 @@
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bootstrap.cache import table_version
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.settings import settings
+from src.dates.services import DIAS_DO_CAFE
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+
+
+class RosterEntry(NamedTuple):
+    id: int
+    nome: str
+    email: str
+    # Dias da semana de café em que a pessoa está escalada (1=terça, 3=quinta)
+    dias: Tuple[int, ...]
+    # Preferências de aviso (ver User)
+    resumo_semanal: bool
+    cafe_em_cco: bool
+
+
+class Roster(NamedTuple):
+    # Dia da semana (1=terça, 3=quinta) -> quem está escalado, em ordem de id
+    por_dia: Dict[int, Tuple[RosterEntry, ...]]
+    # (id, dias_responsavel) de todos, em ordem de id, como distribuir_datas espera
+    usuarios: Tuple[Tuple[int, DiasResponsavel], ...]
+    por_id: Dict[int, RosterEntry]
+
+
+class RosterIndex:
+    """
+    Índice em memória de quem está escalado em cada dia de café, carregado
+    com uma única consulta e reaproveitado por lembretes, avisos e geração da
+    escala.
+
+    As rotas de escrita de usuários chamam `invalidate` e incrementam a versão
+    da tabela `users` (ver `bump_version`); quando ela muda o índice é
+    recarregado no próximo uso, inclusive nos outros workers da máquina. Em
+    outras máquinas vale o limite de `ROSTER_INDEX_TTL` segundos.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._roster: Optional[Roster] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        """Descarta o índice deste processo; o próximo `get` recarrega."""
+        self._roster = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._roster is not None
+            and self._version == table_version("users")
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def get(self, db: Optional[AsyncSession] = None) -> Roster:
+        if self._fresh():
+            return self._roster
+        # Versão lida antes da consulta: uma escrita no meio força nova carga
+        version = table_version("users")
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(self._query())).all()
+        else:
+            rows = (await db.execute(self._query())).all()
+
+        por_dia: Dict[int, List[RosterEntry]] = {weekday: [] for weekday in DIAS_DO_CAFE}
+        por_id: Dict[int, RosterEntry] = {}
+        for uid, nome, email, dias, resumo_semanal, cafe_em_cco in rows:
+            weekdays = tuple(weekday for weekday, permitidos in DIAS_DO_CAFE.items() if dias in permitidos)
+            entry = por_id[uid] = RosterEntry(uid, nome, email, weekdays, bool(resumo_semanal), bool(cafe_em_cco))
+            for weekday in weekdays:
+                por_dia[weekday].append(entry)
+        self._roster = Roster(
+            por_dia={weekday: tuple(entries) for weekday, entries in por_dia.items()},
+            usuarios=tuple((row[0], row[3]) for row in rows),
+            por_id=por_id,
+        )
+        self._version = version
+        self._loaded_at = time.monotonic()
+        return self._roster
+
+    @staticmethod
+    def _query():
+        return select(
+            User.id, User.nome, User.email, User.dias_responsavel, User.resumo_semanal, User.cafe_em_cco
+        ).order_by(User.id)
+
+
+roster_index = RosterIndex(ttl=settings.ROSTER_INDEX_TTL)
@@ -1,33 +1,40 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Depends, APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.bootstrap.database import get_db, SessionLocal
+from src.bootstrap.cache import bump_version, cached_response
+from src.bootstrap.database import AsyncSessionLocal, get_db
+from src.dates.schedule import refresh_schedule
+from src.dates.services import rebalancear_datas
+from src.events.services import event_bus, publish, user_delta
 from src.users.entity import User
 from src.users.enums import DiasResponsavel
-from src.users.models import UserOut, UserCreate, UserUpdate
+from src.users.roster import roster_index
+from src.users.models import UserOut, UserCreate, UserUpdate, UserImportSummary, UserPreferences, UserPreferencesUpdate
+from src.users.services import dump_user_rows, export_users, import_users, parse_csv, parse_ndjson
 
 router: APIRouter = APIRouter(prefix='/users')
 
 @router.get("/", response_model=List[UserOut])
-def get_users():
-    db = SessionLocal()
-    with db:
-        users = db.query(User).all()
-    db.close()
-    return users
+async def get_users(request: Request, db: AsyncSession = Depends(get_db)):
+    async def build(headers):
+        rows = await db.execute(select(User.id, User.nome, User.email, User.dias_responsavel))
+        return dump_user_rows(rows)
+    return await cached_response(request, ("users",), build)
 
 @router.get("/dias/", response_model=List[str])
-def get_dias():
-    return [e.value for e in DiasResponsavel]
+async def get_dias(request: Request):
+    async def build(headers):
+        return [e.value for e in DiasResponsavel]
+    return await cached_response(request, (), build)
 
 @router.post("/", response_model=UserOut)
-def create_user(user: UserCreate):
-    db = SessionLocal()
-    existing = db.query(User).filter(User.email == user.email).first()
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing = (await db.execute(select(User).filter(User.email == user.email))).scalars().first()
     if existing:
-        db.close()
         raise HTTPException(status_code=400, detail="Email já cadastrado")
 
     db_user = User(
@@ -36,14 +43,68 @@ def create_user(user: UserCreate):
         dias_responsavel=user.dias_responsavel
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    db.close()
+    await db.flush()
+    await publish(db, [("user.created", user_delta(db_user))])
+    # O novo usuário assume algumas datas dos mais carregados, na mesma transação
+    await rebalancear_datas(db, db_user.id)
+    await db.commit()
+    bump_version("users", "dates")
+    roster_index.invalidate()
+    event_bus.wake()
+    await db.refresh(db_user)
     return db_user
 
+@router.post("/bulk", response_model=UserImportSummary)
+async def bulk_import_users(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Cadastra ou atualiza (pelo e-mail) vários usuários de uma vez.
+
+    O corpo é lido aos poucos e pode ser:
+    - CSV (Content-Type text/csv) com cabeçalho nome,email[,dias_responsavel]
+    - NDJSON (Content-Type application/x-ndjson), um objeto por linha
+
+    Retorna o resultado de cada linha: criado, atualizado, ignorado (e-mail
+    repetido mais adiante no arquivo) ou erro.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        rows = parse_csv(request.stream())
+    elif content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        rows = parse_ndjson(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Envie text/csv ou application/x-ndjson")
+
+    resultados = await import_users(db, rows)
+    if any(r.status in ("criado", "atualizado") for r in resultados):
+        bump_version("users", "dates")
+        roster_index.invalidate()
+        event_bus.wake()
+    return UserImportSummary(
+        criados=sum(r.status == "criado" for r in resultados),
+        atualizados=sum(r.status == "atualizado" for r in resultados),
+        erros=sum(r.status == "erro" for r in resultados),
+        resultados=resultados,
+    )
+
+@router.get("/export")
+async def export_users_route(formato: Optional[str] = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    """Exporta o cadastro completo em CSV (padrão) ou NDJSON, em streaming."""
+    async def stream():
+        # Sessão própria: a do Depends pode ser fechada antes do fim do streaming
+        async with AsyncSessionLocal() as db:
+            async for chunk in export_users(db, formato):
+                yield chunk
+
+    if formato == "csv":
+        return StreamingResponse(
+            stream(), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="usuarios.csv"'},
+        )
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.put("/{user_id}")
-def update_user(user_id: int, data: UserUpdate, db: Session = Depends(get_db)):
-    user = db.query(User).get(user_id)
+async def update_user(user_id: int, data: UserUpdate, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
@@ -51,28 +112,74 @@ def update_user(user_id: int, data: UserUpdate, db: Session = Depends(get_db)):
         user.nome = data.nome
     if data.email is not None:
         user.email = data.email
+    dias_alterados = data.dias_responsavel is not None and data.dias_responsavel != user.dias_responsavel
     if data.dias_responsavel is not None:
         user.dias_responsavel = data.dias_responsavel
 
-    db.commit()
-    db.refresh(user)
+    await publish(db, [("user.updated", user_delta(user))])
+    if dias_alterados:
+        await db.flush()
+        await rebalancear_datas(db, user.id)
+    # Nome, e-mail e dias ficam copiados em cada data do usuário no read model
+    await refresh_schedule(db, user_ids=[user.id])
+    await db.commit()
+    bump_version("users", "dates")
+    roster_index.invalidate()
+    event_bus.wake()
+    await db.refresh(user)
     return user
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).get(user_id)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    db.delete(user)
-    db.commit()
+    # Repassa as datas futuras do usuário antes que o cascade as apague
+    await rebalancear_datas(db, user_id, removido=True)
+    await db.delete(user)
+    await refresh_schedule(db, user_ids=[user_id])
+    await publish(db, [("user.deleted", {"id": user_id})])
+    await db.commit()
+    bump_version("users", "dates")
+    roster_index.invalidate()
+    event_bus.wake()
     return {"message": "Usuário deletado com sucesso"}
 
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: int):
-    db = SessionLocal()
-    user = db.query(User).filter(User.id == user_id).first()
-    db.close()
+async def get_user(user_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build(headers):
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        return UserOut.model_validate(user)
+    return await cached_response(request, ("users",), build)
+
+
+@router.get("/{user_id}/preferencias", response_model=UserPreferences)
+async def get_user_preferences(user_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build(headers):
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        return UserPreferences.model_validate(user)
+    return await cached_response(request, ("users",), build)
+
+@router.put("/{user_id}/preferencias", response_model=UserPreferences)
+async def update_user_preferences(user_id: int, data: UserPreferencesUpdate, db: AsyncSession = Depends(get_db)):
+    """
+    Altera as preferências de aviso: resumo semanal no lugar dos avisos de
+    cada data e do lembrete do café, e lembrete do café em cópia oculta.
+    """
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    return user
\ No newline at end of file
+
+    for campo, valor in data.model_dump(exclude_none=True).items():
+        setattr(user, campo, valor)
+    await db.commit()
+    # Também invalida o índice de escalados, que guarda as preferências
+    bump_version("users")
+    roster_index.invalidate()
+    await db.refresh(user)
+    return UserPreferences.model_validate(user)
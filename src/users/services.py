@@ -0,0 +1,239 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import Row, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bootstrap.settings import settings
+from src.dates.schedule import refresh_schedule
+from src.dates.services import rebalancear_datas
+from src.events.services import publish
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+from src.users.models import UserCreate, UserImportResult
+
+CSV_COLUMNS = ("id", "nome", "email", "dias_responsavel")
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Quebra o corpo recebido em linhas sem juntar tudo em memória."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Lê um CSV com cabeçalho (nome, email e opcionalmente dias_responsavel),
+    separado por vírgula ou ponto e vírgula. Gera (linha, dados, erro).
+    """
+    header = None
+    delimiter = ","
+    numero = 0
+    registro = ""
+    async for line in _lines(chunks):
+        numero += 1
+        # Campo entre aspas com quebra de linha: junta até as aspas fecharem
+        registro = f"{registro}\n{line}" if registro else line
+        if registro.count('"') % 2:
+            continue
+        texto, registro = registro, ""
+        if not texto.strip():
+            continue
+        if header is None:
+            if ";" in texto and "," not in texto:
+                delimiter = ";"
+            header = [c.strip().lower() for c in next(csv.reader([texto], delimiter=delimiter))]
+            faltando = {"nome", "email"} - set(header)
+            if faltando:
+                yield numero, None, f"Cabeçalho sem as colunas: {', '.join(sorted(faltando))}"
+                return
+            continue
+        valores = next(csv.reader(io.StringIO(texto), delimiter=delimiter))
+        dados = {col: valor.strip() for col, valor in zip(header, valores) if col in ("nome", "email", "dias_responsavel")}
+        if not dados.get("dias_responsavel"):
+            dados.pop("dias_responsavel", None)
+        yield numero, dados, None
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Lê um objeto JSON por linha. Gera (linha, dados, erro)."""
+    numero = 0
+    async for line in _lines(chunks):
+        numero += 1
+        if not line.strip():
+            continue
+        try:
+            dados = json.loads(line)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(dados, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, dados, None
+
+
+def _upsert(db: AsyncSession, rows: List[dict]):
+    """INSERT multi-linha que atualiza nome e dias de quem já tem o e-mail cadastrado."""
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(User).values(rows)
+        return stmt.on_duplicate_key_update(nome=stmt.inserted.nome, dias_responsavel=stmt.inserted.dias_responsavel)
+    stmt = sqlite_insert(User).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.email],
+        set_={"nome": stmt.excluded.nome, "dias_responsavel": stmt.excluded.dias_responsavel},
+    )
+
+
+async def _import_batch(
+    db: AsyncSession,
+    batch: List[Tuple[int, UserCreate]],
+    resultados: List[UserImportResult],
+    alterados: Dict[int, bool],
+    vistos: Dict[str, Tuple[int, Optional[DiasResponsavel]]],
+):
+    # E-mail repetido no mesmo lote: vale a última linha
+    ultimas = {}
+    for numero, user in batch:
+        anterior = ultimas.get(user.email)
+        if anterior is not None:
+            resultados.append(UserImportResult(
+                linha=anterior[0], email=user.email, status="ignorado", erro=f"Substituída pela linha {numero}"
+            ))
+        ultimas[user.email] = (numero, user)
+
+    emails = list(ultimas)
+    existentes = {
+        email: (uid, dias)
+        for uid, email, dias in await db.execute(
+            select(User.id, User.email, User.dias_responsavel).filter(User.email.in_(emails))
+        )
+    }
+    await db.execute(_upsert(db, [
+        {"nome": user.nome, "email": user.email, "dias_responsavel": user.dias_responsavel}
+        for _, user in ultimas.values()
+    ]))
+    novos = [email for email in emails if email not in existentes]
+    ids = dict((await db.execute(select(User.email, User.id).filter(User.email.in_(novos)))).all()) if novos else {}
+
+    for email, (numero, user) in ultimas.items():
+        if email in vistos:
+            # E-mail já importado num lote anterior: aquela linha passa a ser a
+            # ignorada e esta herda o status (criado ou atualizado) dela
+            posicao, dias = vistos[email]
+            anterior = resultados[posicao]
+            resultados[posicao] = UserImportResult(
+                linha=anterior.linha, email=email, status="ignorado", erro=f"Substituída pela linha {numero}"
+            )
+            status, uid = anterior.status, anterior.id
+        elif email in existentes:
+            (uid, dias), status = existentes[email], "atualizado"
+        else:
+            uid, dias, status = ids[email], None, "criado"
+        vistos[email] = (len(resultados), dias)
+        resultados.append(UserImportResult(linha=numero, email=email, status=status, id=uid))
+        if dias is None:
+            alterados.setdefault(uid, False)
+        elif dias != user.dias_responsavel:
+            alterados[uid] = True
+        else:
+            # Voltou aos dias de antes da importação
+            alterados.pop(uid, None)
+
+
+async def import_users(db: AsyncSession, rows: AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]) -> List[UserImportResult]:
+    """
+    Valida cada linha com `UserCreate` e faz upsert por e-mail em lotes de
+    USERS_BULK_BATCH_SIZE linhas, tudo numa transação. Linhas inválidas são
+    reportadas e puladas. No fim a escala é rebalanceada uma única vez para
+    os usuários novos e os que mudaram de dias.
+    """
+    resultados: List[UserImportResult] = []
+    # user_id -> se mudou de dias (False para usuários novos)
+    alterados: Dict[int, bool] = {}
+    # e-mail -> (posição do resultado da última linha com ele, dias antes da
+    # importação ou None se foi criado): repetições entre lotes diferentes
+    vistos: Dict[str, Tuple[int, Optional[DiasResponsavel]]] = {}
+    batch: List[Tuple[int, UserCreate]] = []
+
+    async for numero, dados, erro in rows:
+        if erro is None:
+            try:
+                batch.append((numero, UserCreate.model_validate(dados)))
+            except ValidationError as e:
+                erro = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        if erro is not None:
+            email = dados.get("email") if isinstance(dados, dict) else None
+            resultados.append(UserImportResult(linha=numero, email=email, status="erro", erro=erro))
+        if len(batch) >= settings.USERS_BULK_BATCH_SIZE:
+            await _import_batch(db, batch, resultados, alterados, vistos)
+            batch = []
+    if batch:
+        await _import_batch(db, batch, resultados, alterados, vistos)
+
+    if alterados:
+        # Um único balanceamento para todos: as datas que quem mudou de dias
+        # não cobre mais são redistribuídas juntas, já contando com os novos
+        await rebalancear_datas(db, *(uid for uid, mudou_dias in alterados.items() if mudou_dias))
+    # Usuários atualizados: nome, e-mail e dias copiados nas datas do read model
+    await refresh_schedule(db, user_ids=[r.id for r in resultados if r.status == "atualizado"])
+    if alterados:
+        # Carga em massa: os clientes do feed recarregam as listas
+        await publish(db, [("reset", {"tabelas": ["users", "dates"]})])
+    await db.commit()
+
+    resultados.sort(key=lambda r: r.linha)
+    return resultados
+
+
+def dump_user_rows(rows: Iterable[Row]) -> bytes:
+    """Lista de (id, nome, email, dias_responsavel) em JSON, igual à de List[UserOut]."""
+    return orjson.dumps([
+        {"id": uid, "nome": nome, "email": email, "dias_responsavel": dias.value}
+        for uid, nome, email, dias in rows
+    ])
+
+
+async def export_users(db: AsyncSession, formato: str) -> AsyncIterator[bytes]:
+    """Gera o cadastro em CSV ou NDJSON, lendo do banco em blocos."""
+    result = await db.stream(
+        select(User.id, User.nome, User.email, User.dias_responsavel)
+        .order_by(User.id)
+        .execution_options(yield_per=500)
+    )
+    if formato == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        async for partition in result.partitions():
+            for uid, nome, email, dias in partition:
+                writer.writerow((uid, nome, email, dias.value))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        async for partition in result.partitions():
+            yield b"".join(
+                orjson.dumps(
+                    {"id": uid, "nome": nome, "email": email, "dias_responsavel": dias.value},
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+                for uid, nome, email, dias in partition
+            )
@@ -1,3 +1,7 @@
 #!/bin/bash
 export PYTHONPATH=/app
+python3 -m src.migrations || exit 1
+# CSS do painel (Tailwind purgado e minificado) e versões .gz/.br; sem ele o
+# painel sai com o Tailwind da CDN
+python3 -m src.dashboard.build || echo "Painel sem build: servindo o index.html original"
 exec supervisord -c /app/supervisord.conf
\ No newline at end of file
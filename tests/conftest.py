@@ -0,0 +1,113 @@
+"""
+Ambiente dos testes: SQLite num diretório temporário (um banco novo a cada execução) e
+nenhum servidor SMTP externo.
+
+As variáveis de ambiente são definidas aqui, antes de qualquer import de
+`src`, porque as configurações são lidas na importação de
+`src.bootstrap.settings`.
+"""
+import asyncio
+import itertools
+import os
+import socket
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+import pytest
+from sqlalchemy import select
+
+_WORKDIR = tempfile.mkdtemp(prefix="buy_bread-tests-")
+os.environ.update({
+    "MYSQL_HOST": "",
+    "SQLITE_URL": f"sqlite+aiosqlite:///{os.path.join(_WORKDIR, 'tests.db')}",
+    "CACHE_VERSION_DIR": os.path.join(_WORKDIR, "cache"),
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_START_TLS": "false",
+    "FROM_EMAIL": "testes@example.com",
+    "ROOT_PATH": "/",
+})
+# Com usuário definido (mesmo vazio) o aiosmtplib tenta AUTH
+os.environ.pop("SMTP_USER", None)
+os.environ.pop("SMTP_PASS", None)
+
+from src.bootstrap import cache, database  # noqa: E402
+from src.bootstrap.database import AsyncSessionLocal  # noqa: E402
+from src.bootstrap.settings import settings  # noqa: E402
+from src.dates.entity import Dates  # noqa: E402
+from src.dates.schedule import rebuild_schedule  # noqa: E402
+from src.dates.services import DIAS_DO_CAFE, distribuir_datas  # noqa: E402
+from src.migrations import upgrade  # noqa: E402
+from src.users.entity import User  # noqa: E402
+from src.users.enums import DiasResponsavel  # noqa: E402
+from src.users.roster import roster_index  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def seed_schedule(dias: Sequence[DiasResponsavel], semanas: int = 12):
+    """
+    Cadastra um usuário por item de `dias` (ids 1, 2, ...) e distribui entre
+    eles as terças e quintas das próximas `semanas`, como a geração da escala.
+    """
+    inicio = date.today() + timedelta(days=1)
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            User(id=uid, nome=f"Pessoa {uid}", email=f"pessoa{uid}@example.com", dias_responsavel=d)
+            for uid, d in enumerate(dias, 1)
+        ])
+        await db.flush()
+        db.add_all([
+            Dates(data=dia, user_id=uid)
+            for dia, uid in distribuir_datas(enumerate(dias, 1), inicio, inicio + timedelta(weeks=semanas, days=-1))
+        ])
+        await db.flush()
+        await rebuild_schedule(db)
+        await db.commit()
+
+
+async def schedule_state() -> Tuple[List[Tuple[date, int]], Dict[int, int]]:
+    """
+    Escala atual: (datas fora dos dias do responsável, quantidade de datas por
+    usuário, com zero para quem não tem nenhuma).
+    """
+    async with AsyncSessionLocal() as db:
+        dias = dict((await db.execute(select(User.id, User.dias_responsavel))).all())
+        datas = (await db.execute(select(Dates.data, Dates.user_id))).all()
+    fora = [(data, uid) for data, uid in datas if dias[uid] not in DIAS_DO_CAFE.get(data.weekday(), ())]
+    contagem = {uid: 0 for uid in dias}
+    for _, uid in datas:
+        contagem[uid] += 1
+    return fora, contagem
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """
+    Executa `func(*args)` num event loop novo, com um banco SQLite novo e
+    migrado a cada chamada (e caches em memória zerados); o engine é
+    descartado no fim, junto com o loop. O banco usado fica em
+    `settings.DATABASE_URL`.
+    """
+    monkeypatch.setattr(settings, "CACHE_VERSION_DIR", str(tmp_path / "cache"))
+    os.makedirs(settings.CACHE_VERSION_DIR)
+    monkeypatch.setattr(settings, "DATABASE_URL", settings.DATABASE_URL)
+    chamadas = itertools.count(1)
+
+    def runner(func, *args):
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{tmp_path / f'test{next(chamadas)}.db'}"
+        monkeypatch.setattr(cache, "response_cache", cache.ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, 60))
+        roster_index.invalidate()
+
+        async def main():
+            await upgrade(database.init_engine())
+            try:
+                return await func(*args)
+            finally:
+                await database.dispose_engine()
+        return asyncio.run(main())
+    return runner
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import text
+
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.server import app
+
+# Consulta pesada no próprio SQLite: conta até alguns milhões sem tocar tabelas
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < :n) SELECT count(*) FROM c"
+)
+
+
+async def _slow_query(n: int) -> float:
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await db.execute(SLOW_QUERY, {"n": n})
+    return time.perf_counter() - started
+
+
+async def _request_during_slow_query():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Aquece a conexão e as importações tardias, fora da medição
+        await client.get("/users/")
+        sozinha = await _slow_query(3_000_000)
+
+        lenta = asyncio.create_task(_slow_query(3_000_000))
+        await asyncio.sleep(sozinha / 10)
+        started = time.perf_counter()
+        response = await client.get("/users/")
+        latencia = time.perf_counter() - started
+        ainda_rodando = not lenta.done()
+        await lenta
+    return sozinha, latencia, ainda_rodando, response.status_code
+
+
+def test_slow_query_does_not_block_other_requests(run):
+    sozinha, latencia, ainda_rodando, status = run(_request_during_slow_query)
+
+    assert status == 200
+    # A requisição é atendida enquanto a consulta lenta ainda está no banco,
+    # em bem menos tempo do que ela leva: o event loop não ficou bloqueado
+    assert ainda_rodando
+    assert latencia < sozinha / 2
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from conftest import seed_schedule
+from src.bootstrap.cache import table_version
+from src.bootstrap.database import AsyncSessionLocal
+from src.dates import routes
+from src.dates.entity import Dates, ScheduleView
+from src.dates.models import DateBatch
+from src.events.entity import Event
+from src.users.enums import DiasResponsavel
+
+t, q, tq = DiasResponsavel.terca, DiasResponsavel.quinta, DiasResponsavel.terca_quinta
+
+
+async def _estado():
+    async with AsyncSessionLocal() as db:
+        datas = (await db.execute(select(Dates.id, Dates.data, Dates.user_id).order_by(Dates.id))).all()
+        view = (await db.execute(
+            select(ScheduleView.id, ScheduleView.data, ScheduleView.user_id, ScheduleView.nome).order_by(ScheduleView.id)
+        )).all()
+        eventos = (await db.execute(select(Event.tipo).order_by(Event.id))).scalars().all()
+    return [tuple(d) for d in datas], [tuple(v) for v in view], eventos, table_version("dates")
+
+
+async def _batch(operacoes):
+    # Escala de uma semana: a terça com o usuário 1 e a quinta com o 2
+    await seed_schedule([t, q, tq], semanas=1)
+    antes = await _estado()
+    (terca, _, _), (quinta, _, _) = sorted(antes[0], key=lambda d: d[1].weekday())
+    datas = {d[0]: d[1] for d in antes[0]}
+    operacoes = operacoes(terca, quinta, datas)
+    erro = None
+    try:
+        async with AsyncSessionLocal() as db:
+            resultado = await routes.batch_dates(DateBatch.model_validate({"operacoes": operacoes}), db)
+    except (HTTPException, RuntimeError) as e:
+        erro, resultado = e, None
+    return antes, await _estado(), resultado, erro, terca, quinta
+
+
+def _misto(terca, quinta, datas):
+    return [
+        {"op": "delete", "id": terca},
+        {"op": "update", "id": quinta, "user_id": 3},
+        {"op": "create", "data": datas[terca] + timedelta(weeks=1), "user_id": 1},
+    ]
+
+
+def test_mixed_batch_is_applied_with_events_and_cache_bump(run):
+    antes, depois, resultado, erro, terca, quinta = run(_batch, _misto)
+    datas, view, eventos, versao = depois
+    dia = {date_id: data for date_id, data, _ in antes[0]}
+    terca_data, quinta_data = dia[terca], dia[quinta]
+
+    assert erro is None
+    assert resultado.apagadas == [terca]
+    assert [(d.data, d.user.id) for d in resultado.datas] == [(quinta_data, 3), (terca_data + timedelta(weeks=1), 1)]
+    assert [(d[1], d[2]) for d in datas] == [(quinta_data, 3), (terca_data + timedelta(weeks=1), 1)]
+    # O read model acompanha, com o nome do novo responsável
+    assert [(v[1], v[2], v[3]) for v in view] == [(quinta_data, 3, "Pessoa 3"), (terca_data + timedelta(weeks=1), 1, "Pessoa 1")]
+    assert eventos[len(antes[2]):] == ["date.deleted", "date.updated", "date.created"]
+    assert versao > antes[3]
+
+
+@pytest.mark.parametrize("operacoes", [
+    # Terça para quem só vai na quinta
+    lambda terca, quinta, datas: [
+        {"op": "delete", "id": quinta},
+        {"op": "create", "data": datas[terca], "user_id": 2},
+    ],
+    # Alteração só da data: a quinta do usuário 2 vira terça
+    lambda terca, quinta, datas: [
+        {"op": "create", "data": datas[quinta] + timedelta(weeks=1), "user_id": 3},
+        {"op": "update", "id": quinta, "data": datas[terca]},
+    ],
+    # Alteração só do responsável: a terça vai para quem só vai na quinta
+    lambda terca, quinta, datas: [{"op": "update", "id": terca, "user_id": 2}],
+    # Segunda-feira: ninguém cobre
+    lambda terca, quinta, datas: [{"op": "create", "data": datas[terca] - timedelta(days=1), "user_id": 3}],
+])
+def test_batch_rejects_dates_outside_the_user_days(run, operacoes):
+    antes, depois, resultado, erro, _, _ = run(_batch, operacoes)
+
+    assert isinstance(erro, HTTPException) and erro.status_code == 400
+    assert "fora dos dias" in erro.detail
+    assert depois == antes
+
+
+def test_batch_failing_midway_is_rolled_back(run, monkeypatch):
+    async def falha(db, eventos):
+        raise RuntimeError("falha depois das escritas")
+
+    monkeypatch.setattr(routes, "publish", falha)
+    antes, depois, resultado, erro, _, _ = run(_batch, _misto)
+
+    assert isinstance(erro, RuntimeError)
+    # Nada das exclusões, alterações e criações já enviadas ao banco ficou
+    assert depois == antes
@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event, insert, select
+
+from src.bootstrap import database
+from src.bootstrap.database import AsyncSessionLocal
+from src.dates.entity import Dates, ScheduleView
+from src.dates.schedule import rebuild_schedule
+from src.dates.services import get_dates_to_notify
+from src.emails.dispatcher import OutboxDispatcher
+from src.emails.entity import Outbox
+from src.emails.services import send_emails_for_dates
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+
+
+@contextmanager
+def count_queries():
+    """Conta os comandos SQL e os commits enviados ao banco dentro do bloco."""
+    contagem = {"queries": 0, "commits": 0}
+
+    def on_execute(*args):
+        contagem["queries"] += 1
+
+    def on_commit(*args):
+        contagem["commits"] += 1
+
+    engine = database.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield contagem
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+
+async def _seed(users: int, semanas: int):
+    dias = [DiasResponsavel.terca, DiasResponsavel.quinta, DiasResponsavel.terca_quinta]
+    inicio = date.today()
+    datas = [inicio + timedelta(days=i) for i in range(semanas * 7) if (inicio + timedelta(days=i)).weekday() in (1, 3)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"id": i, "nome": f"Pessoa {i}", "email": f"pessoa{i}@example.com", "dias_responsavel": dias[i % 3]}
+            for i in range(1, users + 1)
+        ])
+        await db.execute(insert(Dates), [
+            {"data": dia, "user_id": i % users + 1} for i, dia in enumerate(datas)
+        ])
+        await rebuild_schedule(db)
+        await db.commit()
+
+
+async def _queries_to_notify(users: int, days: int) -> dict:
+    await _seed(users, semanas=days // 7 + 1)
+    async with AsyncSessionLocal() as db:
+        dates = await get_dates_to_notify(db, days)
+        with count_queries() as contagem:
+            await send_emails_for_dates(dates, db)
+        enfileirados = len((await db.execute(select(Outbox.id))).all())
+    assert enfileirados == len(dates) > 0
+    return contagem
+
+
+def test_send_emails_for_dates_query_count_does_not_grow_with_dates(run):
+    poucas = run(_queries_to_notify, 5, 7)
+    muitas = run(_queries_to_notify, 50, 70)
+
+    # Uma leitura do índice de escalados e um INSERT multi-linha na outbox,
+    # numa única transação, qualquer que seja o número de datas e usuários
+    assert poucas == muitas
+    assert muitas["queries"] <= 2
+    assert muitas["commits"] == 1
+
+
+async def _queries_to_confirm(n: int) -> dict:
+    await _seed(10, semanas=n)
+    dispatcher = OutboxDispatcher(1, 1, 1, 1, 1, 1, 60)
+    async with AsyncSessionLocal() as db:
+        dates = (await db.execute(select(Dates.id))).scalars().all()[:n]
+        db.add_all([
+            Outbox(to_email=f"pessoa{i}@example.com", to_name="Pessoa", subject="s", body="b", date_id=date_id)
+            for i, date_id in enumerate(dates)
+        ])
+        await db.commit()
+        for item in (await db.execute(select(Outbox))).scalars():
+            dispatcher._mark_sent(item)
+
+    with count_queries() as contagem:
+        await dispatcher._flush_delivered()
+
+    async with AsyncSessionLocal() as db:
+        avisadas = (await db.execute(select(ScheduleView.id).filter(ScheduleView.foi_avisado.is_(True)))).all()
+    assert len(avisadas) == n
+    return contagem
+
+
+def test_delivery_confirmations_are_written_in_one_transaction(run):
+    poucas = run(_queries_to_confirm, 2)
+    muitas = run(_queries_to_confirm, 40)
+
+    # outbox, dates, schedule_view e events: um comando para cada tabela
+    assert poucas == muitas
+    assert muitas["queries"] <= 4
+    assert muitas["commits"] == 1
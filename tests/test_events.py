@@ -0,0 +1,52 @@
+import asyncio
+import re
+
+from src.bootstrap.database import AsyncSessionLocal
+from src.events import routes
+from src.events.services import EventBus, publish
+
+
+async def _publish(*ids: int):
+    async with AsyncSessionLocal() as db:
+        await publish(db, [("user.updated", {"id": i}) for i in ids])
+        await db.commit()
+
+
+async def _ids_sent_when_events_arrive_during_replay(monkeypatch) -> list:
+    # Polling só quando acordado, para controlar o que chega à fila e quando
+    bus = EventBus(poll_interval=60, queue_size=100, resume_limit=100, gap_grace=10)
+    monkeypatch.setattr(routes, "event_bus", bus)
+    await _publish(1, 2, 3)
+
+    replay = bus.replay
+
+    async def replay_during_writes(since):
+        # Eventos 4 e 5 chegam à fila da conexão antes da consulta do replay
+        await _publish(4, 5)
+        bus.wake()
+        while bus.last_id != 5:
+            await asyncio.sleep(0.01)
+        return await replay(since)
+
+    monkeypatch.setattr(bus, "replay", replay_during_writes)
+
+    response = await routes.events(since=1, last_event_id=None)
+    stream = response.body_iterator.__aiter__()
+    ids = []
+    try:
+        while 6 not in ids:
+            chunk = await asyncio.wait_for(stream.__anext__(), timeout=5)
+            ids += [int(i) for i in re.findall(rb"^id: (\d+)$", chunk, re.M)]
+            if ids[-1:] == [5]:
+                # Um evento depois do replay marca o fim do que interessa
+                await _publish(6)
+                bus.wake()
+    finally:
+        await stream.aclose()
+    return ids
+
+
+def test_events_published_during_replay_are_sent_once(run, monkeypatch):
+    ids = run(_ids_sent_when_events_arrive_during_replay, monkeypatch)
+
+    assert ids == [2, 3, 4, 5, 6]
@@ -0,0 +1,109 @@
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import event, insert, text
+
+from src.bootstrap import database
+from src.bootstrap.database import AsyncSessionLocal
+from src.dates.entity import Dates
+from src.dates.retention import archive_old_dates
+from src.dates.schedule import rebuild_schedule
+from src.dates.services import get_dates_to_notify, rebalancear_datas
+from src.emails.dispatcher import OutboxDispatcher
+from src.emails.entity import Outbox
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+
+
+@contextmanager
+def capture_queries():
+    """Guarda (SQL, parâmetros) de cada comando enviado ao banco dentro do bloco."""
+    queries: List[Tuple[str, tuple]] = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            queries.append((statement, parameters))
+
+    engine = database.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+async def query_plan(queries: List[Tuple[str, tuple]], table: str) -> str:
+    """Plano do SQLite (EXPLAIN QUERY PLAN) dos comandos que leem `table`."""
+    linhas = []
+    async with database.engine.connect() as conn:
+        for statement, parameters in queries:
+            if f"FROM {table}" not in statement or statement.lstrip().startswith("INSERT"):
+                continue
+            plan = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            linhas += [row[-1] for row in plan]
+    return "\n".join(linhas)
+
+
+async def _seed():
+    """400 usuários e três anos de datas, metade no passado, com estatísticas (ANALYZE)."""
+    dias = list(DiasResponsavel)
+    inicio = date.today() - timedelta(days=540)
+    datas = [inicio + timedelta(days=i) for i in range(1080) if (inicio + timedelta(days=i)).weekday() in (1, 3)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"id": i, "nome": f"Pessoa {i}", "email": f"pessoa{i}@example.com", "dias_responsavel": dias[i % 3]}
+            for i in range(1, 401)
+        ])
+        await db.execute(insert(Dates), [
+            {"data": dia, "user_id": i % 400 + 1, "foi_avisado": dia < date.today()} for i, dia in enumerate(datas)
+        ])
+        await db.execute(insert(Outbox), [
+            {"to_email": f"p{i}@example.com", "to_name": "P", "subject": "s", "body": "b",
+             "status": "enviado", "attempts": 1, "next_attempt_at": date.today()}
+            for i in range(2000)
+        ])
+        await rebuild_schedule(db)
+        await db.commit()
+    async with database.engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+
+async def _plans() -> dict:
+    await _seed()
+    plans = {}
+
+    async with AsyncSessionLocal() as db:
+        with capture_queries() as queries:
+            await get_dates_to_notify(db, 7)
+        plans["notify"] = await query_plan(queries, "schedule_view")
+
+        with capture_queries() as queries:
+            await rebalancear_datas(db, 1)
+        plans["rebalance"] = await query_plan(queries, "dates")
+        await db.rollback()
+
+    with capture_queries() as queries:
+        await OutboxDispatcher(1, 1, 1, 1, 1, 1, 60)._claim(10)
+    plans["claim"] = await query_plan(queries, "outbox")
+
+    with capture_queries() as queries:
+        await archive_old_dates(batch_size=50, pause=0)
+    plans["archive"] = await query_plan(queries, "dates")
+    return plans
+
+
+def test_hot_queries_use_the_migration_indexes(run):
+    plans = run(_plans)
+
+    # Datas a avisar (intervalo de dias no read model)
+    assert "ix_schedule_view_data_id" in plans["notify"]
+    # Rebalanceamento: datas futuras ainda não avisadas
+    assert "ix_dates_foi_avisado_data" in plans["rebalance"]
+    # Dispatcher: mensagens pendentes já liberadas para envio
+    assert "ix_outbox_status_next_attempt_at" in plans["claim"]
+    # Retenção: datas anteriores a hoje, em ordem de data
+    assert "ix_dates_data_user_id" in plans["archive"]
+    for nome, plan in plans.items():
+        assert not re.search(r"^SCAN (dates|schedule_view|outbox)\b", plan, re.M), f"{nome}: varredura completa\n{plan}"
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.settings import settings
+from src.jobs.entity import JobRun
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 6
+
+# Cada processo é um "worker" com o seu próprio JobRunner e engine, disparando
+# o mesmo job no mesmo horário previsto
+WORKER = r"""
+import asyncio, os, sys, time
+from datetime import datetime
+
+from apscheduler.triggers.date import DateTrigger
+
+from src.bootstrap.database import dispose_engine, init_engine
+from src.jobs.runner import JobRunner
+
+fire_at, start_at, output = sys.argv[1:]
+
+
+async def job():
+    with open(output, "a") as f:
+        f.write(f"{os.getpid()}\n")
+    await asyncio.sleep(0.5)
+
+
+async def main():
+    init_engine()
+    runner = JobRunner(lease_seconds=60, misfire_grace=600)
+    # Todos disparam juntos, como no mesmo tick do cron
+    time.sleep(max(0.0, float(start_at) - time.time()))
+    executou = await runner.run("job_teste", DateTrigger(run_date=datetime.fromisoformat(fire_at)), job)
+    await dispose_engine()
+    print("executou" if executou else "ignorou")
+
+
+asyncio.run(main())
+"""
+
+
+async def _fire_from_processes(output: str):
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "MYSQL_HOST": "",
+        "SQLITE_URL": settings.DATABASE_URL,
+        "CACHE_VERSION_DIR": settings.CACHE_VERSION_DIR,
+    }
+    fire_at = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    start_at = str(time.time() + 3)
+    procs = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, "-c", WORKER, fire_at, start_at, output,
+            env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        for _ in range(WORKERS)
+    ]
+    saidas = []
+    for proc in procs:
+        stdout, stderr = await proc.communicate()
+        assert proc.returncode == 0, stderr.decode()
+        saidas.append(stdout.decode().strip().splitlines()[-1])
+
+    async with AsyncSessionLocal() as db:
+        runs = (await db.execute(select(JobRun.job_id, JobRun.status))).all()
+    return saidas, runs
+
+
+def test_each_firing_runs_once_across_processes(run, tmp_path):
+    output = str(tmp_path / "execucoes.txt")
+    saidas, runs = run(_fire_from_processes, output)
+
+    assert sorted(saidas) == ["executou"] + ["ignorou"] * (WORKERS - 1)
+    with open(output) as f:
+        assert len(f.read().splitlines()) == 1
+    assert runs == [("job_teste", "sucesso")]
+
+
+async def _submit_while_running():
+    from src.jobs.runner import JobRunner
+
+    lease = 0.3
+    primeiro = JobRunner(lease_seconds=lease, misfire_grace=600)
+    outro = JobRunner(lease_seconds=lease, misfire_grace=600)
+
+    async def job():
+        await asyncio.sleep(2)
+
+    _, iniciado = await primeiro.submit("job_manual", job)
+    assert iniciado
+    # Bem depois do lease inicial vencer e em outro segundo (fire_time novo):
+    # só o heartbeat mantém o job ocupado
+    await asyncio.sleep(1.2)
+    _, de_novo = await outro.submit("job_manual", job)
+    await primeiro.shutdown(timeout=5)
+    await outro.shutdown(timeout=5)
+
+    async with AsyncSessionLocal() as db:
+        runs = (await db.execute(select(JobRun.job_id, JobRun.status))).all()
+    return de_novo, runs, primeiro._running
+
+
+def test_running_job_keeps_its_short_lease(run):
+    de_novo, runs, running = run(_submit_while_running)
+
+    assert de_novo is False
+    assert runs == [("job_manual", "sucesso")]
+    assert not running
@@ -0,0 +1,130 @@
+import asyncio
+from email import message_from_bytes
+
+import orjson
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+
+from conftest import free_port
+from src.bootstrap.database import AsyncSessionLocal
+from src.emails import dispatcher as dispatcher_module
+from src.emails.dispatcher import OutboxDispatcher, enqueue_emails
+from src.emails.entity import Outbox
+from src.emails.enums import OutboxStatus
+from src.emails.pool import SMTPPool
+from src.emails.templating import email_templates
+
+CLAIM_TIMEOUT = 0.5
+
+
+class Sink:
+    """Servidor SMTP que aceita tudo e guarda os destinatários e as mensagens."""
+
+    def __init__(self):
+        self.recipients = []
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients += envelope.rcpt_tos
+        self.envelopes.append((envelope.rcpt_tos, message_from_bytes(envelope.content)))
+        return "250 OK"
+
+
+def _dispatcher() -> OutboxDispatcher:
+    return OutboxDispatcher(1, 100, 10, 3, 1, 0.05, CLAIM_TIMEOUT)
+
+
+async def _status() -> OutboxStatus:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Outbox.status))).scalar_one()
+
+
+async def _crashed_claim_is_sent_by_another_dispatcher(pool: SMTPPool):
+    async with AsyncSessionLocal() as db:
+        await enqueue_emails(db, [{"to_email": "pessoa@example.com", "to_name": "Pessoa", "subject": "s", "body": "b"}])
+        await db.commit()
+
+    # O primeiro dispatcher reserva a mensagem e "morre" sem enviar
+    assert len(await _dispatcher()._claim(10)) == 1
+    assert await _status() == OutboxStatus.enviando
+
+    # Outro worker já rodando: enquanto a reserva vale ele não pega a
+    # mensagem; depois que ela vence, pega no polling seguinte
+    outro = _dispatcher()
+    await outro.start()
+    try:
+        await asyncio.sleep(CLAIM_TIMEOUT / 2)
+        assert await _status() == OutboxStatus.enviando
+        for _ in range(100):
+            if await _status() == OutboxStatus.enviado:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await outro.stop()
+        await pool.close()
+    return await _status()
+
+
+def test_expired_claim_of_a_crashed_worker_is_sent_again(run, monkeypatch):
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    pool = SMTPPool(size=1, hostname=controller.hostname, port=controller.port, start_tls=False)
+    monkeypatch.setattr(dispatcher_module, "smtp_pool", pool)
+    try:
+        status = run(_crashed_claim_is_sent_by_another_dispatcher, pool)
+    finally:
+        controller.stop()
+
+    assert status == OutboxStatus.enviado
+    assert sink.recipients == ["pessoa@example.com"]
+
+
+async def _coffee_reminders(pool: SMTPPool):
+    campos = {"assunto": "Café", "mensagem": "Às 9h30"}
+    async with AsyncSessionLocal() as db:
+        await enqueue_emails(db, [
+            {
+                "to_email": "ana@example.com", "to_name": "Ana",
+                **email_templates.get("cafe").bind(campos).outbox_fields({"nome": "Ana"}),
+            },
+            {
+                "to_email": "undisclosed-recipients:;", "to_name": "2 destinatários em cópia oculta",
+                "bcc": orjson.dumps(["bia@example.com", "caio@example.com"]).decode(),
+                **email_templates.get("cafe_cco").bind(campos).outbox_fields({}),
+            },
+        ])
+        await db.commit()
+
+    dispatcher = _dispatcher()
+    await dispatcher.start()
+    try:
+        for _ in range(100):
+            async with AsyncSessionLocal() as db:
+                status = set((await db.execute(select(Outbox.status))).scalars())
+            if status == {OutboxStatus.enviado}:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await dispatcher.stop()
+        await pool.close()
+    return status
+
+
+def test_bcc_group_goes_out_as_one_message_with_date_and_message_id(run, monkeypatch):
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    pool = SMTPPool(size=1, hostname=controller.hostname, port=controller.port, start_tls=False)
+    monkeypatch.setattr(dispatcher_module, "smtp_pool", pool)
+    try:
+        status = run(_coffee_reminders, pool)
+    finally:
+        controller.stop()
+
+    assert status == {OutboxStatus.enviado}
+    envelopes = sorted(sink.envelopes, key=lambda e: e[0])
+    assert [rcpt for rcpt, _ in envelopes] == [["ana@example.com"], ["bia@example.com", "caio@example.com"]]
+    assert envelopes[1][1]["To"] == "undisclosed-recipients:;"
+    assert all(msg["Date"] for _, msg in envelopes)
+    assert len({msg["Message-ID"] for _, msg in envelopes}) == 2
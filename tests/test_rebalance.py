@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+from conftest import schedule_state, seed_schedule
+from src.bootstrap.database import AsyncSessionLocal
+from src.dates.entity import Dates
+from src.users import routes
+from src.users.enums import DiasResponsavel
+from src.users.models import UserUpdate
+
+t, q, tq = DiasResponsavel.terca, DiasResponsavel.quinta, DiasResponsavel.terca_quinta
+
+
+def _assert_balanced(fora, contagem):
+    # Ninguém com data fora dos seus dias e ninguém com 2 datas a mais que outro
+    assert fora == []
+    assert max(contagem.values()) - min(contagem.values()) <= 1
+
+
+async def _mudar_dias(user_id: int, dias: DiasResponsavel):
+    async with AsyncSessionLocal() as db:
+        await routes.update_user(user_id, UserUpdate(nome=None, email=None, dias_responsavel=dias), db)
+
+
+async def _moves():
+    await seed_schedule([t, t, q, q, tq, tq])
+    estados = []
+    # terça -> quinta, quinta -> os dois dias, os dois dias -> terça
+    for user_id, dias in ((1, q), (3, tq), (5, t)):
+        await _mudar_dias(user_id, dias)
+        estados.append(await schedule_state())
+    return estados
+
+
+def test_user_moved_between_days(run):
+    for fora, contagem in run(_moves):
+        _assert_balanced(fora, contagem)
+        assert sum(contagem.values()) == 24
+
+
+async def _delete():
+    await seed_schedule([t, q, tq, tq, t, q])
+    async with AsyncSessionLocal() as db:
+        await routes.delete_user(3, db)
+    return await schedule_state()
+
+
+def test_deleted_user_dates_go_to_the_others(run):
+    fora, contagem = run(_delete)
+
+    assert 3 not in contagem
+    _assert_balanced(fora, contagem)
+    assert sum(contagem.values()) == 24
+
+
+async def _off_weekday():
+    await seed_schedule([t, q, tq])
+    # Datas criadas à mão numa segunda e num sábado, do usuário que vai mudar
+    segunda = date.today() + timedelta(days=7 - date.today().weekday())
+    async with AsyncSessionLocal() as db:
+        db.add_all([Dates(data=segunda, user_id=1), Dates(data=segunda + timedelta(days=5), user_id=1)])
+        await db.commit()
+    await _mudar_dias(1, tq)
+    return await schedule_state()
+
+
+def test_off_weekday_dates_of_a_changed_user_are_dropped(run):
+    fora, contagem = run(_off_weekday)
+
+    _assert_balanced(fora, contagem)
+    assert sum(contagem.values()) == 24
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+from sqlalchemy import update
+
+from src.bootstrap import cache
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.server import app
+from src.bootstrap.settings import settings
+from src.users.entity import User
+
+TTL = 0.3
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _revalidation():
+    async with _client() as client:
+        await client.post("/users/", json={"nome": "Ana", "email": "ana@example.com"})
+        primeira = await client.get("/users/")
+        etag = primeira.headers["ETag"]
+        igual = await client.get("/users/", headers={"If-None-Match": etag})
+
+        # A escrita incrementa a versão de "users": o ETag antigo não vale mais
+        await client.post("/users/", json={"nome": "Bia", "email": "bia@example.com"})
+        depois = await client.get("/users/", headers={"If-None-Match": etag})
+    return primeira, igual, depois
+
+
+def test_if_none_match_gets_304_until_a_write_changes_the_etag(run):
+    primeira, igual, depois = run(_revalidation)
+
+    assert primeira.status_code == 200
+    assert igual.status_code == 304
+    assert igual.content == b""
+    assert igual.headers["ETag"] == primeira.headers["ETag"]
+
+    assert depois.status_code == 200
+    assert depois.headers["ETag"] != primeira.headers["ETag"]
+    assert [u["nome"] for u in depois.json()] == ["Ana", "Bia"]
+
+
+async def _ttl(monkeypatch):
+    monkeypatch.setattr(cache, "response_cache", cache.ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, TTL))
+    async with _client() as client:
+        await client.post("/users/", json={"nome": "Ana", "email": "ana@example.com"})
+        primeira = await client.get("/users/")
+
+        # Escrita sem bump_version, como a de um worker em outra máquina
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(User).values(nome="Ana Maria"))
+            await db.commit()
+        em_cache = await client.get("/users/")
+        await asyncio.sleep(TTL * 1.5)
+        vencida = await client.get("/users/", headers={"If-None-Match": primeira.headers["ETag"]})
+        # Vencida de novo, mas sem mudança: o ETag é o mesmo e o cliente recebe 304
+        await asyncio.sleep(TTL * 1.5)
+        refeita = await client.get("/users/", headers={"If-None-Match": vencida.headers["ETag"]})
+    return primeira, em_cache, vencida, refeita
+
+
+def test_entry_is_rebuilt_after_the_ttl(run, monkeypatch):
+    primeira, em_cache, vencida, refeita = run(_ttl, monkeypatch)
+
+    # Dentro do TTL a mudança não é vista; depois dele o conteúdo é refeito
+    assert em_cache.json()[0]["nome"] == "Ana"
+    assert em_cache.headers["ETag"] == primeira.headers["ETag"]
+    assert vencida.status_code == 200
+    assert vencida.json()[0]["nome"] == "Ana Maria"
+    assert vencida.headers["ETag"] != primeira.headers["ETag"]
+    assert refeita.status_code == 304
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from conftest import seed_schedule
+from src.bootstrap.database import AsyncSessionLocal
+from src.dates.entity import Dates, ScheduleView
+from src.dates.retention import archive_old_dates
+from src.dates.schedule import refresh_schedule
+from src.users import routes
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+from src.users.models import UserUpdate
+from src.users.services import import_users, parse_ndjson
+
+t, q, tq = DiasResponsavel.terca, DiasResponsavel.quinta, DiasResponsavel.terca_quinta
+
+
+async def _update():
+    async with AsyncSessionLocal() as db:
+        await routes.update_user(1, UserUpdate(nome="Outro Nome", email="outro@example.com", dias_responsavel=q), db)
+
+
+async def _delete():
+    async with AsyncSessionLocal() as db:
+        await routes.delete_user(3, db)
+
+
+async def _import():
+    async def chunks():
+        yield b'{"nome": "Pessoa Dois", "email": "pessoa2@example.com", "dias_responsavel": "terca_quinta"}\n'
+        yield b'{"nome": "Pessoa 4", "email": "pessoa4@example.com", "dias_responsavel": "terca"}\n'
+        yield b'{"nome": "Nova", "email": "nova@example.com", "dias_responsavel": "quinta"}\n'
+
+    async with AsyncSessionLocal() as db:
+        await import_users(db, parse_ndjson(chunks()))
+
+
+async def _retention():
+    assert await archive_old_dates(batch_size=2, pause=0) == 3
+
+
+async def _view_after(escrita):
+    await seed_schedule([t, q, tq, tq], semanas=10)
+    # Datas passadas, para a retenção ter o que arquivar
+    async with AsyncSessionLocal() as db:
+        passadas = [Dates(data=date.today() - timedelta(days=d), user_id=d) for d in (1, 2, 3)]
+        db.add_all(passadas)
+        await db.flush()
+        await refresh_schedule(db, date_ids=[d.id for d in passadas])
+        await db.commit()
+
+    await escrita()
+
+    async with AsyncSessionLocal() as db:
+        view = (await db.execute(
+            select(
+                ScheduleView.id, ScheduleView.data, ScheduleView.user_id, ScheduleView.nome,
+                ScheduleView.email, ScheduleView.dias_responsavel, ScheduleView.foi_avisado,
+            ).order_by(ScheduleView.id)
+        )).all()
+        esperado = (await db.execute(
+            select(Dates.id, Dates.data, Dates.user_id, User.nome, User.email, User.dias_responsavel, Dates.foi_avisado)
+            .join(User, User.id == Dates.user_id)
+            .order_by(Dates.id)
+        )).all()
+    return view, esperado
+
+
+@pytest.mark.parametrize("escrita", [_update, _delete, _import, _retention], ids=lambda f: f.__name__.strip("_"))
+def test_schedule_view_matches_dates_and_users(run, escrita):
+    view, esperado = run(_view_after, escrita)
+
+    assert len(esperado) >= 20
+    assert [tuple(r) for r in view] == [tuple(r) for r in esperado]
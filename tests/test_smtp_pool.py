@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP
+
+from conftest import free_port
+from src.emails.messages import build_email_message
+from src.emails.pool import SMTPPool
+
+
+class CountingHandler:
+    """Aceita todas as mensagens e conta conexões e mensagens recebidas."""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 OK"
+
+
+class CountingSMTP(SMTP):
+    def connection_made(self, transport):
+        self.event_handler.connections += 1
+        super().connection_made(transport)
+
+
+class CountingController(Controller):
+    def factory(self):
+        return CountingSMTP(self.handler, **self.SMTP_kwargs)
+
+
+@pytest.fixture
+def smtp_server():
+    handler = CountingHandler()
+    controller = CountingController(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    # O start() abre uma conexão para conferir que o servidor subiu
+    handler.connections = 0
+    yield controller
+    controller.stop()
+
+
+def _pool(controller, size: int) -> SMTPPool:
+    return SMTPPool(size=size, hostname=controller.hostname, port=controller.port, start_tls=False)
+
+
+def _mensagens(n: int):
+    return [
+        (build_email_message(f"pessoa{i}@example.com", f"Olá {i}", "Teste"), [f"pessoa{i}@example.com"])
+        for i in range(n)
+    ]
+
+
+def test_send_batch_opens_one_connection_per_pool_slot(smtp_server):
+    pool = _pool(smtp_server, size=3)
+
+    async def main():
+        try:
+            return await pool.send_batch(_mensagens(30))
+        finally:
+            await pool.close()
+
+    resultados = asyncio.run(main())
+
+    assert not [r for r in resultados if isinstance(r, BaseException)]
+    assert smtp_server.handler.messages == 30
+    assert smtp_server.handler.connections == 3
+    assert pool.connections_opened == 3
+
+
+def test_sequential_sends_reuse_the_same_connection(smtp_server):
+    pool = _pool(smtp_server, size=3)
+
+    async def main():
+        try:
+            for msg, recipients in _mensagens(10):
+                await pool.send(msg, recipients)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+    assert smtp_server.handler.messages == 10
+    assert smtp_server.handler.connections == 1
+
+
+def test_dropped_connection_is_reopened(smtp_server):
+    pool = _pool(smtp_server, size=1)
+    msg, recipients = _mensagens(1)[0]
+
+    async def main():
+        try:
+            await pool.send(msg, recipients)
+            # Conexão derrubada enquanto estava ociosa no pool
+            client = pool._idle.get_nowait()
+            client.close()
+            pool._idle.put_nowait(client)
+            await pool.send(msg, recipients)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+    assert smtp_server.handler.messages == 2
+    assert smtp_server.handler.connections == 2
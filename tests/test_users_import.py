@@ -0,0 +1,81 @@
+from sqlalchemy import select
+
+from conftest import schedule_state, seed_schedule
+from src.bootstrap.database import AsyncSessionLocal
+from src.bootstrap.settings import settings
+from src.users.entity import User
+from src.users.enums import DiasResponsavel
+from src.users import services
+from src.users.services import import_users, parse_ndjson
+
+t, q, tq = DiasResponsavel.terca, DiasResponsavel.quinta, DiasResponsavel.terca_quinta
+
+# Lotes de 2 linhas válidas: [1, 3], [4, 5], [6]
+LINHAS = [
+    b'{"nome": "Pessoa 1", "email": "pessoa1@example.com", "dias_responsavel": "quinta"}',
+    b'{"nome": "Sem e-mail"}',
+    b'{"nome": "Nova", "email": "nova@example.com"}',
+    b'{"nome": "Pessoa 3", "email": "pessoa3@example.com", "dias_responsavel": "quinta"}',
+    b'{"nome": "Pessoa 3", "email": "pessoa3@example.com", "dias_responsavel": "terca"}',
+    b'{"nome": "Pessoa Um", "email": "pessoa1@example.com", "dias_responsavel": "quinta"}',
+    b'isto n\xc3\xa3o \xc3\xa9 json',
+]
+
+
+async def _chunks():
+    corpo = b"\n".join(LINHAS)
+    # Pedaços pequenos: linhas quebradas entre chunks
+    for i in range(0, len(corpo), 7):
+        yield corpo[i:i + 7]
+
+
+async def _import():
+    await seed_schedule([t, t, q, q, tq, tq])
+    async with AsyncSessionLocal() as db:
+        resultados = await import_users(db, parse_ndjson(_chunks()))
+    async with AsyncSessionLocal() as db:
+        users = {
+            email: (nome, dias)
+            for email, nome, dias in await db.execute(select(User.email, User.nome, User.dias_responsavel))
+        }
+    return resultados, users, await schedule_state()
+
+
+def test_import_reports_each_line_and_rebalances_once(run, monkeypatch):
+    monkeypatch.setattr(settings, "USERS_BULK_BATCH_SIZE", 2)
+    chamadas = []
+    rebalancear_datas = services.rebalancear_datas
+
+    async def contar(db, *user_ids, **kwargs):
+        chamadas.append(sorted(user_ids))
+        return await rebalancear_datas(db, *user_ids, **kwargs)
+
+    monkeypatch.setattr(services, "rebalancear_datas", contar)
+    resultados, users, (fora, contagem) = run(_import)
+
+    assert [(r.linha, r.status) for r in resultados] == [
+        (1, "ignorado"),  # repetida no terceiro lote
+        (2, "erro"),
+        (3, "criado"),
+        (4, "ignorado"),  # repetida no mesmo lote
+        (5, "atualizado"),
+        (6, "atualizado"),
+        (7, "erro"),
+    ]
+    assert resultados[0].erro == "Substituída pela linha 6"
+    assert resultados[3].erro == "Substituída pela linha 5"
+    assert resultados[2].id == 7
+    assert [r.id for r in resultados if r.status == "atualizado"] == [3, 1]
+
+    # Um único balanceamento, com os dois usuários que mudaram de dias
+    assert chamadas == [[1, 3]]
+
+    assert len(users) == 7
+    assert users["pessoa1@example.com"] == ("Pessoa Um", q)
+    assert users["pessoa3@example.com"] == ("Pessoa 3", t)
+    assert users["nova@example.com"] == ("Nova", tq)
+
+    # 24 datas para 7 pessoas, nenhuma fora dos dias de quem a tem
+    assert fora == []
+    assert sum(contagem.values()) == 24
+    assert max(contagem.values()) - min(contagem.values()) <= 1